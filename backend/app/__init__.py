@@ -15,10 +15,45 @@ migrate = Migrate()
 def create_app():
     app = Flask(__name__)
     
+    # JSON 编码：接口响应使用 app.serialization.jsonify（orjson）
+    from .serialization import AppJSONEncoder
+    app.json_encoder = AppJSONEncoder
+    
     # 配置应用
     app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///did_system.db')
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'your-secret-key')
+    app.config['METRICS_TOKEN'] = os.getenv('METRICS_TOKEN')  # 设置后 /metrics 需要 Bearer token
+    app.config['ADMIN_TOKEN'] = os.getenv('ADMIN_TOKEN')  # /admin 管理接口的 Bearer token，未设置时关闭
+    app.config['TRACEMALLOC_FRAMES'] = int(os.getenv('TRACEMALLOC_FRAMES', '0'))  # 大于 0 时启动即开启 tracemalloc
+    
+    # 响应压缩配置（小于阈值的响应不压缩）
+    app.config['COMPRESS_MIN_SIZE'] = int(os.getenv('COMPRESS_MIN_SIZE', '1024'))
+    app.config['COMPRESS_GZIP_LEVEL'] = int(os.getenv('COMPRESS_GZIP_LEVEL', '6'))
+    app.config['COMPRESS_BROTLI_QUALITY'] = int(os.getenv('COMPRESS_BROTLI_QUALITY', '4'))
+    
+    # KV 存储配置（限流计数、登录 challenge）
+    app.config['KV_BACKEND'] = os.getenv('KV_BACKEND', 'redis')  # redis 或 memory（单进程）
+    app.config['KV_URL'] = os.getenv('KV_URL', 'redis://localhost:6379/0')
+    app.config['KV_POOL_SIZE'] = int(os.getenv('KV_POOL_SIZE', '50'))
+    app.config['KV_SOCKET_TIMEOUT'] = float(os.getenv('KV_SOCKET_TIMEOUT', '1'))
+    app.config['KV_CONNECT_TIMEOUT'] = float(os.getenv('KV_CONNECT_TIMEOUT', '1'))
+    
+    # 是否在 create_app 中启动后台线程（锚定、索引）
+    # 多进程部署时由 gunicorn.conf.py 关闭，改为在选出的单个 worker 中启动
+    app.config['START_BACKGROUND_WORKERS'] = os.getenv('START_BACKGROUND_WORKERS', 'true').lower() == 'true'
+    
+    # 声明批量锚定配置
+    app.config['ANCHOR_ENABLED'] = os.getenv('ANCHOR_ENABLED', 'false').lower() == 'true'
+    app.config['ANCHOR_WINDOW_SECONDS'] = int(os.getenv('ANCHOR_WINDOW_SECONDS', '60'))
+    app.config['ANCHOR_MAX_BATCH'] = int(os.getenv('ANCHOR_MAX_BATCH', '1024'))
+    
+    # 链上事件索引配置
+    app.config['INDEXER_ENABLED'] = os.getenv('INDEXER_ENABLED', 'false').lower() == 'true'
+    app.config['INDEXER_START_BLOCK'] = int(os.getenv('INDEXER_START_BLOCK', '0'))
+    app.config['INDEXER_CONFIRMATIONS'] = int(os.getenv('INDEXER_CONFIRMATIONS', '2'))
+    app.config['INDEXER_BATCH_SIZE'] = int(os.getenv('INDEXER_BATCH_SIZE', '2000'))
+    app.config['INDEXER_INTERVAL'] = float(os.getenv('INDEXER_INTERVAL', '5'))
     
     # 配置 CORS
     CORS(app, 
@@ -36,12 +71,45 @@ def create_app():
     db.init_app(app)
     migrate.init_app(app, db)
     
+    from .middleware.backends import init_backend
+    init_backend(app)
+    
     # 注册蓝图
     from .routes import auth_bp
     app.register_blueprint(auth_bp)
     
+    from .metrics import metrics_bp, init_request_metrics
+    app.register_blueprint(metrics_bp)
+    init_request_metrics(app)
+    
+    from .compression import init_compression
+    init_compression(app)
+    
+    from .admin import admin_bp
+    from .profiling import init_profiling
+    from .memory import init_memory_tracking
+    app.register_blueprint(admin_bp)
+    init_profiling(app)
+    init_memory_tracking(app)
+    
     # 创建数据库表
     with app.app_context():
         db.create_all()
     
+    # 声明锚定
+    from .anchoring import init_anchoring
+    init_anchoring(app)
+    
+    # 链上事件索引
+    from .indexer import init_indexer
+    init_indexer(app)
+    
+    # 授权对账
+    from .reconcile import init_reconcile
+    init_reconcile(app)
+    
+    # 批量导入用户
+    from .bulk_import import init_bulk_import
+    init_bulk_import(app)
+    
     return app 
\ No newline at end of file
@@ -0,0 +1,176 @@
+import hmac
+from functools import wraps
+
+from flask import Blueprint, Response, request, current_app
+
+from .profiling import sample_stacks, format_collapsed, request_profiler
+from .memory import memory_tracker
+from .serialization import jsonify
+
+admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
+
+# 栈采样最长持续时间（秒）
+MAX_SAMPLE_SECONDS = 60
+
+
+def admin_required(f):
+    """管理接口鉴权：Authorization: Bearer <ADMIN_TOKEN>，未配置 ADMIN_TOKEN 时接口关闭"""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        token = current_app.config['ADMIN_TOKEN']
+        if not token:
+            return jsonify({'error': '管理接口未启用'}), 404
+        if not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            return jsonify({'error': '无权访问'}), 403
+        return f(*args, **kwargs)
+    return decorated
+
+
+def text_response(body):
+    return Response(body, content_type='text/plain; charset=utf-8')
+
+
+@admin_bp.route('/profile/sample', methods=['POST'])
+@admin_required
+def profile_sample():
+    """采样所有线程的调用栈，返回折叠栈"""
+    try:
+        duration = min(float(request.args.get('duration', 10)), MAX_SAMPLE_SECONDS)
+        interval = max(float(request.args.get('interval', 0.005)), 0.001)
+    except ValueError:
+        return jsonify({'error': '参数格式错误'}), 400
+    return text_response(format_collapsed(sample_stacks(duration, interval)))
+
+
+@admin_bp.route('/profile/requests', methods=['POST'])
+@admin_required
+def profile_requests_start():
+    """对指定端点接下来的 N 个请求启用 cProfile"""
+    data = request.get_json() or {}
+    endpoint = data.get('endpoint')
+    if endpoint not in current_app.view_functions:
+        return jsonify({'error': '端点不存在', 'endpoints': sorted(current_app.view_functions)}), 400
+    try:
+        count = int(data.get('count', 10))
+    except (TypeError, ValueError):
+        return jsonify({'error': '参数格式错误'}), 400
+    if count <= 0:
+        return jsonify({'error': 'count 必须大于 0'}), 400
+
+    request_profiler.arm(endpoint, count)
+    return jsonify({'message': '已启用请求剖析', 'profiler': request_profiler.status()}), 202
+
+
+@admin_bp.route('/profile/requests', methods=['GET'])
+@admin_required
+def profile_requests_result():
+    """请求剖析结果：format=collapsed（默认）或 pstats"""
+    fmt = request.args.get('format', 'collapsed')
+    if fmt not in ('collapsed', 'pstats'):
+        return jsonify({'error': '不支持的格式'}), 400
+    if request.args.get('status'):
+        return jsonify(request_profiler.status()), 200
+    response = text_response(request_profiler.report(fmt))
+    response.headers['X-Profiled-Requests'] = str(request_profiler.profiled)
+    return response
+
+
+@admin_bp.route('/profile/requests', methods=['DELETE'])
+@admin_required
+def profile_requests_stop():
+    """停止请求剖析并清除结果"""
+    request_profiler.reset()
+    return jsonify({'message': '已停止请求剖析'}), 200
+
+
+def _memory_query_args():
+    key_type = request.args.get('key', 'lineno')
+    if key_type not in ('lineno', 'filename', 'traceback'):
+        raise ValueError(key_type)
+    return key_type, int(request.args.get('limit', 20))
+
+
+@admin_bp.route('/memory', methods=['GET'])
+@admin_required
+def memory_status():
+    return jsonify(memory_tracker.status()), 200
+
+
+@admin_bp.route('/memory/start', methods=['POST'])
+@admin_required
+def memory_start():
+    """开启 tracemalloc（frames 为每次分配记录的栈深度）"""
+    data = request.get_json(silent=True) or {}
+    try:
+        frames = int(data.get('frames', 10))
+    except (TypeError, ValueError):
+        return jsonify({'error': '参数格式错误'}), 400
+    memory_tracker.start(frames)
+    return jsonify(memory_tracker.status()), 200
+
+
+@admin_bp.route('/memory/stop', methods=['POST'])
+@admin_required
+def memory_stop():
+    """关闭 tracemalloc 并丢弃快照"""
+    memory_tracker.stop()
+    return jsonify(memory_tracker.status()), 200
+
+
+@admin_bp.route('/memory/snapshots', methods=['POST'])
+@admin_required
+def memory_take_snapshot():
+    data = request.get_json(silent=True) or {}
+    try:
+        snapshot_id = memory_tracker.take_snapshot(data.get('label'))
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 409
+    return jsonify({'id': snapshot_id, 'snapshots': memory_tracker.list_snapshots()}), 201
+
+
+@admin_bp.route('/memory/snapshots', methods=['GET'])
+@admin_required
+def memory_list_snapshots():
+    return jsonify({'snapshots': memory_tracker.list_snapshots()}), 200
+
+
+@admin_bp.route('/memory/snapshots/<int:snapshot_id>', methods=['GET'])
+@admin_required
+def memory_snapshot_top(snapshot_id):
+    """快照中占用最多的分配位置（key=lineno|filename|traceback）"""
+    try:
+        key_type, limit = _memory_query_args()
+        return jsonify({'top': memory_tracker.top(snapshot_id, key_type, limit)}), 200
+    except ValueError:
+        return jsonify({'error': '参数格式错误'}), 400
+    except KeyError:
+        return jsonify({'error': '快照不存在'}), 404
+
+
+@admin_bp.route('/memory/diff', methods=['GET'])
+@admin_required
+def memory_diff():
+    """比较两个快照：from 为旧快照，to 为新快照"""
+    try:
+        key_type, limit = _memory_query_args()
+        old_id, new_id = int(request.args['from']), int(request.args['to'])
+    except (KeyError, ValueError):
+        return jsonify({'error': '参数格式错误'}), 400
+    try:
+        return jsonify({'diff': memory_tracker.diff(old_id, new_id, key_type, limit)}), 200
+    except KeyError:
+        return jsonify({'error': '快照不存在'}), 404
+
+
+@admin_bp.route('/memory/routes', methods=['GET'])
+@admin_required
+def memory_routes():
+    """各端点请求期间的峰值分配和残留增长"""
+    return jsonify({'routes': memory_tracker.route_stats()}), 200
+
+
+@admin_bp.route('/memory/routes', methods=['DELETE'])
+@admin_required
+def memory_reset_routes():
+    memory_tracker.reset_routes()
+    return jsonify({'message': '已清空路由内存统计'}), 200
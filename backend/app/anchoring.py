@@ -0,0 +1,267 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from flask import current_app
+
+from . import db
+from .models import Declaration, DeclarationAnchor
+
+# 叶子与内部节点使用不同前缀，防止用内部节点伪造叶子
+LEAF_PREFIX = b'\x00'
+NODE_PREFIX = b'\x01'
+
+
+def hash_leaf(signature: str) -> bytes:
+    """计算声明签名对应的叶子哈希"""
+    return hashlib.sha256(LEAF_PREFIX + bytes.fromhex(signature[2:])).digest()
+
+
+def hash_pair(left: bytes, right: bytes) -> bytes:
+    """计算内部节点哈希（先排序，证明中无需记录左右方向）"""
+    if right < left:
+        left, right = right, left
+    return hashlib.sha256(NODE_PREFIX + left + right).digest()
+
+
+def build_merkle_tree(leaves):
+    """自底向上构建 Merkle 树，返回每一层的节点列表（最后一层为根）"""
+    levels = [list(leaves)]
+    while len(levels[-1]) > 1:
+        level = levels[-1]
+        parents = [hash_pair(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            # 奇数个节点时最后一个直接提升到上一层
+            parents.append(level[-1])
+        levels.append(parents)
+    return levels
+
+
+def get_merkle_proof(levels, index):
+    """获取第 index 个叶子的包含性证明"""
+    proof = []
+    for level in levels[:-1]:
+        sibling = index ^ 1
+        if sibling < len(level):
+            proof.append('0x' + level[sibling].hex())
+        index //= 2
+    return proof
+
+
+def verify_merkle_proof(signature: str, proof, merkle_root: str) -> bool:
+    """用包含性证明校验声明是否属于给定的 Merkle 根"""
+    node = hash_leaf(signature)
+    for sibling in proof:
+        node = hash_pair(node, bytes.fromhex(sibling[2:]))
+    return '0x' + node.hex() == merkle_root
+
+
+def create_pending_anchor(max_batch=1024):
+    """
+    将未分批的声明打包为一个待上链批次，批次、声明的叶子位置和证明在同一事务中写入
+    :return: 新建的 DeclarationAnchor（status 为 pending），没有未分批声明时返回 None
+    """
+    declarations = Declaration.query.filter(Declaration.anchor_id.is_(None))\
+        .order_by(Declaration.id.asc()).limit(max_batch).all()
+    if not declarations:
+        return None
+
+    levels = build_merkle_tree([hash_leaf(d.signature) for d in declarations])
+    anchor = DeclarationAnchor(
+        merkle_root='0x' + levels[-1][0].hex(),
+        leaf_count=len(declarations),
+        status='pending'
+    )
+    db.session.add(anchor)
+    db.session.flush()
+
+    for index, declaration in enumerate(declarations):
+        declaration.anchor_id = anchor.id
+        declaration.leaf_index = index
+        declaration.merkle_proof = json.dumps(get_merkle_proof(levels, index))
+    db.session.commit()
+    return anchor
+
+
+def adopt_onchain_anchor(client, anchor):
+    """Merkle 根已经上链（之前的提交已成功但结果未写库）：按链上事件补全交易信息"""
+    event = client.find_anchored_event(anchor.merkle_root)
+    if event is not None:
+        anchor.tx_hash = event['transactionHash'].hex()
+        anchor.block_number = event['blockNumber']
+    anchor.status = 'anchored'
+    db.session.commit()
+    return anchor
+
+
+def submit_anchor(client, anchor):
+    """提交待上链批次的 Merkle 根；根已在链上时直接采用，不重复提交（合约会以 Root already anchored 回滚）"""
+    if client.anchored_at(anchor.merkle_root):
+        return adopt_onchain_anchor(client, anchor)
+
+    def on_sent(tx_hash):
+        # 交易已广播：先记下哈希，之后等待回执超时或写库失败都能按链上状态恢复
+        anchor.tx_hash = tx_hash.hex()
+        db.session.commit()
+
+    # 上链等待回执期间不持有数据库事务
+    db.session.commit()
+    error = None
+    try:
+        receipt = client.submit(anchor.merkle_root, anchor.leaf_count, on_sent)
+    except Exception as e:
+        receipt, error = None, e
+
+    if receipt is not None and receipt['status'] == 1:
+        anchor.tx_hash = receipt['transactionHash'].hex()
+        anchor.block_number = receipt['blockNumber']
+        anchor.status = 'anchored'
+        db.session.commit()
+        return anchor
+
+    # 交易失败或等待超时：较早发出的同一根可能已经上链
+    if client.anchored_at(anchor.merkle_root):
+        return adopt_onchain_anchor(client, anchor)
+    raise RuntimeError(f'Merkle 根锚定交易失败: {anchor.merkle_root}') from error
+
+
+def anchor_pending_declarations(client, max_batch=1024):
+    """
+    锚定一个批次，仅提交 Merkle 根上链
+    先恢复上次未完成的批次（提交前已持久化，重试时不会重建出相同的根再次提交），否则打包新的批次
+    :param client: 锚定客户端，见 ContractRootAnchor
+    :param max_batch: 单个批次的最大声明数
+    :return: 已上链的 DeclarationAnchor，没有待锚定声明时返回 None
+    """
+    anchor = DeclarationAnchor.query.filter_by(status='pending').order_by(DeclarationAnchor.id.asc()).first()
+    if anchor is None:
+        anchor = create_pending_anchor(max_batch)
+        if anchor is None:
+            return None
+    return submit_anchor(client, anchor)
+
+
+def get_anchor_proof(declaration):
+    """
+    返回声明的锚定信息
+    proof_matches_root 只表示证明能还原出本地记录的 Merkle 根；
+    根是否在链上需由调用方用合约的 getRootAnchorTime(merkle_root) 独立确认
+    """
+    if not declaration.anchor_id or declaration.anchor.status != 'anchored':
+        return {'status': 'pending'}
+
+    anchor = declaration.anchor
+    proof = json.loads(declaration.merkle_proof)
+    return {
+        'status': 'anchored',
+        'merkle_root': anchor.merkle_root,
+        'leaf_index': declaration.leaf_index,
+        'proof': proof,
+        'proof_matches_root': verify_merkle_proof(declaration.signature, proof, anchor.merkle_root),
+        'tx_hash': anchor.tx_hash,
+        'block_number': anchor.block_number,
+        'anchored_at': anchor.created_at.isoformat()
+    }
+
+
+class ContractRootAnchor:
+    """通过 ContractManager 提交和查询声明批次的 Merkle 根"""
+
+    def __init__(self, manager, sender):
+        self.manager = manager
+        self.sender = sender
+
+    def submit(self, merkle_root, leaf_count, on_sent=None):
+        """提交 Merkle 根并等待回执；交易广播后先以交易哈希调用 on_sent"""
+        future = self.manager.anchor_declaration_root(self.sender, merkle_root, leaf_count, wait=False)
+        tx_hash = getattr(future, 'tx_hash', None)
+        if on_sent and tx_hash is not None:
+            on_sent(tx_hash)
+        return future.result()
+
+    def anchored_at(self, merkle_root):
+        """Merkle 根的链上锚定时间，未锚定返回 0"""
+        return self.manager.get_root_anchor_time(merkle_root)
+
+    def find_anchored_event(self, merkle_root):
+        return self.manager.find_root_anchored_event(merkle_root)
+
+
+def get_anchor_client():
+    """基于 ContractManager 构建锚定客户端"""
+    from utils.contract import ContractManager
+
+    sender = os.getenv('ANCHOR_SENDER_ADDRESS')
+    if not sender:
+        # 默认使用合约部署账户（测试账户中的第一个）
+        config_path = Path(__file__).parent.parent / 'config' / 'ganache_accounts.json'
+        with open(config_path) as f:
+            sender = json.load(f)['accounts'][0]
+    return ContractRootAnchor(ContractManager(), sender)
+
+
+class DeclarationAnchorer(threading.Thread):
+    """后台锚定线程：每个时间窗口收集一次新声明并提交一笔交易"""
+
+    def __init__(self, app, client, window_seconds=60, max_batch=1024):
+        super().__init__(name='declaration-anchorer', daemon=True)
+        self.app = app
+        self.client = client
+        self.window_seconds = window_seconds
+        self.max_batch = max_batch
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.window_seconds):
+            self.anchor_once()
+
+    def anchor_once(self):
+        with self.app.app_context():
+            try:
+                # 积压超过一个批次时连续提交，直到清空
+                while True:
+                    anchor = anchor_pending_declarations(self.client, self.max_batch)
+                    if not anchor or anchor.leaf_count < self.max_batch:
+                        break
+            except Exception as e:
+                db.session.rollback()
+                current_app.logger.error(f'声明锚定失败: {str(e)}')
+
+    def stop(self):
+        self._stop_event.set()
+
+
+def init_anchoring(app):
+    """注册锚定命令，并按配置启动后台锚定线程"""
+    @app.cli.command('anchor-declarations')
+    def anchor_declarations_command():
+        """立即锚定所有未锚定的声明"""
+        client = get_anchor_client()
+        started = time.time()
+        total = 0
+        while True:
+            anchor = anchor_pending_declarations(client, app.config['ANCHOR_MAX_BATCH'])
+            if not anchor:
+                break
+            total += anchor.leaf_count
+            print(f'已锚定 {anchor.leaf_count} 条声明, root={anchor.merkle_root}, tx={anchor.tx_hash}')
+        print(f'共锚定 {total} 条声明，耗时 {time.time() - started:.2f}s')
+
+    if app.config['ANCHOR_ENABLED'] and app.config['START_BACKGROUND_WORKERS']:
+        start_anchorer(app)
+
+
+def start_anchorer(app):
+    """启动后台锚定线程"""
+    anchorer = DeclarationAnchorer(
+        app,
+        get_anchor_client(),
+        window_seconds=app.config['ANCHOR_WINDOW_SECONDS'],
+        max_batch=app.config['ANCHOR_MAX_BATCH']
+    )
+    anchorer.start()
+    app.extensions['declaration_anchorer'] = anchorer
+    return anchorer
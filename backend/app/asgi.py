@@ -0,0 +1,158 @@
+"""
+公开只读接口的异步 ASGI 版本（uvicorn asgi:app）
+
+声明验证、健康检查和授权数据读取主要在等待数据库（以及后续的链上调用），
+这里用异步会话处理，单个进程即可同时挂起大量连接。
+查询语句和响应构造与 Flask 蓝图共用 app.public_api，路径与蓝图一致，
+可由反向代理把这几个路径转发到 ASGI 服务。
+"""
+import os
+import re
+from urllib.parse import unquote
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from . import public_api
+from .serialization import dumps
+from .models import User
+
+API_PREFIX = '/api/v1/auth'
+
+# 同步驱动 => 异步驱动
+ASYNC_DRIVERS = {
+    'sqlite': 'sqlite+aiosqlite',
+    'postgresql': 'postgresql+asyncpg',
+    'mysql': 'mysql+aiomysql',
+}
+
+
+def async_database_url(url):
+    """把同步数据库 URL 转换为对应的异步驱动 URL"""
+    url = make_url(str(url))
+    backend = url.get_backend_name()
+    if url.drivername in ASYNC_DRIVERS.values():
+        return url
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f'不支持异步访问的数据库: {url.drivername}')
+    return url.set(drivername=ASYNC_DRIVERS[backend])
+
+
+class PublicAPI:
+    """最小 ASGI 应用：按路径正则分发到异步处理函数，返回 JSON"""
+
+    def __init__(self, database_url, pool_size=20):
+        url = async_database_url(database_url)
+        options = {} if url.get_backend_name() == 'sqlite' else {'pool_size': pool_size, 'max_overflow': pool_size}
+        self.engine = create_async_engine(url, **options)
+        self.session_factory = sessionmaker(self.engine, class_=AsyncSession, expire_on_commit=False)
+        self.routes = [
+            (re.compile(rf'^{API_PREFIX}/health$'), self.health_check),
+            (re.compile(rf'^{API_PREFIX}/declarations/(?P<signature>[^/]+)/verify$'), self.verify_declaration),
+            (re.compile(rf'^{API_PREFIX}/authorized-data/(?P<data_type>[^/]+)$'), self.get_authorized_data),
+        ]
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+
+        head = scope['method'] == 'HEAD'
+        if scope['method'] not in ('GET', 'HEAD'):
+            await self._respond(send, {'error': 'Method not allowed'}, 405)
+            return
+
+        for pattern, handler in self.routes:
+            match = pattern.match(scope['path'])
+            if match:
+                headers = {k.decode('latin-1'): v.decode('latin-1') for k, v in scope['headers']}
+                params = {k: unquote(v) for k, v in match.groupdict().items()}
+                try:
+                    body, status = await handler(headers, **params)
+                except Exception as e:
+                    body, status = {'error': f'服务器内部错误: {str(e)}'}, 500
+                await self._respond(send, body, status, head)
+                return
+
+        await self._respond(send, {'error': '请求的资源不存在'}, 404, head)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.engine.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    @staticmethod
+    async def _respond(send, body, status, head=False):
+        """HEAD 请求只发送响应头（Content-Length 与 GET 相同），响应体为空"""
+        payload = dumps(body)
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [
+                (b'content-type', b'application/json'),
+                (b'content-length', str(len(payload)).encode()),
+            ]
+        })
+        await send({'type': 'http.response.body', 'body': b'' if head else payload})
+
+    async def health_check(self, headers):
+        return public_api.health_response()
+
+    async def verify_declaration(self, headers, signature):
+        async with self.session_factory() as session:
+            row = (await session.execute(public_api.declaration_query(signature))).first()
+            return public_api.verify_declaration_response(row)
+
+    async def get_authorized_data(self, headers, data_type):
+        token = headers.get('authorization')
+        if not token:
+            return {'error': '缺少认证token'}, 401
+
+        async with self.session_factory() as session:
+            try:
+                current_user = await session.get(User, public_api.decode_user_id(token))
+            except Exception:
+                return {'error': '无效的token'}, 401
+            if not current_user:
+                return {'error': '用户不存在'}, 401
+            if not current_user.is_active:
+                return {'error': '账户已被禁用'}, 401
+
+            authorization = (await session.execute(
+                public_api.authorization_query(data_type, current_user.wallet_address)
+            )).scalars().first()
+
+            error = public_api.check_authorization(authorization)
+            if error:
+                # 过期授权已被标记为 revoked
+                await session.commit()
+                return error
+
+            user_data = (await session.execute(
+                public_api.user_data_query(authorization.user_id, data_type)
+            )).scalars().first()
+            return public_api.authorized_data_response(user_data)
+
+
+def create_asgi_app(flask_app=None):
+    """
+    创建 ASGI 应用；数据库配置取自 Flask 应用，保证两条路径访问同一数据库
+    ASYNC_DATABASE_URL 可显式指定异步连接串
+    """
+    from . import create_app, db
+
+    url = os.getenv('ASYNC_DATABASE_URL')
+    if not url:
+        flask_app = flask_app or create_app()
+        with flask_app.app_context():
+            url = db.engine.url
+            db.engine.dispose()
+    return PublicAPI(url, pool_size=int(os.getenv('ASYNC_DB_POOL_SIZE', '20')))
@@ -0,0 +1,325 @@
+"""
+批量导入用户：流式读取 CSV / NDJSON，按块校验并用 bulk_insert_mappings 写入
+User、UserData、DataAuthorization（及对应的 AuthorizationLog），每块一个事务
+
+每条记录的字段：
+  email, name, wallet_address              必填
+  password_hash                            werkzeug 格式的哈希（推荐，导入时不再计算 PBKDF2）
+  password                                 明文密码（无 password_hash 时使用，多进程哈希）
+  is_active                                可选，默认 true
+  identity / profile / credentials         可选，用户数据（字符串或 JSON 对象）
+  authorizations                           可选，授权列表 [{data_type, authorized_address, expires_at}]
+CSV 中 authorizations 列为 JSON 字符串，其余列为纯文本。
+
+每提交一块就把已处理的记录数写入检查点文件，--resume 时跳过这些记录；
+邮箱或钱包地址已存在的用户会被跳过，重复导入同一文件不会产生重复数据。
+"""
+import csv
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import islice
+
+import click
+
+from . import db
+from .models import User, UserData, DataAuthorization, AuthorizationLog
+
+DATA_TYPES = ('identity', 'profile', 'credentials')
+
+EMAIL_PATTERN = re.compile(r'^[^@\s]+@[^@\s]+$')
+WALLET_PATTERN = re.compile(r'^0x[0-9a-fA-F]{40}$')
+# werkzeug generate_password_hash 的输出：method$salt$hash
+PASSWORD_HASH_PATTERN = re.compile(r'^(pbkdf2:[\w:]+|scrypt:[\d:]+)\$[^$]+\$[0-9a-f]+$')
+
+
+class RecordError(ValueError):
+    """记录校验失败"""
+
+
+def detect_format(path):
+    return 'csv' if path.lower().endswith('.csv') else 'ndjson'
+
+
+def read_records(path, fmt):
+    """逐条产出 (序号, 原始记录)；NDJSON 行解析失败时记录为 None"""
+    with open(path, newline='', encoding='utf-8') as f:
+        if fmt == 'csv':
+            yield from enumerate(csv.DictReader(f), 1)
+            return
+        number = 0
+        for line in f:
+            if not line.strip():
+                continue
+            number += 1
+            try:
+                yield number, json.loads(line)
+            except ValueError:
+                yield number, None
+
+
+def _parse_bool(value):
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() not in ('0', 'false', 'no', 'n', '')
+
+
+def _parse_datetime(value):
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value).replace('Z', '+00:00')).replace(tzinfo=None)
+    except ValueError:
+        raise RecordError(f'过期时间格式不正确: {value}')
+
+
+def normalize_record(raw):
+    """
+    校验并规范化一条记录
+    :return: (用户字段, [(data_type, data_content)], [授权字段])
+    """
+    if not isinstance(raw, dict):
+        raise RecordError('记录格式错误')
+
+    email = (raw.get('email') or '').strip()
+    name = (raw.get('name') or '').strip()
+    wallet = (raw.get('wallet_address') or '').strip()
+    if not email or not name or not wallet:
+        raise RecordError('缺少必要字段')
+    if not EMAIL_PATTERN.match(email) or len(email) > 120:
+        raise RecordError('邮箱格式不正确')
+    if not WALLET_PATTERN.match(wallet):
+        raise RecordError('钱包地址格式不正确')
+
+    user = {
+        'name': name[:100],
+        'email': email,
+        'wallet_address': wallet,
+        'is_active': _parse_bool(raw.get('is_active', True)),
+    }
+    password_hash = (raw.get('password_hash') or '').strip()
+    if password_hash:
+        if not PASSWORD_HASH_PATTERN.match(password_hash):
+            raise RecordError('password_hash 不是 werkzeug 哈希格式')
+        user['password_hash'] = password_hash
+    elif raw.get('password'):
+        user['password'] = raw['password']
+    else:
+        raise RecordError('缺少密码')
+
+    user_data = []
+    for data_type in DATA_TYPES:
+        content = raw.get(data_type)
+        if content in (None, ''):
+            continue
+        if not isinstance(content, str):
+            content = json.dumps(content, ensure_ascii=False)
+        user_data.append((data_type, content))
+
+    grants = raw.get('authorizations') or []
+    if isinstance(grants, str):
+        try:
+            grants = json.loads(grants)
+        except ValueError:
+            raise RecordError('authorizations 不是合法的 JSON')
+    if not isinstance(grants, list):
+        raise RecordError('authorizations 必须是列表')
+    authorizations = []
+    for grant in grants:
+        if not isinstance(grant, dict) or grant.get('data_type') not in DATA_TYPES:
+            raise RecordError('无效的授权数据类型')
+        if not WALLET_PATTERN.match(grant.get('authorized_address') or ''):
+            raise RecordError('授权地址格式不正确')
+        authorizations.append({
+            'data_type': grant['data_type'],
+            'authorized_address': grant['authorized_address'],
+            'status': grant.get('status', 'active'),
+            'expires_at': _parse_datetime(grant.get('expires_at')),
+        })
+
+    return user, user_data, authorizations
+
+
+def _hash_passwords(users, executor):
+    """为只有明文密码的用户计算哈希（PBKDF2 是导入的主要 CPU 开销，按进程并行）"""
+    from .routes import hash_user_password
+
+    pending = [user for user in users if 'password_hash' not in user]
+    if not pending:
+        return
+    passwords = [user.pop('password') for user in pending]
+    if executor:
+        hashes = executor.map(hash_user_password, passwords, chunksize=max(1, len(passwords) // 32))
+    else:
+        hashes = map(hash_user_password, passwords)
+    for user, password_hash in zip(pending, hashes):
+        user['password_hash'] = password_hash
+
+
+def import_chunk(records, executor=None):
+    """
+    导入一块记录（一个事务）
+    :param records: [(序号, 原始记录)]
+    :return: (统计, [(序号, 拒绝原因)])
+    """
+    stats = {'inserted': 0, 'skipped': 0, 'rejected': 0, 'user_data': 0, 'authorizations': 0}
+    rejects = []
+    valid = []
+    emails, wallets = set(), set()
+    for number, raw in records:
+        try:
+            user, user_data, authorizations = normalize_record(raw)
+        except RecordError as e:
+            rejects.append((number, str(e)))
+            continue
+        # 块内重复
+        if user['email'] in emails or user['wallet_address'] in wallets:
+            rejects.append((number, '文件中邮箱或钱包地址重复'))
+            continue
+        emails.add(user['email'])
+        wallets.add(user['wallet_address'])
+        valid.append((number, user, user_data, authorizations))
+    stats['rejected'] = len(rejects)
+
+    # 已存在的用户：每块两次查询
+    existing_emails = {email for email, in db.session.query(User.email).filter(User.email.in_(emails))}
+    existing_wallets = {wallet for wallet, in db.session.query(User.wallet_address)
+                        .filter(User.wallet_address.in_(wallets))}
+    pending = [item for item in valid
+               if item[1]['email'] not in existing_emails and item[1]['wallet_address'] not in existing_wallets]
+    stats['skipped'] = len(valid) - len(pending)
+    if not pending:
+        return stats, rejects
+
+    users = [user for _, user, _, _ in pending]
+    _hash_passwords(users, executor)
+    now = datetime.utcnow()
+    for user in users:
+        user['created_at'] = user['updated_at'] = now
+
+    try:
+        db.session.bulk_insert_mappings(User, users)
+        user_ids = dict(db.session.query(User.email, User.id).filter(User.email.in_([u['email'] for u in users])))
+
+        user_data_rows, grant_rows = [], []
+        for _, user, user_data, authorizations in pending:
+            user_id = user_ids[user['email']]
+            user_data_rows.extend({
+                'user_id': user_id, 'data_type': data_type, 'data_content': content,
+                'created_at': now, 'updated_at': now, 'version': 1
+            } for data_type, content in user_data)
+            grant_rows.extend(dict(grant, user_id=user_id, created_at=now) for grant in authorizations)
+
+        if user_data_rows:
+            db.session.bulk_insert_mappings(UserData, user_data_rows)
+        if grant_rows:
+            db.session.bulk_insert_mappings(DataAuthorization, grant_rows)
+            # 授权时间线需要 created 日志
+            grant_ids = db.session.query(DataAuthorization.id)\
+                .filter(DataAuthorization.user_id.in_(user_ids.values()))
+            db.session.bulk_insert_mappings(AuthorizationLog, [
+                {'authorization_id': grant_id, 'action': 'created', 'created_at': now}
+                for grant_id, in grant_ids
+            ])
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    stats['inserted'] = len(users)
+    stats['user_data'] = len(user_data_rows)
+    stats['authorizations'] = len(grant_rows)
+    return stats, rejects
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def read_checkpoint(path):
+    if not os.path.exists(path):
+        return 0
+    with open(path) as f:
+        return json.load(f)['records']
+
+
+def write_checkpoint(path, records):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump({'records': records, 'updated_at': datetime.utcnow().isoformat()}, f)
+    os.replace(tmp_path, path)
+
+
+def import_users(path, fmt=None, chunk_size=1000, resume=False, checkpoint=None, rejects_path=None,
+                 hash_workers=None, report=print):
+    """
+    流式导入用户文件
+    :param resume: 从检查点记录的位置继续
+    :param hash_workers: 明文密码哈希的进程数，0 表示在当前进程计算
+    :return: 汇总统计
+    """
+    fmt = fmt or detect_format(path)
+    checkpoint = checkpoint or path + '.checkpoint'
+    done = read_checkpoint(checkpoint) if resume else 0
+    totals = {'inserted': 0, 'skipped': 0, 'rejected': 0, 'user_data': 0, 'authorizations': 0}
+
+    hash_workers = os.cpu_count() if hash_workers is None else hash_workers
+    executor = ProcessPoolExecutor(hash_workers) if hash_workers > 0 else None
+    rejects_file = open(rejects_path, 'a' if resume else 'w', encoding='utf-8') if rejects_path else None
+    started = time.time()
+    processed = done
+    try:
+        records = islice(read_records(path, fmt), done, None)
+        for chunk in _chunks(records, chunk_size):
+            stats, rejects = import_chunk(chunk, executor)
+            processed += len(chunk)
+            write_checkpoint(checkpoint, processed)
+
+            for key, value in stats.items():
+                totals[key] += value
+            if rejects_file:
+                for number, reason in rejects:
+                    rejects_file.write(json.dumps({'record': number, 'error': reason}, ensure_ascii=False) + '\n')
+                rejects_file.flush()
+
+            elapsed = time.time() - started
+            rate = (processed - done) / elapsed if elapsed else 0
+            report(f'已处理 {processed} 条：导入 {totals["inserted"]}，跳过 {totals["skipped"]}，'
+                   f'拒绝 {totals["rejected"]}，{rate:.0f} 条/秒')
+    finally:
+        if executor:
+            executor.shutdown()
+        if rejects_file:
+            rejects_file.close()
+
+    totals['processed'] = processed - done
+    totals['seconds'] = time.time() - started
+    return totals
+
+
+def init_bulk_import(app):
+    """注册批量导入命令"""
+    @app.cli.command('import-users')
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--format', 'fmt', type=click.Choice(['csv', 'ndjson']), help='默认按扩展名判断')
+    @click.option('--chunk-size', default=1000, show_default=True, help='每个事务导入的记录数')
+    @click.option('--resume', is_flag=True, help='从检查点继续上次中断的导入')
+    @click.option('--checkpoint', type=click.Path(), help='检查点文件，默认为 <PATH>.checkpoint')
+    @click.option('--rejects', type=click.Path(), help='将被拒绝的记录及原因写入 NDJSON 文件')
+    @click.option('--hash-workers', type=int, help='明文密码哈希进程数，默认 CPU 核数，0 为不使用子进程')
+    def import_users_command(path, fmt, chunk_size, resume, checkpoint, rejects, hash_workers):
+        """从 CSV / NDJSON 批量导入用户、用户数据和授权"""
+        totals = import_users(path, fmt, chunk_size, resume, checkpoint, rejects, hash_workers)
+        rate = totals['processed'] / totals['seconds'] if totals['seconds'] else 0
+        print(f'完成：处理 {totals["processed"]} 条，导入用户 {totals["inserted"]}、'
+              f'用户数据 {totals["user_data"]}、授权 {totals["authorizations"]}，'
+              f'跳过 {totals["skipped"]}，拒绝 {totals["rejected"]}，'
+              f'耗时 {totals["seconds"]:.1f}s（{rate:.0f} 条/秒）')
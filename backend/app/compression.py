@@ -0,0 +1,100 @@
+"""
+按 Accept-Encoding 协商压缩响应（brotli 优先，其次 gzip）
+小于 COMPRESS_MIN_SIZE 的响应、文件下载等直通响应和已编码的响应不压缩
+"""
+import gzip
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# 支持的内容编码（按优先级）
+CONTENT_CODINGS = ('br', 'gzip')
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json',
+    'application/javascript',
+    'image/svg+xml',
+    'text/css',
+    'text/html',
+    'text/plain',
+}
+
+
+def parse_accept_encoding(header):
+    """解析 Accept-Encoding，返回 {编码: q 值}"""
+    encodings = {}
+    for item in header.split(','):
+        name, _, params = item.strip().partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        encodings[name] = q
+    return encodings
+
+
+def choose_encoding(header, available):
+    """在客户端接受的编码中选择 q 值最高的一个（q 相同时按 available 顺序）"""
+    accepted = parse_accept_encoding(header or '')
+    best, best_q = None, 0.0
+    for encoding in available:
+        q = accepted.get(encoding, accepted.get('*', 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(data, encoding, gzip_level=6, brotli_quality=4):
+    if encoding == 'br':
+        return brotli.compress(data, quality=brotli_quality)
+    return gzip.compress(data, compresslevel=gzip_level, mtime=0)
+
+
+def encoded_etag(etag, encoding):
+    """压缩后的表示使用的强 ETag（与未压缩表示的字节不同，校验值也需不同）"""
+    return f'{etag}-{encoding}'
+
+
+def init_compression(app):
+    """注册响应压缩钩子"""
+    available = CONTENT_CODINGS if brotli else ('gzip',)
+    min_size = app.config['COMPRESS_MIN_SIZE']
+    gzip_level = app.config['COMPRESS_GZIP_LEVEL']
+    brotli_quality = app.config['COMPRESS_BROTLI_QUALITY']
+
+    @app.after_request
+    def compress_response(response):
+        if (
+            response.direct_passthrough
+            or response.is_streamed
+            or response.status_code < 200 or response.status_code in (204, 304)
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES
+        ):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        data = response.get_data()
+        if len(data) < min_size:
+            return response
+
+        encoding = choose_encoding(request.headers.get('Accept-Encoding'), available)
+        if not encoding:
+            return response
+
+        response.set_data(compress(data, encoding, gzip_level, brotli_quality))
+        response.headers['Content-Encoding'] = encoding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(encoded_etag(etag, encoding))
+        return response
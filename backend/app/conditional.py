@@ -0,0 +1,66 @@
+"""
+条件 GET：按资源的版本信息生成 ETag / Last-Modified，
+If-None-Match / If-Modified-Since 命中时直接返回 304，不加载、不序列化数据行
+
+强 ETag 的响应被压缩时，ETag 追加 -<编码> 后缀（见 compression.py），
+各编码的表示各有自己的强校验值，比较时同一版本的所有后缀都算命中
+"""
+import hashlib
+from functools import wraps
+
+from flask import request, make_response
+
+from .compression import CONTENT_CODINGS, encoded_etag
+
+
+def make_etag(*parts):
+    """由版本信息（行数、最大 ID、更新时间等）生成 ETag 值"""
+    return hashlib.sha1(repr(parts).encode()).hexdigest()[:32]
+
+
+def etag_variants(etag):
+    """同一版本未压缩和各编码压缩后的 ETag"""
+    return [etag] + [encoded_etag(etag, encoding) for encoding in CONTENT_CODINGS]
+
+
+def if_match(etag):
+    """If-Match 强比较（RFC 7232 3.1）：同一版本任一编码的强 ETag 命中即可"""
+    return any(request.if_match.contains(variant) for variant in etag_variants(etag))
+
+
+def is_not_modified(etag, last_modified):
+    """客户端缓存是否仍然有效（有 If-None-Match 时忽略 If-Modified-Since）"""
+    if request.if_none_match:
+        return any(request.if_none_match.contains_weak(variant) for variant in etag_variants(etag))
+    if request.if_modified_since and last_modified:
+        return last_modified.replace(microsecond=0) <= request.if_modified_since.replace(tzinfo=None)
+    return False
+
+
+def conditional_get(version, weak=True):
+    """
+    条件 GET 装饰器，放在 @token_required 之后
+    :param version: (current_user, **路由参数) -> (ETag 组成部分, 最后修改时间)，应只查询版本信息
+    :param weak: 是否使用弱 ETag（只用于缓存校验）；客户端要用于 If-Match 条件更新的资源需用强 ETag
+    """
+    def decorator(f):
+        @wraps(f)
+        def wrapped(current_user, *args, **kwargs):
+            parts, last_modified = version(current_user, *args, **kwargs)
+            etag = make_etag(*parts)
+
+            if is_not_modified(etag, last_modified):
+                response = make_response('', 304)
+            else:
+                response = make_response(f(current_user, *args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag, weak=weak)
+            if last_modified:
+                response.last_modified = last_modified
+            # 每次都需向服务器确认，但可以复用本地缓存
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return wrapped
+    return decorator
@@ -0,0 +1,303 @@
+import json
+import threading
+import time
+
+from eth_utils import event_abi_to_log_topic
+from flask import current_app
+
+from . import db
+from .models import ChainEvent, ChainUser, ChainAuthorization, IndexerCheckpoint
+
+INDEXED_EVENTS = (
+    'UserRegistered',
+    'WalletBound',
+    'UserUpdated',
+    'AuthorizationCreated',
+    'AuthorizationRevoked',
+    'AuthorizationExpired',
+)
+
+CHECKPOINT_NAME = 'did_contract'
+
+
+def apply_event(event):
+    """将一条事件应用到物化表"""
+    payload = json.loads(event.payload)
+
+    if event.event in ('UserRegistered', 'WalletBound'):
+        db.session.merge(ChainUser(
+            wallet=event.wallet,
+            email=payload['email'],
+            is_active=True,
+            block_number=event.block_number
+        ))
+    elif event.event == 'UserUpdated':
+        # updateUserEmail 只允许已注册用户调用，注册事件一定先于此事件被应用
+        user = ChainUser.query.get(event.wallet)
+        if user:
+            user.email = payload['email']
+            user.block_number = event.block_number
+    elif event.event == 'AuthorizationCreated':
+        db.session.merge(ChainAuthorization(
+            auth_id=event.auth_id,
+            owner=payload['owner'],
+            authorized=payload['authorized'],
+            data_type=payload['data_type'],
+            expires_at=payload['expires_at'],
+            is_active=True,
+            block_number=event.block_number
+        ))
+    elif event.event in ('AuthorizationRevoked', 'AuthorizationExpired'):
+        authorization = ChainAuthorization.query.get(event.auth_id)
+        if authorization:
+            authorization.is_active = False
+
+
+class EventIndexer:
+    """
+    DID 合约事件增量索引器
+    - 按区块号记录检查点，每次只拉取新区块的日志（单次 eth_getLogs 覆盖所有事件）
+    - 检查点区块哈希变化时视为链重组，回滚到分叉点并重放剩余事件
+    """
+
+    def __init__(self, w3, contract, start_block=0, confirmations=2, batch_size=2000):
+        """
+        :param start_block: 合约部署区块，首次同步从这里开始
+        :param confirmations: 只索引距链头至少这么多个确认的区块
+        :param batch_size: 单次 eth_getLogs 覆盖的区块数
+        """
+        self.w3 = w3
+        self.contract = contract
+        self.start_block = start_block
+        self.confirmations = confirmations
+        self.batch_size = batch_size
+
+        self._events_by_topic = {}
+        for abi in contract.abi:
+            if abi.get('type') == 'event' and abi['name'] in INDEXED_EVENTS:
+                topic = '0x' + event_abi_to_log_topic(abi).hex()
+                self._events_by_topic[topic] = getattr(contract.events, abi['name'])()
+
+    def _decode(self, log):
+        """解码日志为 ChainEvent 记录"""
+        topic = log['topics'][0]
+        topic = topic.hex() if isinstance(topic, bytes) else topic
+        if not topic.startswith('0x'):
+            topic = '0x' + topic
+        decoded = self._events_by_topic[topic].process_log(log)
+        args = decoded['args']
+        name = decoded['event']
+
+        event = ChainEvent(
+            block_number=log['blockNumber'],
+            block_hash=log['blockHash'].hex(),
+            tx_hash=log['transactionHash'].hex(),
+            log_index=log['logIndex'],
+            event=name
+        )
+        if name in ('UserRegistered', 'WalletBound'):
+            event.wallet = args['wallet'].lower()
+            payload = {'email': args['email']}
+        elif name == 'UserUpdated':
+            event.wallet = args['userAddress'].lower()
+            payload = {'email': args['email']}
+        elif name == 'AuthorizationCreated':
+            event.auth_id = args['authId']
+            # 事件中不含过期时间，在事件所在区块读取一次授权详情
+            _, _, _, expires_at, _ = self.contract.functions.getAuthorization(
+                args['authId']
+            ).call(block_identifier=log['blockNumber'])
+            payload = {
+                'owner': args['owner'].lower(),
+                'authorized': args['authorized'].lower(),
+                'data_type': args['dataType'],
+                'expires_at': expires_at
+            }
+        else:
+            event.auth_id = args['authId']
+            payload = {}
+        event.payload = json.dumps(payload)
+        return event
+
+    def _block_hash(self, block_number):
+        return self.w3.eth.get_block(block_number)['hash'].hex()
+
+    def _save_checkpoint(self, block_number, block_hash):
+        db.session.merge(IndexerCheckpoint(
+            name=CHECKPOINT_NAME,
+            block_number=block_number,
+            block_hash=block_hash
+        ))
+
+    def _handle_reorg(self, checkpoint):
+        """检测并处理链重组，返回处理后的检查点区块号"""
+        if self._block_hash(checkpoint.block_number) == checkpoint.block_hash:
+            return checkpoint.block_number
+
+        # 从最新的已索引区块向前查找仍在主链上的区块作为分叉点
+        fork_block = self.start_block - 1
+        indexed_blocks = db.session.query(ChainEvent.block_number, ChainEvent.block_hash)\
+            .filter(ChainEvent.block_number <= checkpoint.block_number)\
+            .distinct().order_by(ChainEvent.block_number.desc())
+        for block_number, block_hash in indexed_blocks:
+            if self._block_hash(block_number) == block_hash:
+                fork_block = block_number
+                break
+
+        current_app.logger.warning(
+            f'检测到链重组：检查点 {checkpoint.block_number} 回滚到 {fork_block}'
+        )
+
+        orphaned = ChainEvent.query.filter(ChainEvent.block_number > fork_block).all()
+        wallets = {e.wallet for e in orphaned if e.wallet}
+        auth_ids = {e.auth_id for e in orphaned if e.auth_id is not None}
+        for event in orphaned:
+            db.session.delete(event)
+        db.session.flush()
+
+        # 受影响的物化记录按剩余事件重新构建
+        if wallets:
+            ChainUser.query.filter(ChainUser.wallet.in_(wallets)).delete(synchronize_session=False)
+        if auth_ids:
+            ChainAuthorization.query.filter(ChainAuthorization.auth_id.in_(auth_ids))\
+                .delete(synchronize_session=False)
+        if wallets or auth_ids:
+            remaining = ChainEvent.query.filter(
+                db.or_(ChainEvent.wallet.in_(wallets), ChainEvent.auth_id.in_(auth_ids))
+            ).order_by(ChainEvent.block_number.asc(), ChainEvent.log_index.asc()).all()
+            for event in remaining:
+                apply_event(event)
+                db.session.flush()
+
+        if fork_block >= 0:
+            self._save_checkpoint(fork_block, self._block_hash(fork_block))
+        else:
+            IndexerCheckpoint.query.filter_by(name=CHECKPOINT_NAME).delete()
+        db.session.commit()
+        return fork_block
+
+    def sync(self):
+        """同步到当前确认区块，返回本次索引的事件数"""
+        head = self.w3.eth.block_number - self.confirmations
+        checkpoint = IndexerCheckpoint.query.get(CHECKPOINT_NAME)
+        start = self.start_block
+        if checkpoint:
+            start = self._handle_reorg(checkpoint) + 1
+
+        indexed = 0
+        while start <= head:
+            end = min(start + self.batch_size - 1, head)
+            logs = self.w3.eth.get_logs({
+                'address': self.contract.address,
+                'fromBlock': start,
+                'toBlock': end,
+                'topics': [list(self._events_by_topic)]
+            })
+            for log in sorted(logs, key=lambda l: (l['blockNumber'], l['logIndex'])):
+                event = self._decode(log)
+                db.session.add(event)
+                apply_event(event)
+                db.session.flush()
+                indexed += 1
+
+            self._save_checkpoint(end, self._block_hash(end))
+            db.session.commit()
+            start = end + 1
+
+        return indexed
+
+
+def is_registered(wallet_address):
+    """本地查询用户是否已在链上注册"""
+    user = ChainUser.query.get(wallet_address.lower())
+    return bool(user and user.is_active)
+
+
+def get_user_email(wallet_address):
+    """本地查询链上用户邮箱"""
+    user = ChainUser.query.get(wallet_address.lower())
+    return user.email if user and user.is_active else None
+
+
+def check_authorization(owner_address, authorized_address, data_type, now=None):
+    """本地检查授权，语义与合约 checkAuthorization 一致"""
+    now = int(now if now is not None else time.time())
+    return db.session.query(ChainAuthorization.query.filter(
+        ChainAuthorization.owner == owner_address.lower(),
+        ChainAuthorization.authorized == authorized_address.lower(),
+        ChainAuthorization.data_type == data_type,
+        ChainAuthorization.is_active.is_(True),
+        ChainAuthorization.expires_at > now
+    ).exists()).scalar()
+
+
+def get_user_authorizations(owner_address):
+    """本地获取用户授权ID列表（按创建顺序）"""
+    rows = db.session.query(ChainAuthorization.auth_id)\
+        .filter(ChainAuthorization.owner == owner_address.lower())\
+        .order_by(ChainAuthorization.auth_id.asc()).all()
+    return [auth_id for auth_id, in rows]
+
+
+def get_authorization(auth_id):
+    """本地获取授权详情"""
+    return ChainAuthorization.query.get(auth_id)
+
+
+class IndexerWorker(threading.Thread):
+    """后台索引线程：按固定间隔同步新区块"""
+
+    def __init__(self, app, indexer, interval=5):
+        super().__init__(name='chain-event-indexer', daemon=True)
+        self.app = app
+        self.indexer = indexer
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            with self.app.app_context():
+                try:
+                    self.indexer.sync()
+                except Exception as e:
+                    db.session.rollback()
+                    current_app.logger.error(f'链上事件索引失败: {str(e)}')
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+
+
+def create_indexer(app):
+    """基于 ContractManager 创建事件索引器"""
+    from utils.contract import ContractManager
+
+    manager = ContractManager()
+    return EventIndexer(
+        manager.w3,
+        manager.contract,
+        start_block=app.config['INDEXER_START_BLOCK'],
+        confirmations=app.config['INDEXER_CONFIRMATIONS'],
+        batch_size=app.config['INDEXER_BATCH_SIZE']
+    )
+
+
+def init_indexer(app):
+    """注册索引命令，并按配置启动后台索引线程"""
+    @app.cli.command('index-chain')
+    def index_chain_command():
+        """同步 DID 合约事件到本地索引表"""
+        started = time.time()
+        indexed = create_indexer(app).sync()
+        print(f'已索引 {indexed} 条事件，耗时 {time.time() - started:.2f}s')
+
+    if app.config['INDEXER_ENABLED'] and app.config['START_BACKGROUND_WORKERS']:
+        start_indexer(app)
+
+
+def start_indexer(app):
+    """启动后台索引线程"""
+    worker = IndexerWorker(app, create_indexer(app), interval=app.config['INDEXER_INTERVAL'])
+    worker.start()
+    app.extensions['chain_indexer'] = worker
+    return worker
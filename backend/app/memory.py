@@ -0,0 +1,172 @@
+"""
+基于 tracemalloc 的内存诊断
+- 快照：保存最近若干个快照，按分配位置列出占用或比较两个快照的增长
+- 路由峰值：追踪开启时记录每个端点请求期间的峰值分配和请求结束后的残留增长
+
+tracemalloc 的峰值是进程级的，并发请求会互相计入，路由峰值在低并发下最准确。
+未开启追踪时每个请求只多一次 tracemalloc.is_tracing() 判断。
+"""
+import itertools
+import threading
+import tracemalloc
+from collections import OrderedDict
+from datetime import datetime
+
+from flask import g, request
+
+# 最多保留的快照数量
+MAX_SNAPSHOTS = 10
+
+# 不计入统计的分配位置（tracemalloc 自身和模块导入）
+SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>'),
+)
+
+
+def _site(stat_or_diff, key_type):
+    frames = stat_or_diff.traceback
+    if key_type == 'traceback':
+        return [f'{frame.filename}:{frame.lineno}' for frame in frames]
+    frame = frames[0]
+    return frame.filename if key_type == 'filename' else f'{frame.filename}:{frame.lineno}'
+
+
+class MemoryTracker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshots = OrderedDict()  # id => (label, created_at, snapshot)
+        self._ids = itertools.count(1)
+        self._routes = {}
+
+    # 追踪开关
+
+    def start(self, frames=10):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+
+    def stop(self):
+        tracemalloc.stop()
+        with self._lock:
+            self._snapshots.clear()
+
+    def status(self):
+        tracing = tracemalloc.is_tracing()
+        current, peak = tracemalloc.get_traced_memory() if tracing else (0, 0)
+        return {
+            'tracing': tracing,
+            'frames': tracemalloc.get_traceback_limit() if tracing else 0,
+            'current_bytes': current,
+            'peak_bytes': peak,
+            'overhead_bytes': tracemalloc.get_tracemalloc_memory() if tracing else 0
+        }
+
+    # 快照
+
+    def take_snapshot(self, label=None):
+        if not tracemalloc.is_tracing():
+            raise RuntimeError('tracemalloc 未开启')
+        snapshot = tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+        with self._lock:
+            snapshot_id = next(self._ids)
+            self._snapshots[snapshot_id] = (label, datetime.utcnow(), snapshot)
+            while len(self._snapshots) > MAX_SNAPSHOTS:
+                self._snapshots.popitem(last=False)
+        return snapshot_id
+
+    def list_snapshots(self):
+        with self._lock:
+            items = list(self._snapshots.items())
+        return [
+            {
+                'id': snapshot_id,
+                'label': label,
+                'created_at': created_at,
+                'traced_bytes': sum(trace.size for trace in snapshot.traces)
+            }
+            for snapshot_id, (label, created_at, snapshot) in items
+        ]
+
+    def _get(self, snapshot_id):
+        with self._lock:
+            entry = self._snapshots.get(snapshot_id)
+        if entry is None:
+            raise KeyError(snapshot_id)
+        return entry[2]
+
+    def top(self, snapshot_id, key_type='lineno', limit=20):
+        """快照中占用最多的分配位置"""
+        stats = self._get(snapshot_id).statistics(key_type)
+        return [
+            {'site': _site(stat, key_type), 'size_bytes': stat.size, 'count': stat.count}
+            for stat in stats[:limit]
+        ]
+
+    def diff(self, old_id, new_id, key_type='lineno', limit=20):
+        """两个快照之间增长最多的分配位置"""
+        stats = self._get(new_id).compare_to(self._get(old_id), key_type)
+        return [
+            {
+                'site': _site(stat, key_type),
+                'size_diff_bytes': stat.size_diff,
+                'count_diff': stat.count_diff,
+                'size_bytes': stat.size
+            }
+            for stat in stats[:limit]
+        ]
+
+    # 路由峰值
+
+    def before_request(self):
+        if not tracemalloc.is_tracing():
+            return
+        tracemalloc.reset_peak()
+        g.memory_start = tracemalloc.get_traced_memory()[0]
+
+    def teardown_request(self, exc):
+        start = g.pop('memory_start', None)
+        if start is None or not tracemalloc.is_tracing():
+            return
+        current, peak = tracemalloc.get_traced_memory()
+        endpoint = request.endpoint or 'unmatched'
+        with self._lock:
+            stats = self._routes.get(endpoint)
+            if stats is None:
+                stats = self._routes[endpoint] = {'requests': 0, 'max_peak_bytes': 0, 'total_peak_bytes': 0,
+                                                  'total_retained_bytes': 0}
+            stats['requests'] += 1
+            stats['max_peak_bytes'] = max(stats['max_peak_bytes'], peak - start)
+            stats['total_peak_bytes'] += peak - start
+            stats['total_retained_bytes'] += current - start
+
+    def route_stats(self):
+        with self._lock:
+            items = [(endpoint, dict(stats)) for endpoint, stats in self._routes.items()]
+        result = []
+        for endpoint, stats in items:
+            requests = stats['requests']
+            result.append({
+                'endpoint': endpoint,
+                'requests': requests,
+                'max_peak_bytes': stats['max_peak_bytes'],
+                'avg_peak_bytes': stats['total_peak_bytes'] // requests,
+                'avg_retained_bytes': stats['total_retained_bytes'] // requests
+            })
+        return sorted(result, key=lambda r: r['max_peak_bytes'], reverse=True)
+
+    def reset_routes(self):
+        with self._lock:
+            self._routes.clear()
+
+
+memory_tracker = MemoryTracker()
+
+
+def init_memory_tracking(app):
+    """注册路由内存统计钩子；TRACEMALLOC_FRAMES 大于 0 时启动即开启追踪"""
+    app.before_request(memory_tracker.before_request)
+    app.teardown_request(memory_tracker.teardown_request)
+    if app.config['TRACEMALLOC_FRAMES'] > 0:
+        memory_tracker.start(app.config['TRACEMALLOC_FRAMES'])
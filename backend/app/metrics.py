@@ -0,0 +1,62 @@
+import time
+
+from flask import Blueprint, Response, request, current_app, g, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from utils.metrics import (
+    REGISTRY, HTTP_REQUEST_SECONDS, HTTP_REQUESTS_TOTAL, HTTP_IN_FLIGHT, HTTP_DB_SECONDS, DB_QUERY_SECONDS
+)
+
+metrics_bp = Blueprint('metrics', __name__)
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus 文本格式的指标"""
+    token = current_app.config['METRICS_TOKEN']
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return Response('unauthorized\n', status=401, mimetype='text/plain')
+    return Response(REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def _endpoint_label():
+    # 用端点名而不是 URL 作为标签，避免路径参数导致标签数量无限增长
+    return request.endpoint or 'unmatched'
+
+def _before_request():
+    g.metrics_started = time.perf_counter()
+    g.metrics_db_seconds = 0.0
+    HTTP_IN_FLIGHT.inc(_endpoint_label())
+
+def _after_request(response):
+    g.metrics_status = response.status_code
+    return response
+
+def _teardown_request(exc):
+    started = g.pop('metrics_started', None)
+    if started is None:
+        return
+    endpoint = _endpoint_label()
+    status = 500 if exc is not None else g.pop('metrics_status', 500)
+    HTTP_IN_FLIGHT.dec(endpoint)
+    HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint, request.method)
+    HTTP_REQUESTS_TOTAL.inc(endpoint, request.method, str(status))
+    HTTP_DB_SECONDS.observe(g.pop('metrics_db_seconds', 0.0), endpoint)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._metrics_started = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._metrics_started
+    DB_QUERY_SECONDS.observe(elapsed)
+    if has_request_context() and 'metrics_db_seconds' in g:
+        g.metrics_db_seconds += elapsed
+
+def init_request_metrics(app):
+    """注册请求计时钩子和 SQL 计时监听"""
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
@@ -0,0 +1,262 @@
+import os
+import threading
+import time
+import uuid
+from collections import deque
+
+# 滑动窗口限流脚本：清理窗口外记录、计数、写入在同一次往返内原子完成
+# 使用 Redis 服务器时间，多台应用服务器之间不受本地时钟偏差影响
+SLIDING_WINDOW_SCRIPT = """
+local key = KEYS[1]
+local window = tonumber(ARGV[1])
+local limit = tonumber(ARGV[2])
+local member = ARGV[3]
+
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+
+redis.call('ZREMRANGEBYSCORE', key, 0, now - window)
+local count = redis.call('ZCARD', key)
+local allowed = 0
+if count < limit then
+    redis.call('ZADD', key, now, member)
+    count = count + 1
+    allowed = 1
+end
+redis.call('PEXPIRE', key, window)
+
+local reset = window
+local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+if oldest[2] then
+    reset = tonumber(oldest[2]) + window - now
+end
+return {allowed, limit - count, reset}
+"""
+
+
+class RedisBackend:
+    """Redis 实现：多进程、多机器共享限流计数和 challenge，连接由连接池复用"""
+
+    def __init__(self, client):
+        self.client = client
+        self._sliding_window = client.register_script(SLIDING_WINDOW_SCRIPT)
+
+    def hit(self, key, limit, period):
+        """
+        记录一次请求
+        :return: (是否放行, 剩余次数, 窗口重置前的秒数)
+        """
+        allowed, remaining, reset_ms = self._sliding_window(
+            keys=[key],
+            args=[int(period * 1000), limit, uuid.uuid4().hex]
+        )
+        return bool(allowed), max(0, int(remaining)), int(reset_ms) / 1000
+
+    def setex(self, key, ttl, value):
+        self.client.setex(key, ttl, value)
+
+    def get(self, key):
+        value = self.client.get(key)
+        return value.decode('utf-8') if value is not None else None
+
+    def delete(self, key):
+        self.client.delete(key)
+
+    def consume(self, key):
+        """原子地取出并删除（GETDEL 语义，MULTI/EXEC 兼容 6.2 以下的 Redis）"""
+        with self.client.pipeline(transaction=True) as pipe:
+            value, _ = pipe.get(key).delete(key).execute()
+        return value.decode('utf-8') if value is not None else None
+
+    def setex_many(self, mapping, ttl):
+        """一次往返写入多个带过期时间的键"""
+        with self.client.pipeline(transaction=False) as pipe:
+            for key, value in mapping.items():
+                pipe.setex(key, ttl, value)
+            pipe.execute()
+
+    def get_many(self, keys):
+        """一次往返读取多个键，缺失的键返回 None"""
+        with self.client.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.get(key)
+            values = pipe.execute()
+        return [v.decode('utf-8') if v is not None else None for v in values]
+
+
+class TimerWheel:
+    """
+    时间轮：按到期时间把键放入环形槽位，每个 tick 只检查当前槽位
+    超过一圈的键会被提前取出，由调用方核对真实到期时间后重新登记
+    """
+
+    def __init__(self, slots=512, tick=1.0):
+        self.tick = tick
+        self._slots = [set() for _ in range(slots)]
+        self._lock = threading.Lock()
+        self._position = int(time.monotonic() / tick)
+
+    def schedule(self, key, deadline):
+        index = int(deadline / self.tick) % len(self._slots)
+        with self._lock:
+            self._slots[index].add(key)
+
+    def advance(self, now):
+        """推进到 now，返回经过的槽位中登记的键"""
+        target = int(now / self.tick)
+        due = set()
+        with self._lock:
+            # 落后超过一圈时只需扫描一圈
+            start = max(self._position, target - len(self._slots) + 1)
+            for position in range(start, target + 1):
+                slot = self._slots[position % len(self._slots)]
+                due.update(slot)
+                slot.clear()
+            self._position = target + 1
+        return due
+
+
+class MemoryBackend:
+    """
+    进程内实现：单机部署时无需 Redis，语义与 RedisBackend 一致
+    - 按键哈希分段加锁，减少并发请求之间的锁竞争
+    - 过期键由时间轮后台清理，读取时也会检查到期时间
+    """
+
+    def __init__(self, stripes=64, wheel_slots=512, tick=1.0):
+        self._stripes = [(threading.Lock(), {}) for _ in range(stripes)]
+        self._wheel = TimerWheel(wheel_slots, tick)
+        self._reaper = threading.Thread(target=self._reap, name='kv-expiry-wheel', daemon=True)
+        self._reaper.start()
+
+    def _stripe(self, key):
+        return self._stripes[hash(key) % len(self._stripes)]
+
+    def _reap(self):
+        while True:
+            time.sleep(self._wheel.tick)
+            now = time.monotonic()
+            for key in self._wheel.advance(now):
+                lock, data = self._stripe(key)
+                with lock:
+                    entry = data.get(key)
+                    if entry is None:
+                        continue
+                    if entry[1] <= now:
+                        del data[key]
+                    else:
+                        self._wheel.schedule(key, entry[1])
+
+    def hit(self, key, limit, period):
+        """
+        记录一次请求
+        :return: (是否放行, 剩余次数, 窗口重置前的秒数)
+        """
+        now = time.monotonic()
+        lock, data = self._stripe(key)
+        with lock:
+            entry = data.get(key)
+            if entry is None or entry[1] <= now:
+                entry = data[key] = [deque(), 0]
+            log = entry[0]
+            cutoff = now - period
+            while log and log[0] <= cutoff:
+                log.popleft()
+
+            allowed = len(log) < limit
+            if allowed:
+                log.append(now)
+            entry[1] = now + period
+            reset = log[0] + period - now if log else period
+            remaining = limit - len(log)
+        self._wheel.schedule(key, now + period)
+        return allowed, remaining, reset
+
+    def setex(self, key, ttl, value):
+        deadline = time.monotonic() + ttl
+        lock, data = self._stripe(key)
+        with lock:
+            data[key] = [value, deadline]
+        self._wheel.schedule(key, deadline)
+
+    def get(self, key):
+        lock, data = self._stripe(key)
+        with lock:
+            entry = data.get(key)
+            if entry is None or entry[1] <= time.monotonic():
+                return None
+            return entry[0]
+
+    def delete(self, key):
+        lock, data = self._stripe(key)
+        with lock:
+            data.pop(key, None)
+
+    def consume(self, key):
+        """原子地取出并删除（GETDEL 语义）"""
+        lock, data = self._stripe(key)
+        with lock:
+            entry = data.pop(key, None)
+        if entry is None or entry[1] <= time.monotonic():
+            return None
+        return entry[0]
+
+    def setex_many(self, mapping, ttl):
+        for key, value in mapping.items():
+            self.setex(key, ttl, value)
+
+    def get_many(self, keys):
+        return [self.get(key) for key in keys]
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def create_backend(name=None, url=None, pool_size=None, socket_timeout=None, connect_timeout=None):
+    """
+    创建 KV 后端：redis（默认）或 memory（进程内，也可作为测试替身）
+    未传入的参数从 KV_* 环境变量读取；redis 包只在选用 redis 后端时导入
+    """
+    name = name or os.getenv('KV_BACKEND', 'redis')
+    if name == 'memory':
+        return MemoryBackend()
+    if name != 'redis':
+        raise ValueError(f'未知的 KV 后端: {name}')
+
+    import redis
+
+    # 连接池满时阻塞等待空闲连接，而不是无限新建连接
+    pool = redis.BlockingConnectionPool.from_url(
+        url or os.getenv('KV_URL', 'redis://localhost:6379/0'),
+        max_connections=pool_size or int(os.getenv('KV_POOL_SIZE', '50')),
+        timeout=socket_timeout or float(os.getenv('KV_SOCKET_TIMEOUT', '1')),
+        socket_timeout=socket_timeout or float(os.getenv('KV_SOCKET_TIMEOUT', '1')),
+        socket_connect_timeout=connect_timeout or float(os.getenv('KV_CONNECT_TIMEOUT', '1')),
+        health_check_interval=30
+    )
+    return RedisBackend(redis.Redis(connection_pool=pool))
+
+
+def init_backend(app):
+    """按应用配置创建进程内共享的 KV 后端（限流计数和登录 challenge 共用）"""
+    global _backend
+    with _backend_lock:
+        _backend = create_backend(
+            app.config['KV_BACKEND'],
+            url=app.config['KV_URL'],
+            pool_size=app.config['KV_POOL_SIZE'],
+            socket_timeout=app.config['KV_SOCKET_TIMEOUT'],
+            connect_timeout=app.config['KV_CONNECT_TIMEOUT']
+        )
+    return _backend
+
+
+def get_backend():
+    """获取共享的 KV 后端；未经 init_backend 配置时按环境变量创建"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = create_backend()
+    return _backend
@@ -1,42 +1,41 @@
-from flask import request, jsonify
+from flask import request, make_response
 from functools import wraps
-import redis
-import time
-
-# 初始化 Redis 客户端
-redis_client = redis.Redis(host='localhost', port=6379, db=0)
+import math
+from app.middleware.backends import get_backend
+from app.serialization import jsonify
 
 def rate_limit(limit=60, period=60):
     """
-    请求频率限制装饰器
+    请求频率限制装饰器（滑动窗口，按路由和客户端分别计数）
     :param limit: 在指定时间内允许的最大请求数
     :param period: 时间周期（秒）
     """
     def decorator(f):
         @wraps(f)
         def wrapped(*args, **kwargs):
-            # 获取客户端 IP
-            ip = request.remote_addr
-            
-            # 生成 Redis key
-            key = f'rate_limit:{ip}'
-            
-            # 获取当前请求数
-            current = redis_client.get(key)
-            
-            if current is None:
-                # 第一次请求
-                redis_client.setex(key, period, 1)
-            elif int(current) >= limit:
+            # 按路由 + 客户端 IP 生成限流 key
+            key = f'rate_limit:{request.endpoint or f.__name__}:{request.remote_addr}'
+
+            allowed, remaining, reset = get_backend().hit(key, limit, period)
+            reset = max(1, math.ceil(reset))
+            headers = {
+                'RateLimit-Limit': str(limit),
+                'RateLimit-Remaining': str(remaining),
+                'RateLimit-Reset': str(reset)
+            }
+
+            if not allowed:
                 # 超过限制
-                return jsonify({
+                response = make_response(jsonify({
                     'error': 'Too many requests',
-                    'retry_after': redis_client.ttl(key)
-                }), 429
-            else:
-                # 增加请求计数
-                redis_client.incr(key)
-            
-            return f(*args, **kwargs)
+                    'retry_after': reset
+                }), 429)
+                response.headers.update(headers)
+                response.headers['Retry-After'] = str(reset)
+                return response
+
+            response = make_response(f(*args, **kwargs))
+            response.headers.update(headers)
+            return response
         return wrapped
-    return decorator 
\ No newline at end of file
+    return decorator
@@ -1,5 +1,6 @@
 from datetime import datetime
 from . import db
+from .types import CompressedText
 
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -18,10 +19,10 @@ class User(db.Model):
             'name': self.name,
             'email': self.email,
             'wallet_address': self.wallet_address,
-            'created_at': self.created_at.isoformat(),
-            'updated_at': self.updated_at.isoformat(),
+            'created_at': self.created_at,
+            'updated_at': self.updated_at,
             'is_active': self.is_active,
-            'last_login': self.last_login.isoformat() if self.last_login else None
+            'last_login': self.last_login
         }
 
 class UserLog(db.Model):
@@ -29,7 +30,7 @@ class UserLog(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     action = db.Column(db.String(50), nullable=False)  # 操作类型：login, update_profile, change_password 等
     status = db.Column(db.String(20), nullable=False)  # 状态：success, failed
-    details = db.Column(db.Text)  # 详细信息
+    details = db.Column(CompressedText)  # 详细信息
     ip_address = db.Column(db.String(50))  # IP地址
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
@@ -43,7 +44,7 @@ class UserLog(db.Model):
             'status': self.status,
             'details': self.details,
             'ip_address': self.ip_address,
-            'created_at': self.created_at.isoformat()
+            'created_at': self.created_at
         }
 
 class DataFile(db.Model):
@@ -63,7 +64,7 @@ class DataFile(db.Model):
             'filename': self.filename,
             'hash': self.hash,
             'encrypted_path': self.encrypted_path,
-            'created_at': self.created_at.isoformat()
+            'created_at': self.created_at
         }
 
 class DataAuthorization(db.Model):
@@ -85,21 +86,25 @@ class DataAuthorization(db.Model):
             'data_type': self.data_type,
             'authorized_address': self.authorized_address,
             'status': self.status,
-            'created_at': self.created_at.isoformat(),
-            'revoked_at': self.revoked_at.isoformat() if self.revoked_at else None,
-            'expires_at': self.expires_at.isoformat() if self.expires_at else None
+            'created_at': self.created_at,
+            'revoked_at': self.revoked_at,
+            'expires_at': self.expires_at
         }
 
 class Declaration(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    content = db.Column(db.Text, nullable=False)
+    content = db.Column(CompressedText, nullable=False)
     signature = db.Column(db.String(66), nullable=False)  # 0x开头的签名
-    qr_code_path = db.Column(db.String(512))  # 二维码图片路径
+    qr_code_path = db.Column(CompressedText)  # 二维码（base64 data URL）
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     expires_at = db.Column(db.DateTime)  # 可选：声明过期时间
+    anchor_id = db.Column(db.Integer, db.ForeignKey('declaration_anchor.id'), index=True)  # 所属锚定批次，未分批为空
+    leaf_index = db.Column(db.Integer)  # 在批次 Merkle 树中的叶子序号
+    merkle_proof = db.Column(db.Text)  # 包含性证明（JSON 数组，兄弟节点哈希）
 
     user = db.relationship('User', backref=db.backref('declarations', lazy=True))
+    anchor = db.relationship('DeclarationAnchor', backref=db.backref('declarations', lazy=True))
 
     def to_dict(self):
         return {
@@ -108,8 +113,28 @@ class Declaration(db.Model):
             'content': self.content,
             'signature': self.signature,
             'qr_code_path': self.qr_code_path,
-            'created_at': self.created_at.isoformat(),
-            'expires_at': self.expires_at.isoformat() if self.expires_at else None
+            'created_at': self.created_at,
+            'expires_at': self.expires_at
+        }
+
+class DeclarationAnchor(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    merkle_root = db.Column(db.String(66), unique=True, nullable=False)  # 0x开头的 Merkle 根
+    leaf_count = db.Column(db.Integer, nullable=False)
+    tx_hash = db.Column(db.String(66))  # 锚定交易哈希
+    block_number = db.Column(db.Integer)
+    status = db.Column(db.String(20), nullable=False, default='pending', server_default='anchored')  # pending, anchored
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'merkle_root': self.merkle_root,
+            'leaf_count': self.leaf_count,
+            'tx_hash': self.tx_hash,
+            'block_number': self.block_number,
+            'status': self.status,
+            'created_at': self.created_at
         }
 
 class AuthorizationLog(db.Model):
@@ -125,21 +150,25 @@ class AuthorizationLog(db.Model):
             'id': self.id,
             'authorization_id': self.authorization_id,
             'action': self.action,
-            'created_at': self.created_at.isoformat()
+            'created_at': self.created_at
         }
 
 class UserData(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     data_type = db.Column(db.String(50), nullable=False)
-    data_content = db.Column(db.Text, nullable=False)
+    data_content = db.Column(CompressedText, nullable=False)
     signature = db.Column(db.String(256), nullable=True)
     filename = db.Column(db.String(256), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    version = db.Column(db.Integer, nullable=False, server_default='1')  # 乐观并发版本号，每次更新加一
 
     user = db.relationship('User', backref=db.backref('user_data', lazy=True))
 
+    # UPDATE 时带上 WHERE version = 读取时的版本，并发修改会抛出 StaleDataError
+    __mapper_args__ = {'version_id_col': version}
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -148,8 +177,9 @@ class UserData(db.Model):
             'data_content': self.data_content,
             'signature': self.signature,
             'filename': self.filename,
-            'created_at': self.created_at.isoformat(),
-            'updated_at': self.updated_at.isoformat()
+            'created_at': self.created_at,
+            'updated_at': self.updated_at,
+            'version': self.version
         }
 
 class OperationLog(db.Model):
@@ -158,7 +188,7 @@ class OperationLog(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     operation_type = db.Column(db.String(50), nullable=False)  # upload, decrypt 等
-    operation_details = db.Column(db.Text)
+    operation_details = db.Column(CompressedText)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     user = db.relationship('User', backref=db.backref('operation_logs', lazy=True))
@@ -169,5 +199,67 @@ class OperationLog(db.Model):
             'user_id': self.user_id,
             'operation_type': self.operation_type,
             'operation_details': self.operation_details,
-            'created_at': self.created_at.isoformat()
-        } 
\ No newline at end of file
+            'created_at': self.created_at
+        }
+
+class ChainEvent(db.Model):
+    """已索引的 DID 合约事件原始记录，用于重组回滚后重放"""
+    id = db.Column(db.Integer, primary_key=True)
+    block_number = db.Column(db.Integer, nullable=False, index=True)
+    block_hash = db.Column(db.String(66), nullable=False)
+    tx_hash = db.Column(db.String(66), nullable=False)
+    log_index = db.Column(db.Integer, nullable=False)
+    event = db.Column(db.String(50), nullable=False)  # UserRegistered, WalletBound, AuthorizationCreated 等
+    wallet = db.Column(db.String(42), index=True)  # 用户事件对应的钱包地址（小写）
+    auth_id = db.Column(db.Integer, index=True)  # 授权事件对应的授权ID
+    payload = db.Column(db.Text, nullable=False)  # 事件参数（JSON）
+
+    __table_args__ = (db.UniqueConstraint('tx_hash', 'log_index'),)
+
+class ChainUser(db.Model):
+    """由事件物化的链上用户"""
+    wallet = db.Column(db.String(42), primary_key=True)  # 小写地址
+    email = db.Column(db.String(120), nullable=False, index=True)
+    is_active = db.Column(db.Boolean, default=True)
+    block_number = db.Column(db.Integer, nullable=False)
+
+    def to_dict(self):
+        return {
+            'wallet': self.wallet,
+            'email': self.email,
+            'is_active': self.is_active,
+            'block_number': self.block_number
+        }
+
+class ChainAuthorization(db.Model):
+    """由事件物化的链上授权"""
+    auth_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    owner = db.Column(db.String(42), nullable=False)  # 小写地址
+    authorized = db.Column(db.String(42), nullable=False)  # 小写地址
+    data_type = db.Column(db.String(50), nullable=False)
+    expires_at = db.Column(db.Integer, nullable=False)  # 链上时间戳（秒）
+    is_active = db.Column(db.Boolean, default=True)
+    block_number = db.Column(db.Integer, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_chain_authorization_owner', 'owner', 'auth_id'),
+        db.Index('ix_chain_authorization_lookup', 'owner', 'authorized', 'data_type'),
+    )
+
+    def to_dict(self):
+        return {
+            'auth_id': self.auth_id,
+            'owner': self.owner,
+            'authorized': self.authorized,
+            'data_type': self.data_type,
+            'expires_at': self.expires_at,
+            'is_active': self.is_active,
+            'block_number': self.block_number
+        }
+
+class IndexerCheckpoint(db.Model):
+    """事件索引进度"""
+    name = db.Column(db.String(50), primary_key=True)
+    block_number = db.Column(db.Integer, nullable=False)
+    block_hash = db.Column(db.String(66), nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow) 
\ No newline at end of file
@@ -0,0 +1,169 @@
+"""
+按需 CPU 剖析
+- 栈采样：定时抓取所有线程的调用栈，输出折叠栈（flamegraph.pl / speedscope 可直接读取）
+- 请求剖析：对指定端点接下来的 N 个请求启用 cProfile，结果合并后输出
+
+未启用时每个请求只多一次属性判断。多进程部署时只对收到管理请求的 worker 生效。
+"""
+import cProfile
+import io
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+
+from flask import g, request
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f'{frame.f_globals.get("__name__", "?")}:{code.co_name}'
+
+
+def sample_stacks(duration, interval=0.005):
+    """
+    采样所有线程（当前线程除外）的调用栈
+    :return: Counter，键为 ';' 连接的栈（从根到叶），值为采样次数
+    """
+    stacks = Counter()
+    current = threading.get_ident()
+    names = {t.ident: t.name for t in threading.enumerate()}
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == current:
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            labels.append(names.get(thread_id, f'thread-{thread_id}'))
+            stacks[';'.join(reversed(labels))] += 1
+        time.sleep(interval)
+    return stacks
+
+
+def format_collapsed(stacks):
+    """折叠栈文本：每行 '帧;帧;帧 数值'"""
+    return ''.join(f'{stack} {count}\n' for stack, count in stacks.most_common())
+
+
+def _func_label(func):
+    filename, _, name = func
+    if filename == '~':
+        return name  # 内置函数，如 <built-in method ...>
+    return f'{filename.rsplit("/", 1)[-1]}:{name}'
+
+
+def collapse_pstats(stats):
+    """
+    将 cProfile 的调用关系图展开为折叠栈（单位：微秒）
+    同一函数被多个调用方调用时，按各调用方贡献的累计时间比例分摊其下游耗时
+    """
+    callees = {}
+    for func, (_, _, _, _, callers) in stats.stats.items():
+        for caller, (_, _, _, caller_ct) in callers.items():
+            callees.setdefault(caller, []).append((func, caller_ct))
+
+    stacks = Counter()
+
+    def walk(func, path, share):
+        _, _, tt, ct, _ = stats.stats[func]
+        path = path + [_func_label(func)]
+        if tt * share >= 1e-6:
+            stacks[';'.join(path)] += int(tt * share * 1e6)
+        for callee, edge_ct in callees.get(func, ()):
+            if _func_label(callee) in path or not edge_ct:
+                continue  # 跳过递归调用
+            callee_ct = stats.stats[callee][3] or edge_ct
+            walk(callee, path, share * edge_ct / callee_ct)
+
+    roots = [func for func, value in stats.stats.items() if not value[4]]
+    for root in roots:
+        walk(root, [], 1.0)
+    return stacks
+
+
+class RequestProfiler:
+    """对指定端点接下来的 N 个请求启用 cProfile"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.active = False
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.active = False
+            self.endpoint = None
+            self.remaining = 0
+            self.profiled = 0
+            self.stats = None
+
+    def arm(self, endpoint, count):
+        with self._lock:
+            self.endpoint = endpoint
+            self.remaining = count
+            self.profiled = 0
+            self.stats = None
+            self.active = True
+
+    def _claim(self, endpoint):
+        with self._lock:
+            if not self.active or endpoint != self.endpoint or self.remaining <= 0:
+                return False
+            self.remaining -= 1
+            return True
+
+    def _collect(self, profile):
+        with self._lock:
+            if self.stats is None:
+                self.stats = pstats.Stats(profile)
+            else:
+                self.stats.add(profile)
+            self.profiled += 1
+            if self.remaining <= 0:
+                self.active = False
+
+    def before_request(self):
+        if not self.active or not self._claim(request.endpoint):
+            return
+        g.request_profile = cProfile.Profile()
+        g.request_profile.enable()
+
+    def teardown_request(self, exc):
+        profile = g.pop('request_profile', None)
+        if profile is None:
+            return
+        profile.disable()
+        self._collect(profile)
+
+    def status(self):
+        return {
+            'active': self.active,
+            'endpoint': self.endpoint,
+            'remaining': self.remaining,
+            'profiled': self.profiled
+        }
+
+    def report(self, fmt='collapsed', limit=50):
+        with self._lock:
+            stats = self.stats
+            if stats is None:
+                return ''
+            if fmt == 'collapsed':
+                return format_collapsed(collapse_pstats(stats))
+            output = io.StringIO()
+            stats.stream = output
+            stats.sort_stats('cumulative').print_stats(limit)
+            return output.getvalue()
+
+
+request_profiler = RequestProfiler()
+
+
+def init_profiling(app):
+    """注册请求剖析钩子"""
+    app.before_request(request_profiler.before_request)
+    app.teardown_request(request_profiler.teardown_request)
@@ -0,0 +1,101 @@
+"""
+公开只读接口（声明验证、健康检查、授权数据读取）的查询与响应逻辑
+Flask 蓝图（同步会话）和 ASGI 入口（异步会话）共用这里的查询语句和响应构造
+"""
+import os
+from datetime import datetime
+
+import jwt
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
+
+from .models import User, Declaration, DataAuthorization, UserData
+from .anchoring import get_anchor_proof
+
+
+def decode_user_id(authorization_header):
+    """从 Authorization 头解析用户 ID，token 缺失或无效时抛出异常"""
+    token = authorization_header.split(' ')[1]  # Bearer token
+    data = jwt.decode(token, os.getenv('SECRET_KEY', 'your-secret-key'), algorithms=['HS256'])
+    return data['user_id']
+
+
+def declaration_query(signature):
+    """按签名查询声明及其所属用户（锚定批次一并加载）"""
+    return (
+        select(Declaration, User)
+        .outerjoin(User, User.id == Declaration.user_id)
+        .options(joinedload(Declaration.anchor))
+        .where(Declaration.signature == signature)
+        .limit(1)
+    )
+
+
+def verify_declaration_response(row):
+    if row is None:
+        return {
+            'isValid': False,
+            'message': '声明不存在'
+        }, 404
+
+    declaration, user = row
+    return {
+        'isValid': True,
+        'message': '验证成功',
+        'details': {
+            'did': f'did:example:{user.wallet_address}',
+            'timestamp': declaration.created_at,
+            'signature': declaration.signature,
+            'content': declaration.content,
+            'anchor': get_anchor_proof(declaration)
+        }
+    }, 200
+
+
+def health_response():
+    return {
+        'status': 'ok',
+        'timestamp': datetime.utcnow()
+    }, 200
+
+
+def authorization_query(data_type, wallet_address):
+    """查询某地址对某类数据的有效授权"""
+    return (
+        select(DataAuthorization)
+        .filter_by(data_type=data_type, authorized_address=wallet_address, status='active')
+        .limit(1)
+    )
+
+
+def user_data_query(user_id, data_type):
+    return select(UserData).filter_by(user_id=user_id, data_type=data_type).limit(1)
+
+
+def check_authorization(authorization, now=None):
+    """
+    检查授权是否可用，不可用时返回错误响应
+    已过期的授权会被标记为 revoked，由调用方提交
+    """
+    if not authorization:
+        return {'error': '未授权访问'}, 403
+
+    now = now or datetime.utcnow()
+    if authorization.expires_at and authorization.expires_at < now:
+        authorization.status = 'revoked'
+        authorization.revoked_at = now
+        return {'error': '授权已过期'}, 403
+    return None
+
+
+def authorized_data_response(user_data):
+    if not user_data:
+        return {
+            'message': '数据不存在',
+            'data': None
+        }, 200
+
+    return {
+        'message': '获取授权数据成功',
+        'data': user_data.to_dict()
+    }, 200
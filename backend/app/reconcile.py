@@ -0,0 +1,196 @@
+import calendar
+import json
+import time
+from datetime import datetime
+from itertools import groupby
+
+import click
+
+from . import db
+from .models import User, DataAuthorization, ChainAuthorization
+
+
+def to_timestamp(dt):
+    """UTC datetime 转为链上时间戳（秒）"""
+    return calendar.timegm(dt.utctimetuple()) if dt else None
+
+
+# 各数据库中按字节比较字符串的排序规则（SQLite 默认即为 BINARY）
+BINARY_COLLATIONS = {'postgresql': 'C', 'mysql': 'utf8mb4_bin'}
+
+
+def binary_order(expression):
+    """
+    按字节序排序，与 Python 字符串比较的顺序一致
+    数据库默认的 locale 排序规则下大小写、非 ASCII 字符的顺序不同，归并比较会误报差异
+    """
+    collation = BINARY_COLLATIONS.get(db.engine.dialect.name)
+    return expression.collate(collation) if collation else expression
+
+
+def iter_sql_grants(now, batch_size=1000):
+    """按 (owner, authorized, data_type) 的字节序流式读取数据库中有效的授权"""
+    owner = db.func.lower(User.wallet_address)
+    authorized = db.func.lower(DataAuthorization.authorized_address)
+    query = db.session.query(
+        owner, authorized, DataAuthorization.data_type,
+        DataAuthorization.id, DataAuthorization.expires_at
+    ).join(User, User.id == DataAuthorization.user_id)\
+        .filter(DataAuthorization.status == 'active')\
+        .filter(db.or_(DataAuthorization.expires_at.is_(None), DataAuthorization.expires_at > now))\
+        .order_by(binary_order(owner), binary_order(authorized), binary_order(DataAuthorization.data_type),
+                  DataAuthorization.id)\
+        .yield_per(batch_size)
+    for row in query:
+        yield (row[0], row[1], row[2]), row[3], to_timestamp(row[4])
+
+
+def iter_chain_grants(now, batch_size=1000):
+    """按 (owner, authorized, data_type) 的字节序流式读取事件索引中有效的链上授权"""
+    query = db.session.query(
+        ChainAuthorization.owner, ChainAuthorization.authorized, ChainAuthorization.data_type,
+        ChainAuthorization.auth_id, ChainAuthorization.expires_at
+    ).filter(ChainAuthorization.is_active.is_(True))\
+        .filter(ChainAuthorization.expires_at > to_timestamp(now))\
+        .order_by(binary_order(ChainAuthorization.owner), binary_order(ChainAuthorization.authorized),
+                  binary_order(ChainAuthorization.data_type), ChainAuthorization.auth_id)\
+        .yield_per(batch_size)
+    for row in query:
+        yield (row[0], row[1], row[2]), row[3], row[4]
+
+
+def _grouped(rows):
+    """将同一键下的多条授权合并为 (键, [ID], 最晚过期时间)"""
+    previous = None
+    for key, group in groupby(rows, key=lambda row: row[0]):
+        # 归并比较依赖两侧顺序一致，顺序不对时停止，避免误报差异并在链上"修复"
+        if previous is not None and key < previous:
+            raise RuntimeError(f'授权未按字节序排列: {key} 出现在 {previous} 之后')
+        previous = key
+        group = list(group)
+        expires = [row[2] for row in group]
+        yield key, [row[1] for row in group], None if None in expires else max(expires)
+
+
+def diff_authorizations(now=None, expiry_tolerance=120, batch_size=1000):
+    """
+    归并比较数据库授权与链上授权，时间复杂度与授权数量成线性
+    :param expiry_tolerance: 过期时间允许的误差（秒），用于吸收出块时间差
+    :return: {'missing': [...], 'extra': [...], 'mismatched': [...]}
+      missing    数据库有效但链上不存在
+      extra      链上有效但数据库不存在
+      mismatched 两边都存在但过期时间不一致
+    """
+    now = now or datetime.utcnow()
+    sql_side = _grouped(iter_sql_grants(now, batch_size))
+    chain_side = _grouped(iter_chain_grants(now, batch_size))
+    result = {'missing': [], 'extra': [], 'mismatched': []}
+
+    def describe(key):
+        return {'owner': key[0], 'authorized': key[1], 'data_type': key[2]}
+
+    sql_item = next(sql_side, None)
+    chain_item = next(chain_side, None)
+    while sql_item or chain_item:
+        if chain_item is None or (sql_item and sql_item[0] < chain_item[0]):
+            key, ids, expires_at = sql_item
+            result['missing'].append(dict(describe(key), authorization_ids=ids, expires_at=expires_at))
+            sql_item = next(sql_side, None)
+        elif sql_item is None or chain_item[0] < sql_item[0]:
+            key, auth_ids, expires_at = chain_item
+            result['extra'].append(dict(describe(key), auth_ids=auth_ids, chain_expires_at=expires_at))
+            chain_item = next(chain_side, None)
+        else:
+            key, ids, expires_at = sql_item
+            _, auth_ids, chain_expires_at = chain_item
+            if expires_at is not None and abs(expires_at - chain_expires_at) > expiry_tolerance:
+                result['mismatched'].append(dict(
+                    describe(key),
+                    authorization_ids=ids,
+                    auth_ids=auth_ids,
+                    expires_at=expires_at,
+                    chain_expires_at=chain_expires_at
+                ))
+            sql_item = next(sql_side, None)
+            chain_item = next(chain_side, None)
+
+    return result
+
+
+def repair_chain(manager, diff, now=None):
+    """
+    以数据库为准修复链上授权，所有交易通过提交队列并发发送
+    - missing: 在链上创建授权
+    - extra: 撤销链上授权
+    - mismatched: 撤销旧授权后按数据库过期时间重新创建
+    合约要求由授权所有者发送交易，只有所有者账户在节点上解锁（eth_accounts 中可见，
+    如 Ganache / eth-tester 的测试账户）时才能修复，其余条目跳过
+    :return: (发送的交易数, 跳过的条目列表)
+    """
+    now = to_timestamp(now or datetime.utcnow())
+    unlocked = {account.lower() for account in manager.w3.eth.accounts}
+    futures = []
+    skipped = []
+
+    def create(item):
+        owner = manager.w3.to_checksum_address(item['owner'])
+        authorized = manager.w3.to_checksum_address(item['authorized'])
+        # 数据库中无过期时间的授权按一年处理
+        expires_in = (item['expires_at'] - now) if item['expires_at'] else 365 * 24 * 3600
+        if expires_in > 0:
+            futures.append(manager.create_authorization(
+                owner, authorized, item['data_type'], expires_in, wait=False
+            ))
+
+    def revoke(item):
+        owner = manager.w3.to_checksum_address(item['owner'])
+        for auth_id in item['auth_ids']:
+            futures.append(manager.revoke_authorization(owner, auth_id, wait=False))
+
+    for kind in ('missing', 'extra', 'mismatched'):
+        for item in diff[kind]:
+            if item['owner'] not in unlocked:
+                skipped.append(dict(item, kind=kind))
+                continue
+            if kind != 'missing':
+                revoke(item)
+            if kind != 'extra':
+                create(item)
+
+    for future in futures:
+        future.result()
+    return len(futures), skipped
+
+
+def init_reconcile(app):
+    """注册授权对账命令"""
+    @app.cli.command('reconcile-authorizations')
+    @click.option('--repair', is_flag=True,
+                  help='以数据库为准修复链上授权（交易由授权所有者发送，需要节点解锁所有者账户）')
+    @click.option('--no-sync', is_flag=True, help='跳过对账前的事件索引同步')
+    @click.option('--batch-size', default=1000, show_default=True, help='流式读取的批大小')
+    @click.option('--tolerance', default=120, show_default=True, help='过期时间允许误差（秒）')
+    @click.option('--output', type=click.Path(), help='将差异写入 JSON 文件')
+    def reconcile_authorizations_command(repair, no_sync, batch_size, tolerance, output):
+        """对比数据库授权与链上授权"""
+        from .indexer import create_indexer
+
+        started = time.time()
+        if not no_sync:
+            create_indexer(app).sync()
+
+        now = datetime.utcnow()
+        diff = diff_authorizations(now, expiry_tolerance=tolerance, batch_size=batch_size)
+        print(f'缺失 {len(diff["missing"])} 条，多余 {len(diff["extra"])} 条，'
+              f'过期时间不一致 {len(diff["mismatched"])} 条，耗时 {time.time() - started:.2f}s')
+
+        if output:
+            with open(output, 'w') as f:
+                json.dump(diff, f, indent=2, ensure_ascii=False)
+
+        if repair:
+            from utils.contract import ContractManager
+            sent, skipped = repair_chain(ContractManager(), diff, now)
+            print(f'已提交 {sent} 笔修复交易')
+            if skipped:
+                print(f'跳过 {len(skipped)} 条：所有者账户未在节点解锁，需由所有者自行签名修复')
@@ -1,4 +1,4 @@
-from flask import Blueprint, request, jsonify, send_file, current_app
+from flask import Blueprint, request, send_file, current_app
 from werkzeug.security import generate_password_hash, check_password_hash
 import jwt
 from datetime import datetime, timedelta
@@ -11,7 +11,13 @@ from werkzeug.utils import secure_filename
 import qrcode
 import io
 import base64
-from .utils import generate_signature, verify_signature, encrypt_data, decrypt_data
+from .utils import generate_signature, verify_signature, encrypt_data, decrypt_data, apply_merge_patch
+from . import public_api
+from .serialization import jsonify, dumps, loads
+from .conditional import conditional_get, make_etag, if_match
+from .middleware.rate_limit import rate_limit
+from utils.metrics import OPERATION_SECONDS
+from sqlalchemy.orm.exc import StaleDataError
 import uuid
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/api/v1/auth')
@@ -28,6 +34,14 @@ def xor_encrypt(data: bytes) -> bytes:
 def sha256_hex(data: bytes) -> str:
     return '0x' + hashlib.sha256(data).hexdigest()
 
+def hash_user_password(password: str) -> str:
+    with OPERATION_SECONDS.time('password_hash'):
+        return generate_password_hash(password, method='pbkdf2:sha256')
+
+def check_user_password(password_hash: str, password: str) -> bool:
+    with OPERATION_SECONDS.time('password_check'):
+        return check_password_hash(password_hash, password)
+
 def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
@@ -36,9 +50,7 @@ def token_required(f):
             return jsonify({'error': '缺少认证token'}), 401
             
         try:
-            token = token.split(' ')[1]  # Bearer token
-            data = jwt.decode(token, os.getenv('SECRET_KEY', 'your-secret-key'), algorithms=['HS256'])
-            current_user = User.query.get(data['user_id'])
+            current_user = User.query.get(public_api.decode_user_id(token))
             if not current_user:
                 return jsonify({'error': '用户不存在'}), 401
             if not current_user.is_active:
@@ -61,7 +73,38 @@ def log_user_action(user_id, action, status, details=None):
     db.session.add(log)
     db.session.commit()
 
+# 条件 GET 的版本查询：只读取聚合值，不加载数据行
+def profile_version(current_user):
+    return (current_user.id, current_user.updated_at), current_user.updated_at
+
+def files_version(current_user):
+    count, max_id, last_created = db.session.query(
+        db.func.count(DataFile.id), db.func.max(DataFile.id), db.func.max(DataFile.created_at)
+    ).filter(DataFile.user_id == current_user.id).one()
+    return (count, max_id, last_created), last_created
+
+def authorizations_version(current_user):
+    count, max_id, last_created, last_revoked = db.session.query(
+        db.func.count(DataAuthorization.id), db.func.max(DataAuthorization.id),
+        db.func.max(DataAuthorization.created_at), db.func.max(DataAuthorization.revoked_at)
+    ).filter(DataAuthorization.user_id == current_user.id).one()
+    last_modified = max((t for t in (last_created, last_revoked) if t), default=None)
+    return (count, max_id, last_created, last_revoked), last_modified
+
+def user_data_etag_parts(data_type, user_data):
+    if not user_data:
+        return data_type, None, None
+    return data_type, user_data.id, user_data.version
+
+def user_data_version(current_user, data_type):
+    row = db.session.query(UserData.id, UserData.version, UserData.updated_at).filter_by(
+        user_id=current_user.id,
+        data_type=data_type
+    ).first()
+    return user_data_etag_parts(data_type, row), row.updated_at if row else None
+
 @auth_bp.route('/register', methods=['POST'])
+@rate_limit(limit=5, period=300)  # 5分钟内最多5次注册请求
 def register():
     try:
         data = request.get_json()
@@ -96,7 +139,7 @@ def register():
         new_user = User(
             name=data['name'],
             email=data['email'],
-            password_hash=generate_password_hash(data['password'], method='pbkdf2:sha256'),
+            password_hash=hash_user_password(data['password']),
             wallet_address=data['wallet_address'],
             is_active=True
         )
@@ -126,6 +169,7 @@ def register():
         }), 500
 
 @auth_bp.route('/login', methods=['POST'])
+@rate_limit(limit=10, period=300)  # 5分钟内最多10次登录请求
 def login():
     try:
         data = request.get_json()
@@ -136,7 +180,7 @@ def login():
             
         # 查找用户
         user = User.query.filter_by(email=data['email']).first()
-        if not user or not check_password_hash(user.password_hash, data['password']):
+        if not user or not check_user_password(user.password_hash, data['password']):
             log_user_action(user.id if user else None, 'login', 'failed', '登录失败：邮箱或密码错误')
             return jsonify({'error': '邮箱或密码错误'}), 401
             
@@ -164,6 +208,7 @@ def login():
 
 @auth_bp.route('/profile', methods=['GET'])
 @token_required
+@conditional_get(profile_version)
 def get_profile(current_user):
     return jsonify({
         'message': '获取用户信息成功',
@@ -197,6 +242,7 @@ def update_profile(current_user):
         return jsonify({'error': f'更新用户信息失败: {str(e)}'}), 500
 
 @auth_bp.route('/profile/password', methods=['PUT'])
+@rate_limit(limit=5, period=300)  # 5分钟内最多5次修改密码请求
 @token_required
 def change_password(current_user):
     try:
@@ -207,12 +253,12 @@ def change_password(current_user):
             return jsonify({'error': '缺少必要字段'}), 400
             
         # 验证旧密码
-        if not check_password_hash(current_user.password_hash, data['old_password']):
+        if not check_user_password(current_user.password_hash, data['old_password']):
             log_user_action(current_user.id, 'change_password', 'failed', '修改密码失败：旧密码错误')
             return jsonify({'error': '旧密码错误'}), 401
             
         # 更新密码
-        current_user.password_hash = generate_password_hash(data['new_password'], method='pbkdf2:sha256')
+        current_user.password_hash = hash_user_password(data['new_password'])
         db.session.commit()
         
         # 记录操作日志
@@ -227,6 +273,7 @@ def change_password(current_user):
         return jsonify({'error': f'修改密码失败: {str(e)}'}), 500
 
 @auth_bp.route('/profile/wallet', methods=['PUT'])
+@rate_limit(limit=5, period=300)  # 5分钟内最多5次钱包绑定请求
 @token_required
 def update_wallet(current_user):
     try:
@@ -336,7 +383,7 @@ def download_file(current_user):
         encrypted = f.read()
     raw = xor_encrypt(encrypted)
     return send_file(
-        path_or_file=bytes(raw),
+        io.BytesIO(raw),
         as_attachment=True,
         download_name=data_file.filename,
         mimetype='application/octet-stream'
@@ -344,6 +391,7 @@ def download_file(current_user):
 
 @auth_bp.route('/api/data/list', methods=['GET'])
 @token_required
+@conditional_get(files_version)
 def list_files(current_user):
     files = DataFile.query.filter_by(user_id=current_user.id).order_by(DataFile.created_at.desc()).all()
     return jsonify({'files': [f.to_dict() for f in files]}), 200
@@ -407,6 +455,7 @@ def create_authorization(current_user):
 
 @auth_bp.route('/authorizations', methods=['GET'])
 @token_required
+@conditional_get(authorizations_version)
 def get_authorizations(current_user):
     try:
         authorizations = DataAuthorization.query.filter_by(user_id=current_user.id)\
@@ -496,15 +545,16 @@ def create_declaration(current_user):
         signature = f'0x{content_hash}'
         
         # 生成二维码
-        qr = qrcode.QRCode(version=1, box_size=10, border=5)
-        qr.add_data(f'http://localhost:3000/verify?signature={signature}')  # 修改为实际的前端URL
-        qr.make(fit=True)
-        qr_img = qr.make_image(fill_color="black", back_color="white")
-        
-        # 将二维码转换为base64
-        buffered = io.BytesIO()
-        qr_img.save(buffered, format="PNG")
-        qr_base64 = base64.b64encode(buffered.getvalue()).decode()
+        with OPERATION_SECONDS.time('qr_render'):
+            qr = qrcode.QRCode(version=1, box_size=10, border=5)
+            qr.add_data(f'http://localhost:3000/verify?signature={signature}')  # 修改为实际的前端URL
+            qr.make(fit=True)
+            qr_img = qr.make_image(fill_color="black", back_color="white")
+            
+            # 将二维码转换为base64
+            buffered = io.BytesIO()
+            qr_img.save(buffered, format="PNG")
+            qr_base64 = base64.b64encode(buffered.getvalue()).decode()
         
         # 创建声明记录
         declaration = Declaration(
@@ -531,27 +581,9 @@ def create_declaration(current_user):
 @auth_bp.route('/declarations/<signature>/verify', methods=['GET'])
 def verify_declaration(signature):
     try:
-        declaration = Declaration.query.filter_by(signature=signature).first()
-        
-        if not declaration:
-            return jsonify({
-                'isValid': False,
-                'message': '声明不存在'
-            }), 404
-            
-        # 获取用户信息
-        user = User.query.get(declaration.user_id)
-        
-        return jsonify({
-            'isValid': True,
-            'message': '验证成功',
-            'details': {
-                'did': f'did:example:{user.wallet_address}',
-                'timestamp': declaration.created_at.isoformat(),
-                'signature': declaration.signature,
-                'content': declaration.content
-            }
-        }), 200
+        row = db.session.execute(public_api.declaration_query(signature)).first()
+        body, status = public_api.verify_declaration_response(row)
+        return jsonify(body), status
         
     except Exception as e:
         return jsonify({'error': f'验证声明失败: {str(e)}'}), 500
@@ -579,6 +611,7 @@ def get_declaration_qr(signature):
 
 @auth_bp.route('/user-data/<data_type>', methods=['GET'])
 @token_required
+@conditional_get(user_data_version, weak=False)
 def get_user_data(current_user, data_type):
     try:
         user_data = UserData.query.filter_by(
@@ -645,54 +678,108 @@ def update_user_data(current_user, data_type):
         db.session.rollback()
         return jsonify({'error': f'更新数据失败: {str(e)}'}), 500
 
-@auth_bp.route('/authorized-data/<data_type>', methods=['GET'])
+@auth_bp.route('/user-data/<data_type>', methods=['PATCH'])
 @token_required
-def get_authorized_data(current_user, data_type):
+def patch_user_data(current_user, data_type):
+    """
+    按 RFC 7386 merge patch 局部更新数据（Content-Type: application/merge-patch+json）
+    If-Match 携带 GET 返回的 ETag 时，数据已被修改则返回 412
+    """
     try:
-        # 验证授权
-        authorization = DataAuthorization.query.filter_by(
-            data_type=data_type,
-            authorized_address=current_user.wallet_address,
-            status='active'
-        ).first()
-        
-        if not authorization:
-            return jsonify({'error': '未授权访问'}), 403
+        if not request.is_json:
+            return jsonify({'error': '请使用 application/merge-patch+json'}), 415
+        patch = request.get_json(silent=True)
+        if not isinstance(patch, dict):
+            return jsonify({'error': '补丁必须是 JSON 对象'}), 400
             
-        # 检查授权是否过期
-        if authorization.expires_at and authorization.expires_at < datetime.utcnow():
-            # 更新授权状态为已过期
-            authorization.status = 'revoked'
-            authorization.revoked_at = datetime.utcnow()
-            db.session.commit()
-            return jsonify({'error': '授权已过期'}), 403
+        # 验证数据类型
+        if data_type not in ['identity', 'profile', 'credentials']:
+            return jsonify({'error': '无效的数据类型'}), 400
             
-        # 获取授权数据
         user_data = UserData.query.filter_by(
-            user_id=authorization.user_id,
+            user_id=current_user.id,
             data_type=data_type
         ).first()
         
-        if not user_data:
-            return jsonify({
-                'message': '数据不存在',
-                'data': None
-            }), 200
+        if request.if_match and not (user_data and if_match(
+                make_etag(*user_data_etag_parts(data_type, user_data)))):
+            return jsonify({'error': '数据已被修改，请重新获取后再试'}), 412
             
-        return jsonify({
-            'message': '获取授权数据成功',
+        if user_data:
+            try:
+                current = loads(user_data.data_content)
+            except ValueError:
+                return jsonify({'error': '现有数据不是 JSON，无法合并'}), 409
+        else:
+            current = {}
+            
+        merged = apply_merge_patch(current, patch)
+        
+        status = 200
+        # 内容没有变化时不写库
+        if not user_data or merged != current:
+            if user_data:
+                user_data.data_content = dumps(merged).decode()
+            else:
+                user_data = UserData(
+                    user_id=current_user.id,
+                    data_type=data_type,
+                    data_content=dumps(merged).decode()
+                )
+                db.session.add(user_data)
+                status = 201
+            db.session.commit()
+            
+            # 记录操作日志
+            log_user_action(current_user.id, 'patch_user_data', 'success',
+                           f'局部更新{data_type}数据成功')
+        
+        response = jsonify({
+            'message': '更新数据成功',
             'data': user_data.to_dict()
-        }), 200
+        })
+        response.status_code = status
+        response.set_etag(make_etag(*user_data_etag_parts(data_type, user_data)))
+        return response
+        
+    except StaleDataError:
+        db.session.rollback()
+        return jsonify({'error': '数据已被修改，请重新获取后再试'}), 412
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'更新数据失败: {str(e)}'}), 500
+
+@auth_bp.route('/authorized-data/<data_type>', methods=['GET'])
+@token_required
+def get_authorized_data(current_user, data_type):
+    try:
+        # 验证授权
+        authorization = db.session.execute(
+            public_api.authorization_query(data_type, current_user.wallet_address)
+        ).scalars().first()
+        
+        error = public_api.check_authorization(authorization)
+        if error:
+            # 过期授权已被标记为 revoked
+            db.session.commit()
+            body, status = error
+            return jsonify(body), status
+            
+        # 获取授权数据
+        user_data = db.session.execute(
+            public_api.user_data_query(authorization.user_id, data_type)
+        ).scalars().first()
+        
+        body, status = public_api.authorized_data_response(user_data)
+        return jsonify(body), status
         
     except Exception as e:
         return jsonify({'error': f'获取授权数据失败: {str(e)}'}), 500
 
 @auth_bp.route('/health', methods=['GET'])
 def health_check():
-    return jsonify({
-        'status': 'ok',
-        'timestamp': datetime.utcnow().isoformat()
-    }), 200
+    body, status = public_api.health_response()
+    return jsonify(body), status
 
 @auth_bp.errorhandler(404)
 def not_found(error):
@@ -720,7 +807,8 @@ def upload_file(current_user):
         file_content = file.read()
         file_hash = hashlib.sha256(file_content).hexdigest()[:16]
         file_b64 = base64.b64encode(file_content).decode('utf-8')
-        encrypted_data = encrypt_data(file_b64)
+        with OPERATION_SECONDS.time('encrypt'):
+            encrypted_data = encrypt_data(file_b64)
         user_data = UserData(
             user_id=current_user.id,
             data_type='file',
@@ -752,7 +840,8 @@ def decrypt_user_data(current_user):
         return jsonify({'error': '未找到加密数据'}), 404
 
     try:
-        decrypted_b64 = decrypt_data(user_data.data_content)
+        with OPERATION_SECONDS.time('decrypt'):
+            decrypted_b64 = decrypt_data(user_data.data_content)
         file_content = base64.b64decode(decrypted_b64)
         return jsonify({
             'message': '数据解密成功',
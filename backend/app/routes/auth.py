@@ -1,23 +1,25 @@
 from flask import Blueprint, request, jsonify
 from werkzeug.security import generate_password_hash, check_password_hash
 from app.models.user import User, UserActionLog
-from app.utils.crypto import CryptoUtils, hash_password
+from app.utils.crypto import CryptoUtils, hash_password, SESSION_KEY_TTL
 from app.middleware.rate_limit import rate_limit
+from app.middleware.backends import get_backend
+from app.utils.contract import get_contract, get_web3, get_accounts, get_tx_submitter
 from app import db
 import jwt
 from datetime import datetime, timedelta
 import os
-import redis
+import json
+import secrets
 from web3 import Web3
+from eth_account import Account
 from eth_account.messages import encode_defunct
-from pathlib import Path
-import json
-
-# 初始化 Redis 客户端
-redis_client = redis.Redis(host='localhost', port=6379, db=0)
 
 auth_bp = Blueprint('auth', __name__)
 
+# 登录会话（challenge）有效期（秒）
+LOGIN_SESSION_TTL = 300
+
 def validate_email(email: str) -> bool:
     """验证邮箱格式"""
     import re
@@ -56,28 +58,19 @@ def register():
         contract = get_contract()
         w3 = get_web3()
 
-        # 从配置文件获取测试账户
-        config_path = Path(__file__).parent.parent.parent / 'config' / 'ganache_accounts.json'
-        with open(config_path) as f:
-            config = json.load(f)
-            test_accounts = config['accounts']
+        # 获取测试账户（已由链客户端缓存）
+        test_accounts = get_accounts()
 
         # 使用第一个测试账户作为交易发送者
         sender_account = test_accounts[0]
         
-        # 构建注册交易
-        tx = contract.functions.registerUser(email).build_transaction({
-            'from': sender_account,
-            'nonce': w3.eth.get_transaction_count(sender_account),
-            'gas': 2000000,
-            'gasPrice': w3.eth.gas_price
-        })
-
-        # 发送交易
-        tx_hash = w3.eth.send_transaction(tx)
-        
-        # 等待交易确认
-        tx_receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
+        # 通过共享提交队列发送注册交易（nonce 在本地分配），并等待回执
+        # gas 由节点估算，实际消耗记录在 chain_tx_gas_used 指标中
+        tx_receipt = get_tx_submitter().submit(
+            contract.functions.registerUser(email),
+            sender_account,
+            {'gasPrice': w3.eth.gas_price}
+        ).result()
 
         if tx_receipt['status'] != 1:
             return jsonify({'error': '链上注册失败'}), 500
@@ -89,6 +82,9 @@ def register():
             wallet_address=wallet_address,
             is_wallet_bound=True
         )
+        # 密钥对从预生成池中取，私钥用登录密码加密保存
+        private_key, user.public_key = CryptoUtils.generate_key_pair()
+        user.encrypted_private_key = CryptoUtils.encrypt_private_key(private_key, password)
         db.session.add(user)
 
         # 记录操作日志
@@ -129,19 +125,21 @@ def login():
     if not user or not check_password_hash(user.password, data['password']):
         return jsonify({'error': 'Invalid email or password'}), 401
     
-    # 生成 challenge
+    # 生成 challenge，并绑定到服务端登录会话（5 分钟过期）
+    # 第二步凭会话 ID 完成签名验证，无需再次校验密码
     challenge = CryptoUtils.generate_challenge()
-    
-    # 存储 challenge 到 Redis，设置 5 分钟过期
-    redis_client.setex(
-        f'challenge:{user.id}',
-        300,  # 5分钟
-        challenge
+    login_session = secrets.token_urlsafe(32)
+    get_backend().setex(
+        f'login_session:{login_session}',
+        LOGIN_SESSION_TTL,
+        json.dumps({'user_id': user.id, 'challenge': challenge})
     )
     
     return jsonify({
         'message': 'Login successful',
-        'challenge': challenge
+        'challenge': challenge,
+        'login_session': login_session,
+        'expires_in': LOGIN_SESSION_TTL
     }), 200
 
 @auth_bp.route('/verify-signature', methods=['POST'])
@@ -150,44 +148,40 @@ def verify_signature():
     data = request.get_json()
     
     # 验证必要字段
-    if not all(k in data for k in ['email', 'password', 'challenge', 'signature', 'wallet_address']):
+    if not all(k in data for k in ['login_session', 'challenge', 'signature', 'wallet_address']):
         return jsonify({'error': 'Missing required fields'}), 400
     
-    user = User.query.filter_by(email=data['email']).first()
+    # 取出并作废登录会话（原子操作，同一 challenge 只能提交一次）
+    session = get_backend().consume(f'login_session:{data["login_session"]}')
+    if not session:
+        return jsonify({'error': 'Challenge expired or not found'}), 400
+    session = json.loads(session)
     
-    if not user or not check_password_hash(user.password, data['password']):
-        return jsonify({'error': 'Invalid email or password'}), 401
+    # 验证 challenge 是否匹配
+    if session['challenge'] != data['challenge']:
+        return jsonify({'error': 'Invalid challenge'}), 400
+    
+    user = User.query.get(session['user_id'])
+    if not user:
+        return jsonify({'error': 'User not found'}), 404
     
     # 验证钱包地址
     if user.wallet_address != data['wallet_address']:
         return jsonify({'error': 'Wallet address mismatch'}), 401
     
-    # 从 Redis 获取 challenge
-    stored_challenge = redis_client.get(f'challenge:{user.id}')
-    if not stored_challenge:
-        return jsonify({'error': 'Challenge expired or not found'}), 400
-    
-    stored_challenge = stored_challenge.decode('utf-8')
-    
-    # 验证 challenge 是否匹配
-    if stored_challenge != data['challenge']:
-        return jsonify({'error': 'Invalid challenge'}), 400
-    
     try:
         # 验证签名
-        message = encode_defunct(text=stored_challenge)
-        recovered_address = Web3().eth.account.recover_message(message, signature=data['signature'])
+        message = encode_defunct(text=session['challenge'])
+        recovered_address = Account.recover_message(message, signature=data['signature'])
         
         if recovered_address.lower() != data['wallet_address'].lower():
             return jsonify({'error': 'Invalid signature'}), 401
         
-        # 删除已使用的 challenge
-        redis_client.delete(f'challenge:{user.id}')
-        
-        # 生成 JWT token
+        # 生成 JWT token（sid 标识会话，签名时据此缓存解密后的私钥，登出时清除）
         token = jwt.encode(
             {
                 'user_id': user.id,
+                'sid': secrets.token_urlsafe(32),
                 'exp': datetime.utcnow() + timedelta(days=1)
             },
             os.getenv('SECRET_KEY', 'your-secret-key'),
@@ -201,6 +195,66 @@ def verify_signature():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def decode_session_token():
+    """解析 Bearer token，返回 (payload, 错误响应)"""
+    auth_header = request.headers.get('Authorization', '')
+    if not auth_header.startswith('Bearer '):
+        return None, (jsonify({'error': 'Token is missing'}), 401)
+    
+    try:
+        payload = jwt.decode(
+            auth_header[len('Bearer '):],
+            os.getenv('SECRET_KEY', 'your-secret-key'),
+            algorithms=['HS256']
+        )
+    except jwt.InvalidTokenError:
+        return None, (jsonify({'error': 'Invalid token'}), 401)
+    
+    if not payload.get('sid') or get_backend().get(f'session_revoked:{payload["sid"]}'):
+        return None, (jsonify({'error': 'Session has ended'}), 401)
+    return payload, None
+
+@auth_bp.route('/sign', methods=['POST'])
+@rate_limit(limit=30, period=60)  # 每分钟最多30次签名请求
+def sign_message():
+    payload, error = decode_session_token()
+    if error:
+        return error
+    
+    data = request.get_json() or {}
+    if 'message' not in data:
+        return jsonify({'error': 'Missing required fields'}), 400
+    
+    # 本进程中该会话的私钥已解锁时直接签名，不再重复 PBKDF2
+    signature = CryptoUtils.sign_message_for_session(payload['sid'], data['message'])
+    if signature is None:
+        # 会话首次签名（或请求落到尚未解锁的 worker）：用密码解锁一次，之后在 SESSION_KEY_TTL 内免密
+        if 'password' not in data:
+            return jsonify({'error': 'Password required to unlock signing key'}), 401
+        user = User.query.get(payload['user_id'])
+        if not user:
+            return jsonify({'error': 'User not found'}), 404
+        try:
+            CryptoUtils.unlock_private_key(payload['sid'], user.encrypted_private_key, data['password'])
+        except Exception:
+            # 密码错误时 AES-GCM 校验失败
+            return jsonify({'error': 'Invalid password'}), 401
+        signature = CryptoUtils.sign_message_for_session(payload['sid'], data['message'])
+    
+    return jsonify({'signature': signature}), 200
+
+@auth_bp.route('/logout', methods=['POST'])
+def logout():
+    payload, error = decode_session_token()
+    if error:
+        return error
+    
+    # 清除本进程缓存的私钥；其他 worker 中的缓存凭吊销标记拒绝使用，随 TTL 过期
+    CryptoUtils.lock_private_key(payload['sid'])
+    get_backend().setex(f'session_revoked:{payload["sid"]}', int(SESSION_KEY_TTL), '1')
+    
+    return jsonify({'message': 'Logout successful'}), 200
+
 @auth_bp.route('/bind-wallet', methods=['POST'])
 @rate_limit(limit=5, period=300)  # 5分钟内最多5次钱包绑定请求
 def bind_wallet():
@@ -0,0 +1,44 @@
+"""
+orjson 序列化：datetime、date、UUID 原生输出为 ISO 8601 字符串，
+模型的 to_dict() 可以直接返回 datetime，不必逐个调用 isoformat()
+"""
+from decimal import Decimal
+
+import orjson
+from flask import current_app
+from flask.json import JSONEncoder
+
+
+def _default(obj):
+    if isinstance(obj, Decimal):
+        return str(obj)
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+
+def dumps(obj):
+    """序列化为 UTF-8 编码的 JSON 字节串"""
+    return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+def loads(data):
+    return orjson.loads(data)
+
+
+def jsonify(*args, **kwargs):
+    """与 flask.jsonify 用法相同，使用 orjson 序列化"""
+    if args and kwargs:
+        raise TypeError('jsonify() behavior undefined when passed both args and kwargs')
+    if len(args) == 1:
+        data = args[0]
+    else:
+        data = args or kwargs
+    return current_app.response_class(dumps(data), mimetype='application/json')
+
+
+class AppJSONEncoder(JSONEncoder):
+    """flask.json 其余用途（会话等）的编码器，datetime 与 orjson 输出保持一致"""
+
+    def default(self, o):
+        if hasattr(o, 'isoformat'):
+            return o.isoformat()
+        return super().default(o)
@@ -0,0 +1,106 @@
+import fcntl
+import os
+import time
+
+from flask import current_app
+from sqlalchemy import text
+
+from . import db
+
+# 持有后台任务锁的文件句柄（进程退出时自动释放）
+_leader_lock = None
+
+
+def dispose_connections(app):
+    """fork 前关闭主进程持有的数据库连接，避免子进程共享同一连接"""
+    with app.app_context():
+        db.engine.dispose()
+
+
+def reset_after_fork(app):
+    """fork 后重建进程内状态（KV 后端的过期清理线程不会随 fork 复制）"""
+    from .middleware.backends import init_backend
+    init_backend(app)
+
+
+def acquire_background_leader(lock_path):
+    """
+    尝试获取后台任务锁，同一时刻只有一个 worker 能拿到
+    持有锁的 worker 退出（被回收或崩溃）后，下一个启动的 worker 接手
+    """
+    global _leader_lock
+    if _leader_lock is not None:
+        return True
+    handle = open(lock_path, 'w')
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        handle.close()
+        return False
+    handle.write(str(os.getpid()))
+    handle.flush()
+    _leader_lock = handle
+    return True
+
+
+def start_background_workers(app):
+    """按配置启动锚定和索引线程"""
+    from .anchoring import start_anchorer
+    from .indexer import start_indexer
+
+    started = []
+    if app.config['ANCHOR_ENABLED']:
+        start_anchorer(app)
+        started.append('anchoring')
+    if app.config['INDEXER_ENABLED']:
+        start_indexer(app)
+        started.append('indexer')
+    return started
+
+
+def stop_background_workers(app, timeout=None):
+    """
+    worker 退出前停止本进程的后台线程：锚定和索引线程完成当前一轮后退出，
+    再等待提交队列中的在途交易拿到回执，最后停止新区块轮询
+    """
+    from utils.chain_cache import stop_block_watchers
+    from utils.tx_submitter import shutdown_submitters
+
+    stopped = []
+    for name in ('declaration_anchorer', 'chain_indexer'):
+        worker = app.extensions.pop(name, None)
+        if worker is None:
+            continue
+        worker.stop()
+        worker.join(timeout)
+        stopped.append(worker.name)
+    shutdown_submitters(wait=True)
+    stop_block_watchers()
+    return stopped
+
+
+def warm_up(app, paths=('/api/v1/auth/health',)):
+    """
+    worker 开始接收请求前预热：建立数据库连接、检查 KV 后端、
+    对指定路径发起内部请求以完成首个请求的延迟初始化
+    """
+    from .middleware.backends import get_backend
+
+    started = time.perf_counter()
+    with app.app_context():
+        # 按连接池大小预先建立连接
+        pool_size = getattr(db.engine.pool, 'size', lambda: 1)()
+        connections = [db.engine.connect() for _ in range(max(1, pool_size))]
+        for connection in connections:
+            connection.execute(text('SELECT 1'))
+            connection.close()
+
+        try:
+            get_backend().get('warmup')
+        except Exception as e:
+            current_app.logger.warning(f'KV 后端预热失败: {str(e)}')
+
+    client = app.test_client()
+    for path in paths:
+        client.get(path)
+    return time.perf_counter() - started
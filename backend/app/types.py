@@ -0,0 +1,92 @@
+"""
+压缩文本列：超过阈值的值以 zlib 压缩后 base64 存储，读取时自动解压
+
+存储格式（列类型仍为 Text，无需改表）：
+- 未压缩：原文，与旧数据一致
+- 压缩：TAG + 'z:' + base64(zlib(utf-8))
+- 原文恰好以 TAG 开头时存为 TAG + 'r:' + 原文，避免被误认为压缩值
+
+只压缩长度在 MIN_COMPRESS_SIZE 与 MAX_COMPRESS_SIZE 之间、且开头样本可压缩的值；
+其余按原文存储（读取时同样兼容）。
+
+压缩后的值不能在数据库中做 LIKE / 比较 / 长度等运算，只适合按主键或其他列查询后整体读取的字段。
+"""
+import base64
+import zlib
+
+from sqlalchemy.types import Text, TypeDecorator
+
+# 标记前缀（单元分隔符，正常文本中不会出现）
+TAG = '\x1f'
+COMPRESSED_PREFIX = TAG + 'z:'
+RAW_PREFIX = TAG + 'r:'
+
+# 小于该长度（字节）的值不压缩
+MIN_COMPRESS_SIZE = 256
+
+# 大于该长度（字节）的值不压缩：大值通常是上传文件的 base64 密文，几乎不可压缩，
+# 整体压缩一遍只会浪费 CPU 和内存，最后仍按原文存储
+MAX_COMPRESS_SIZE = 1024 * 1024
+
+# 压缩后不小于原文该比例时按原文存储（如已经压缩过的 base64 图片）
+MAX_COMPRESS_RATIO = 0.9
+
+# 较大的值先试压缩开头这么多字节，压缩率不达标就不再压缩全文
+SAMPLE_SIZE = 4096
+
+COMPRESS_LEVEL = 6
+
+
+def _encoded_size(compressed):
+    # base64 编码后的长度
+    return (len(compressed) + 2) // 3 * 4
+
+
+def _worth_compressing(raw):
+    if len(raw) <= SAMPLE_SIZE * 2:
+        return True
+    sample = raw[:SAMPLE_SIZE]
+    return _encoded_size(zlib.compress(sample, COMPRESS_LEVEL)) < len(sample) * MAX_COMPRESS_RATIO
+
+
+def compress_text(value, min_size=MIN_COMPRESS_SIZE, max_size=MAX_COMPRESS_SIZE):
+    """将文本编码为存储格式"""
+    if value is None:
+        return value
+    raw = value.encode('utf-8')
+    if min_size <= len(raw) <= max_size and _worth_compressing(raw):
+        encoded = COMPRESSED_PREFIX + base64.b64encode(zlib.compress(raw, COMPRESS_LEVEL)).decode('ascii')
+        if len(encoded) < len(raw) * MAX_COMPRESS_RATIO:
+            return encoded
+    if value.startswith(TAG):
+        return RAW_PREFIX + value
+    return value
+
+
+def decompress_text(value):
+    """由存储格式还原文本；未带标记的旧数据原样返回"""
+    if value is None or not value.startswith(TAG):
+        return value
+    if value.startswith(COMPRESSED_PREFIX):
+        return zlib.decompress(base64.b64decode(value[len(COMPRESSED_PREFIX):])).decode('utf-8')
+    if value.startswith(RAW_PREFIX):
+        return value[len(RAW_PREFIX):]
+    return value
+
+
+class CompressedText(TypeDecorator):
+    """对应用透明的压缩 Text 列"""
+
+    impl = Text
+    cache_ok = True
+
+    def __init__(self, *args, min_size=MIN_COMPRESS_SIZE, max_size=MAX_COMPRESS_SIZE, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.min_size = min_size
+        self.max_size = max_size
+
+    def process_bind_param(self, value, dialect):
+        return compress_text(value, self.min_size, self.max_size)
+
+    def process_result_value(self, value, dialect):
+        return decompress_text(value)
@@ -36,4 +36,17 @@ def decrypt_data(encrypted_data: str) -> str:
 
 def format_timestamp(timestamp: datetime) -> str:
     """格式化时间戳为北京时间"""
-    return timestamp.strftime('%Y-%m-%d %H:%M:%S') 
\ No newline at end of file
+    return timestamp.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def apply_merge_patch(target, patch):
+    """按 RFC 7386 将 JSON merge patch 应用到 target，返回新对象（不修改 target）"""
+    if not isinstance(patch, dict):
+        return patch
+    result = dict(target) if isinstance(target, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = apply_merge_patch(result.get(key), value)
+    return result
@@ -2,70 +2,157 @@ from web3 import Web3
 import json
 from pathlib import Path
 import os
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from utils.chain_backend import TESTER_BACKEND, compile_did_contract, get_backend_name, get_in_process_chain
+
+CONFIG_PATH = Path(__file__).parent.parent.parent / 'config' / 'ganache_accounts.json'
+CONTRACT_JSON_PATH = Path(__file__).parent.parent.parent / 'contracts' / 'DID.json'
+
+class ChainClient:
+    """
+    进程内共享的链客户端
+    - 配置、ABI 和合约地址只解析一次，文件修改后自动重新加载
+    - 所有请求复用同一个带连接池的 HTTP 会话（keep-alive）
+    """
+
+    def __init__(self, config_path=CONFIG_PATH, contract_path=CONTRACT_JSON_PATH,
+                 pool_size=None, request_timeout=None, check_interval=1.0):
+        self.config_path = Path(config_path)
+        self.contract_path = Path(contract_path)
+        self.pool_size = pool_size or int(os.getenv('WEB3_POOL_SIZE', '20'))
+        self.request_timeout = request_timeout or float(os.getenv('WEB3_REQUEST_TIMEOUT', '30'))
+        self.check_interval = check_interval  # 检查文件修改时间的最小间隔（秒）
+        self.backend = get_backend_name()
+
+        self._lock = threading.Lock()
+        self._checked_at = 0.0
+        self._config_mtime = None
+        self._contract_mtime = None
+        self._rpc_url = None
+        self._accounts = None
+        self._w3 = None
+        self._contract = None
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    @staticmethod
+    def _mtime(path):
+        try:
+            return path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _refresh(self):
+        """按需重新加载已修改的配置文件（调用方持有锁）"""
+        if self.backend == TESTER_BACKEND:
+            # 进程内链不依赖配置文件，账户和合约由测试链提供
+            if self._w3 is None:
+                chain = get_in_process_chain()
+                self._w3 = chain.w3
+                self._accounts = chain.accounts
+                self._contract = chain.contract
+            return
+
+        now = time.monotonic()
+        if self._w3 is not None and now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+
+        config_mtime = self._mtime(self.config_path)
+        if self._w3 is None or config_mtime != self._config_mtime:
+            with open(self.config_path) as f:
+                config = json.load(f)
+            self._config_mtime = config_mtime
+            self._accounts = config['accounts']
+            if config['rpc_url'] != self._rpc_url or self._w3 is None:
+                self._rpc_url = config['rpc_url']
+                self._w3 = Web3(Web3.HTTPProvider(
+                    self._rpc_url,
+                    request_kwargs={'timeout': self.request_timeout},
+                    session=self.session
+                ))
+                # 节点变化后合约实例失效（提交队列按节点共享，见 get_submitter）
+                self._contract = None
+                self._contract_mtime = None
+
+        contract_mtime = self._mtime(self.contract_path)
+        if self._contract is not None and contract_mtime != self._contract_mtime:
+            self._contract = None
+
+    @property
+    def w3(self):
+        with self._lock:
+            self._refresh()
+            return self._w3
+
+    @property
+    def accounts(self):
+        with self._lock:
+            self._refresh()
+            return self._accounts
+
+    @property
+    def contract(self):
+        with self._lock:
+            self._refresh()
+            if self._contract is None:
+                with open(self.contract_path) as f:
+                    contract_json = json.load(f)
+                self._contract_mtime = self._mtime(self.contract_path)
+                self._contract = self._w3.eth.contract(
+                    address=contract_json['networks']['5777']['address'],  # Ganache 网络 ID 为 5777
+                    abi=contract_json['abi']
+                )
+            return self._contract
+
+    @property
+    def tx_submitter(self):
+        from utils.tx_submitter import get_submitter
+        return get_submitter(self.w3)
+
+_chain_client = None
+_chain_client_lock = threading.Lock()
+
+def get_chain_client():
+    """获取进程内唯一的链客户端"""
+    global _chain_client
+    if _chain_client is None:
+        with _chain_client_lock:
+            if _chain_client is None:
+                _chain_client = ChainClient()
+    return _chain_client
 
 def get_web3():
     """获取 Web3 实例"""
-    config_path = Path(__file__).parent.parent.parent / 'config' / 'ganache_accounts.json'
-    with open(config_path) as f:
-        config = json.load(f)
-        rpc_url = config['rpc_url']
-    
-    return Web3(Web3.HTTPProvider(rpc_url))
+    return get_chain_client().w3
 
 def get_contract():
     """获取合约实例"""
-    w3 = get_web3()
-    
-    # 读取合约 ABI
-    contract_path = Path(__file__).parent.parent.parent / 'contracts' / 'DID.json'
-    with open(contract_path) as f:
-        contract_json = json.load(f)
-        contract_abi = contract_json['abi']
-        contract_address = contract_json['networks']['5777']['address']  # Ganache 网络 ID 为 5777
-    
-    return w3.eth.contract(address=contract_address, abi=contract_abi)
+    return get_chain_client().contract
+
+def get_accounts():
+    """获取测试账户列表"""
+    return get_chain_client().accounts
+
+def get_tx_submitter():
+    """获取进程内共享的交易提交队列（本地 nonce 状态必须全进程唯一）"""
+    return get_chain_client().tx_submitter
 
 def deploy_contract():
     """部署合约到 Ganache"""
     w3 = get_web3()
     
-    # 读取合约源码
-    contract_path = Path(__file__).parent.parent.parent / 'contracts' / 'DID.sol'
-    with open(contract_path) as f:
-        contract_source = f.read()
-    
     # 编译合约
-    from solcx import compile_standard, install_solc
-    install_solc('0.8.0')
-    
-    compiled_sol = compile_standard(
-        {
-            "language": "Solidity",
-            "sources": {
-                "DID.sol": {
-                    "content": contract_source
-                }
-            },
-            "settings": {
-                "outputSelection": {
-                    "*": {
-                        "*": ["abi", "metadata", "evm.bytecode", "evm.sourceMap"]
-                    }
-                }
-            }
-        },
-        solc_version="0.8.0"
-    )
-    
-    # 获取字节码和 ABI
-    bytecode = compiled_sol['contracts']['DID.sol']['DID']['evm']['bytecode']['object']
-    abi = compiled_sol['contracts']['DID.sol']['DID']['abi']
+    abi, bytecode = compile_did_contract()
     
     # 获取部署账户
-    config_path = Path(__file__).parent.parent.parent / 'config' / 'ganache_accounts.json'
-    with open(config_path) as f:
-        config = json.load(f)
-        deploy_account = config['accounts'][0]
+    deploy_account = get_accounts()[0]
     
     # 创建合约实例
     contract = w3.eth.contract(abi=abi, bytecode=bytecode)
@@ -84,9 +171,15 @@ def deploy_contract():
     # 等待交易确认
     tx_receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
     
-    # 保存合约信息
+    # 部署交易绕过了提交队列，需要让本地 nonce 重新同步
+    submitter = get_tx_submitter()
+    with submitter.nonces.lock_for(deploy_account):
+        submitter.nonces.reset(deploy_account)
+    
+    # 保存合约信息（保留字节码，之后部署和进程内链不必重新编译）
     contract_info = {
         'abi': abi,
+        'bytecode': bytecode,
         'networks': {
             '5777': {  # Ganache 网络 ID
                 'address': tx_receipt.contractAddress
@@ -94,8 +187,7 @@ def deploy_contract():
         }
     }
     
-    contract_json_path = Path(__file__).parent.parent.parent / 'contracts' / 'DID.json'
-    with open(contract_json_path, 'w') as f:
+    with open(CONTRACT_JSON_PATH, 'w') as f:
         json.dump(contract_info, f, indent=2)
     
     return tx_receipt.contractAddress 
\ No newline at end of file
@@ -8,12 +8,113 @@ from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 from cryptography.hazmat.backends import default_backend
 import base64
 import hashlib
+import hmac
+import queue
 import secrets
+import threading
+import time
+from collections import OrderedDict
+
+# 预生成密钥对池大小（0 关闭，注册时现场生成）
+KEYPAIR_POOL_SIZE = int(os.getenv('KEYPAIR_POOL_SIZE', '32'))
+# 派生密钥缓存有效期（秒）
+KDF_CACHE_TTL = float(os.getenv('KDF_CACHE_TTL', '300'))
+# 会话内解密后私钥的缓存有效期（秒）
+SESSION_KEY_TTL = float(os.getenv('SESSION_KEY_TTL', '900'))
+
+
+class SecretCache:
+    """
+    仅存在内存中的短时缓存（派生密钥、解密后的私钥）
+    条目到期或超出容量即丢弃，不写入任何外部存储
+    """
+
+    def __init__(self, ttl, max_entries=1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        return entry[0] if entry else None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class KeyPairPool:
+    """后台线程预先生成密钥对，应对集中注册；池空时退回现场生成"""
+
+    def __init__(self, size):
+        self.size = size
+        self._pool = queue.Queue(maxsize=size)
+        self._wanted = threading.Event()
+        self._started = False
+        self._lock = threading.Lock()
+
+    def _start(self):
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        threading.Thread(target=self._fill, name='keypair-pool', daemon=True).start()
+
+    def _fill(self):
+        while True:
+            while not self._pool.full():
+                self._pool.put(CryptoUtils.new_key_pair())
+            self._wanted.clear()
+            self._wanted.wait()
+
+    def get(self):
+        if self.size <= 0:
+            return CryptoUtils.new_key_pair()
+        self._start()
+        try:
+            key_pair = self._pool.get_nowait()
+        except queue.Empty:
+            key_pair = CryptoUtils.new_key_pair()
+        self._wanted.set()
+        return key_pair
+
+
+_keypair_pool = KeyPairPool(KEYPAIR_POOL_SIZE)
+_derived_keys = SecretCache(KDF_CACHE_TTL)
+_session_keys = SecretCache(SESSION_KEY_TTL)
+# 缓存键用进程内随机密钥做 HMAC，内存中不保留可逆的密码信息
+_cache_secret = secrets.token_bytes(32)
+
 
 class CryptoUtils:
     @staticmethod
     def generate_key_pair():
-        """生成 ECC 密钥对"""
+        """获取 ECC 密钥对（优先从预生成池中取）"""
+        return _keypair_pool.get()
+
+    @staticmethod
+    def new_key_pair():
+        """现场生成 ECC 密钥对"""
         private_key = ec.generate_private_key(
             ec.SECP256K1(),
             default_backend()
@@ -35,9 +136,19 @@ class CryptoUtils:
 
     @staticmethod
     def derive_key(password: str, salt: bytes = None):
-        """使用 PBKDF2 从密码派生密钥"""
+        """
+        使用 PBKDF2 从密码派生密钥
+        传入已有的盐（解密）时，相同密码和盐在短时间内复用派生结果；
+        新生成的盐（加密）不会再次出现，不缓存
+        """
+        cache_key = None
         if salt is None:
             salt = os.urandom(16)
+        else:
+            cache_key = hmac.new(_cache_secret, salt + password.encode(), hashlib.sha256).digest()
+            key = _derived_keys.get(cache_key)
+            if key is not None:
+                return key, salt
         
         kdf = PBKDF2HMAC(
             algorithm=hashes.SHA256(),
@@ -48,6 +159,8 @@ class CryptoUtils:
         )
         
         key = kdf.derive(password.encode())
+        if cache_key is not None:
+            _derived_keys.put(cache_key, key)
         return key, salt
 
     @staticmethod
@@ -101,6 +214,26 @@ class CryptoUtils:
         
         return private_key.decode()
 
+    @staticmethod
+    def unlock_private_key(session_id: str, encrypted_data: str, password: str):
+        """解密私钥并在会话有效期内缓存，后续签名不再重复 PBKDF2"""
+        private_key = CryptoUtils.decrypt_private_key(encrypted_data, password)
+        _session_keys.put(session_id, private_key)
+        return private_key
+
+    @staticmethod
+    def lock_private_key(session_id: str):
+        """会话结束（登出）时清除缓存的私钥"""
+        _session_keys.pop(session_id)
+
+    @staticmethod
+    def sign_message_for_session(session_id: str, message: str):
+        """使用会话中已解密的私钥签名，未解锁时返回 None"""
+        private_key = _session_keys.get(session_id)
+        if private_key is None:
+            return None
+        return CryptoUtils.sign_message(private_key, message)
+
     @staticmethod
     def sign_message(private_key: str, message: str):
         """使用私钥签名消息"""
@@ -0,0 +1,4 @@
+"""ASGI 入口（公开只读接口）：uvicorn asgi:app --port 5003 --workers 2"""
+from app.asgi import create_asgi_app
+
+app = create_asgi_app()
@@ -1,12 +1,10 @@
 // SPDX-License-Identifier: MIT
-pragma solidity ^0.8.0;
+pragma solidity ^0.8.20;
 
 import "@openzeppelin/contracts/access/Ownable.sol";
-import "@openzeppelin/contracts/utils/Counters.sol";
 
 contract DID is Ownable {
-    using Counters for Counters.Counter;
-    Counters.Counter private _authorizationIds;
+    uint256 private _lastAuthorizationId;  // 最近分配的授权ID，从 1 开始
 
     // 用户信息结构
     struct User {
@@ -33,12 +31,16 @@ contract DID is Ownable {
     event AuthorizationRevoked(uint256 indexed authId);
     event AuthorizationExpired(uint256 indexed authId);
     event UserUpdated(address indexed userAddress, string email, uint256 timestamp);
+    event DeclarationRootAnchored(bytes32 indexed root, uint256 leafCount, uint256 timestamp);
 
     // 状态变量
     mapping(address => User) public users;                      // 钱包地址 => 用户信息
     mapping(string => address) public emailToWallet;            // 邮箱 => 钱包地址
     mapping(uint256 => Authorization) public authorizations;    // 授权ID => 授权信息
     mapping(address => uint256[]) public userAuthorizations;    // 用户 => 授权ID列表
+    mapping(bytes32 => uint256) public anchoredRoots;           // 声明批次 Merkle 根 => 锚定时间
+
+    constructor() Ownable(msg.sender) {}
 
     // 修饰器
     modifier onlyRegistered() {
@@ -94,8 +96,7 @@ contract DID is Ownable {
         require(bytes(_dataType).length > 0, "Data type cannot be empty");
         require(_expiresIn > 0, "Expiration time must be greater than 0");
 
-        _authorizationIds.increment();
-        uint256 authId = _authorizationIds.current();
+        uint256 authId = ++_lastAuthorizationId;
 
         authorizations[authId] = Authorization({
             owner: msg.sender,
@@ -208,4 +209,20 @@ contract DID is Ownable {
         User memory user = users[_userAddress];
         return (user.email, user.isRegistered, user.registrationTime);
     }
+
+    // 锚定一批声明的 Merkle 根（每个批次只需一笔交易）
+    function anchorDeclarationRoot(bytes32 _root, uint256 _leafCount) external onlyOwner {
+        require(_root != bytes32(0), "Invalid root");
+        require(_leafCount > 0, "Leaf count must be greater than 0");
+        require(anchoredRoots[_root] == 0, "Root already anchored");
+
+        anchoredRoots[_root] = block.timestamp;
+
+        emit DeclarationRootAnchored(_root, _leafCount, block.timestamp);
+    }
+
+    // 查询 Merkle 根的锚定时间，未锚定返回 0
+    function getRootAnchorTime(bytes32 _root) external view returns (uint256) {
+        return anchoredRoots[_root];
+    }
 } 
\ No newline at end of file
@@ -0,0 +1,103 @@
+"""
+生产环境 gunicorn 配置
+
+启动: gunicorn -c gunicorn.conf.py wsgi:app（或 python run.py）
+- preload_app：主进程加载应用后再 fork，worker 共享只读内存、启动更快
+- max_requests：worker 处理一定数量请求后回收，防止内存缓慢增长
+- graceful_timeout：收到 SIGTERM 后等待进行中的请求完成
+- 锚定 / 索引后台线程只在持有文件锁的一个 worker 中运行；worker 退出时先停止它们并等待在途交易完成
+- 各 worker 的指标写入 METRICS_MULTIPROC_DIR，/metrics 无论落到哪个 worker 都返回合并后的值
+- 限流计数、登录 challenge、会话吊销标记必须放在 worker 共享的 Redis 中（KV_BACKEND=redis）；
+  KV_BACKEND=memory 时每个 worker 各有一份，限流上限按 worker 数成倍放大，
+  challenge 落到另一个 worker 时会被当作过期，因此只允许 WEB_WORKERS=1
+"""
+import multiprocessing
+import os
+import tempfile
+
+bind = os.getenv('BIND', '0.0.0.0:5002')
+workers = int(os.getenv('WEB_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv('WEB_THREADS', '4'))
+worker_class = 'gthread'
+preload_app = True
+
+max_requests = int(os.getenv('WEB_MAX_REQUESTS', '1000'))
+max_requests_jitter = int(os.getenv('WEB_MAX_REQUESTS_JITTER', '100'))
+timeout = int(os.getenv('WEB_TIMEOUT', '60'))
+graceful_timeout = int(os.getenv('WEB_GRACEFUL_TIMEOUT', '30'))
+keepalive = int(os.getenv('WEB_KEEPALIVE', '5'))
+
+accesslog = os.getenv('WEB_ACCESS_LOG', '-') or None
+errorlog = '-'
+loglevel = os.getenv('WEB_LOG_LEVEL', 'info')
+
+# 预热时请求的路径（逗号分隔）
+WARMUP_PATHS = [p for p in os.getenv('WARMUP_PATHS', '/api/v1/auth/health').split(',') if p]
+BACKGROUND_LOCK_PATH = os.getenv(
+    'BACKGROUND_LOCK_PATH', os.path.join(tempfile.gettempdir(), 'did-system-background.lock')
+)
+
+# 指标快照共享目录（需在加载应用前设置，utils.metrics 导入时读取）
+os.environ.setdefault('METRICS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'did-system-metrics'))
+
+# 主进程预加载时不启动后台线程（线程不会随 fork 复制），由 post_fork 选出的 worker 启动
+os.environ['START_BACKGROUND_WORKERS'] = 'false'
+
+
+def _app(server):
+    return server.app.wsgi()
+
+
+def on_starting(server):
+    # 应用已由 preload_app 加载，KV_BACKEND 以应用配置为准（含 .env 中的设置）
+    if server.cfg.workers > 1 and _app(server).config['KV_BACKEND'] == 'memory':
+        raise RuntimeError(
+            f'KV_BACKEND=memory 是进程内存储，不能在 {server.cfg.workers} 个 worker 之间共享；'
+            '请改用 KV_BACKEND=redis，或设置 WEB_WORKERS=1'
+        )
+
+    from utils.metrics import clear_multiprocess_dir
+    clear_multiprocess_dir()
+
+
+def pre_fork(server, worker):
+    from app.serving import dispose_connections
+    dispose_connections(_app(server))
+
+
+def post_fork(server, worker):
+    from app.serving import reset_after_fork, acquire_background_leader, start_background_workers
+    from utils.metrics import REGISTRY
+    app = _app(server)
+    reset_after_fork(app)
+    REGISTRY.reset()
+    REGISTRY.start_flusher()
+    if acquire_background_leader(BACKGROUND_LOCK_PATH):
+        started = start_background_workers(app)
+        server.log.info(f'worker {worker.pid} 负责后台任务: {", ".join(started) or "无"}')
+
+
+def post_worker_init(worker):
+    from app.serving import warm_up
+    elapsed = warm_up(worker.wsgi, WARMUP_PATHS)
+    worker.log.info(f'worker {worker.pid} 预热完成，耗时 {elapsed:.2f}s')
+
+
+def worker_int(worker):
+    worker.log.info(f'worker {worker.pid} 收到中断信号，正在退出')
+
+
+def worker_exit(server, worker):
+    # 停止后台线程并等待在途交易完成，然后写入最后一次指标快照（含这些交易的结果）
+    from app.serving import stop_background_workers
+    from utils.metrics import REGISTRY
+    stopped = stop_background_workers(_app(server), timeout=graceful_timeout)
+    if stopped:
+        server.log.info(f'worker {worker.pid} 已停止后台任务: {", ".join(stopped)}')
+    REGISTRY.write_snapshot()
+
+
+def child_exit(server, worker):
+    # 主进程中执行：已退出 worker 的计数累加到归档，仪表丢弃
+    from utils.metrics import mark_process_dead
+    mark_process_dead(worker.pid)
@@ -0,0 +1,75 @@
+"""add chain event index tables
+
+Revision ID: 100159d1c348
+Revises: 5b9ff6da3cbf
+Create Date: 2026-10-19 10:03:27.114520
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '100159d1c348'
+down_revision = '5b9ff6da3cbf'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('chain_event',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('block_number', sa.Integer(), nullable=False),
+    sa.Column('block_hash', sa.String(length=66), nullable=False),
+    sa.Column('tx_hash', sa.String(length=66), nullable=False),
+    sa.Column('log_index', sa.Integer(), nullable=False),
+    sa.Column('event', sa.String(length=50), nullable=False),
+    sa.Column('wallet', sa.String(length=42), nullable=True),
+    sa.Column('auth_id', sa.Integer(), nullable=True),
+    sa.Column('payload', sa.Text(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('tx_hash', 'log_index')
+    )
+    op.create_index('ix_chain_event_block_number', 'chain_event', ['block_number'], unique=False)
+    op.create_index('ix_chain_event_wallet', 'chain_event', ['wallet'], unique=False)
+    op.create_index('ix_chain_event_auth_id', 'chain_event', ['auth_id'], unique=False)
+    op.create_table('chain_user',
+    sa.Column('wallet', sa.String(length=42), nullable=False),
+    sa.Column('email', sa.String(length=120), nullable=False),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('block_number', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('wallet')
+    )
+    op.create_index('ix_chain_user_email', 'chain_user', ['email'], unique=False)
+    op.create_table('chain_authorization',
+    sa.Column('auth_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('owner', sa.String(length=42), nullable=False),
+    sa.Column('authorized', sa.String(length=42), nullable=False),
+    sa.Column('data_type', sa.String(length=50), nullable=False),
+    sa.Column('expires_at', sa.Integer(), nullable=False),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('block_number', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('auth_id')
+    )
+    op.create_index('ix_chain_authorization_owner', 'chain_authorization', ['owner', 'auth_id'], unique=False)
+    op.create_index('ix_chain_authorization_lookup', 'chain_authorization', ['owner', 'authorized', 'data_type'], unique=False)
+    op.create_table('indexer_checkpoint',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('block_number', sa.Integer(), nullable=False),
+    sa.Column('block_hash', sa.String(length=66), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade():
+    op.drop_table('indexer_checkpoint')
+    op.drop_index('ix_chain_authorization_lookup', table_name='chain_authorization')
+    op.drop_index('ix_chain_authorization_owner', table_name='chain_authorization')
+    op.drop_table('chain_authorization')
+    op.drop_index('ix_chain_user_email', table_name='chain_user')
+    op.drop_table('chain_user')
+    op.drop_index('ix_chain_event_auth_id', table_name='chain_event')
+    op.drop_index('ix_chain_event_wallet', table_name='chain_event')
+    op.drop_index('ix_chain_event_block_number', table_name='chain_event')
+    op.drop_table('chain_event')
@@ -0,0 +1,26 @@
+"""add version to UserData
+
+Revision ID: 3c8e1f0a9d27
+Revises: 100159d1c348
+Create Date: 2026-10-19 14:12:05.331870
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c8e1f0a9d27'
+down_revision = '100159d1c348'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user_data') as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('user_data') as batch_op:
+        batch_op.drop_column('version')
@@ -0,0 +1,45 @@
+"""add DeclarationAnchor and merkle proof to Declaration
+
+Revision ID: 5b9ff6da3cbf
+Revises: a784fb4ebbb6
+Create Date: 2026-10-19 09:12:41.508233
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b9ff6da3cbf'
+down_revision = 'a784fb4ebbb6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('declaration_anchor',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('merkle_root', sa.String(length=66), nullable=False),
+    sa.Column('leaf_count', sa.Integer(), nullable=False),
+    sa.Column('tx_hash', sa.String(length=66), nullable=True),
+    sa.Column('block_number', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('merkle_root')
+    )
+    with op.batch_alter_table('declaration') as batch_op:
+        batch_op.add_column(sa.Column('anchor_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('leaf_index', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('merkle_proof', sa.Text(), nullable=True))
+        batch_op.create_index('ix_declaration_anchor_id', ['anchor_id'], unique=False)
+        batch_op.create_foreign_key('fk_declaration_anchor_id', 'declaration_anchor', ['anchor_id'], ['id'])
+
+
+def downgrade():
+    with op.batch_alter_table('declaration') as batch_op:
+        batch_op.drop_constraint('fk_declaration_anchor_id', type_='foreignkey')
+        batch_op.drop_index('ix_declaration_anchor_id')
+        batch_op.drop_column('merkle_proof')
+        batch_op.drop_column('leaf_index')
+        batch_op.drop_column('anchor_id')
+    op.drop_table('declaration_anchor')
@@ -0,0 +1,83 @@
+"""compress large text columns
+
+Revision ID: 7d41b2c6e8f3
+Revises: 3c8e1f0a9d27
+Create Date: 2026-10-19 15:40:21.508113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.types import compress_text, decompress_text, TAG
+
+
+# revision identifiers, used by Alembic.
+revision = '7d41b2c6e8f3'
+down_revision = '3c8e1f0a9d27'
+branch_labels = None
+depends_on = None
+
+# 每批读取/改写的行数（按主键分页，内存占用与表大小无关）
+BATCH_SIZE = 500
+
+# 表名 => 改为 CompressedText 的列
+COLUMNS = {
+    'user_data': ('data_content',),
+    'declaration': ('content', 'qr_code_path'),
+    'user_log': ('details',),
+    'operation_logs': ('operation_details',),
+}
+
+
+def rewrite(convert):
+    """
+    按主键分批读取原始值，只改写 convert 后发生变化的列
+    CompressedText 能读取未压缩的旧数据，迁移中断后重跑会跳过已改写的行
+    """
+    connection = op.get_bind()
+    for table_name, column_names in COLUMNS.items():
+        table = sa.table(table_name, sa.column('id', sa.Integer),
+                         *(sa.column(name, sa.Text) for name in column_names))
+        last_id = 0
+        while True:
+            rows = connection.execute(
+                sa.select(table).where(table.c.id > last_id).order_by(table.c.id).limit(BATCH_SIZE)
+            ).fetchall()
+            if not rows:
+                break
+            last_id = rows[-1].id
+
+            for name in column_names:
+                updates = []
+                for row in rows:
+                    value = row._mapping[name]
+                    converted = convert(value)
+                    if converted != value:
+                        updates.append({'row_id': row.id, 'value': converted})
+                if updates:
+                    connection.execute(
+                        table.update().where(table.c.id == sa.bindparam('row_id')).values({name: sa.bindparam('value')}),
+                        updates
+                    )
+
+
+def compress_existing(value):
+    # 已带标记的值视为已改写（迁移可以中断后重跑）
+    if value is None or value.startswith(TAG):
+        return value
+    return compress_text(value)
+
+
+def upgrade():
+    with op.batch_alter_table('declaration') as batch_op:
+        batch_op.alter_column('qr_code_path',
+               existing_type=sa.String(length=512),
+               type_=sa.Text(),
+               existing_nullable=True)
+
+    rewrite(compress_existing)
+
+
+def downgrade():
+    # qr_code_path 保持 Text：解压后的 base64 二维码远超 512 字符，改回 String(512) 会截断或失败
+    rewrite(decompress_text)
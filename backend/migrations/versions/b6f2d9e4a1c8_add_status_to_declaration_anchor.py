@@ -0,0 +1,33 @@
+"""add status to DeclarationAnchor
+
+Revision ID: b6f2d9e4a1c8
+Revises: 7d41b2c6e8f3
+Create Date: 2026-10-19 16:05:48.201734
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6f2d9e4a1c8'
+down_revision = '7d41b2c6e8f3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # 已有批次都是上链成功后才写入的
+    with op.batch_alter_table('declaration_anchor') as batch_op:
+        batch_op.add_column(sa.Column('status', sa.String(length=20), server_default='anchored', nullable=False))
+
+
+def downgrade():
+    # 旧版本把所有批次视为已上链：尚未上链的批次退回待锚定
+    op.execute(
+        "UPDATE declaration SET anchor_id = NULL, leaf_index = NULL, merkle_proof = NULL "
+        "WHERE anchor_id IN (SELECT id FROM declaration_anchor WHERE status = 'pending')"
+    )
+    op.execute("DELETE FROM declaration_anchor WHERE status = 'pending'")
+    with op.batch_alter_table('declaration_anchor') as batch_op:
+        batch_op.drop_column('status')
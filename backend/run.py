@@ -1,5 +1,29 @@
-from app import create_app
+"""
+启动服务
+  python run.py         生产模式：gunicorn 多进程（配置见 gunicorn.conf.py）
+  python run.py --dev   开发模式：Flask 调试服务器（自动重载）
+"""
+import os
+import sys
+
+
+def run_production():
+    from gunicorn.app.wsgiapp import WSGIApplication
+
+    config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gunicorn.conf.py')
+    sys.argv = [sys.argv[0], '-c', config_path, 'wsgi:app']
+    WSGIApplication('%(prog)s [OPTIONS] [APP_MODULE]').run()
+
+
+def run_development():
+    from app import create_app
 
-if __name__ == '__main__':
     app = create_app()
-    app.run(host='0.0.0.0', port=5002, debug=True) 
\ No newline at end of file
+    app.run(host='0.0.0.0', port=5002, debug=True)
+
+
+if __name__ == '__main__':
+    if '--dev' in sys.argv[1:]:
+        run_development()
+    else:
+        run_production()
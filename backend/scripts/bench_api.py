@@ -0,0 +1,340 @@
+"""
+API 端到端压测与性能回归检查
+
+在临时 SQLite 数据库上启动 create_app()（多线程 WSGI 服务器），按权重混合请求：
+register、login、/api/data/encrypt、/api/data/download、
+/authorized-data/<type>、/declarations/<sig>/verify，
+输出各操作的 p50/p95/p99 延迟和吞吐（JSON）。
+
+指定 --baseline 时与基线比较：任一操作 p95 变慢或吞吐下降超过 --threshold 即以非零状态退出；
+--save-baseline 将本次结果写为新基线。
+
+用法:
+  python scripts/bench_api.py [--requests 2000] [--concurrency 8] [--mix verify=4,download=3,...]
+                              [--json result.json] [--baseline baseline.json [--save-baseline]] [--threshold 0.2]
+  python scripts/bench_api.py --url http://127.0.0.1:5002   # 压测已启动的服务
+"""
+import argparse
+import io
+import json
+import logging
+import os
+import random
+import secrets
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import requests  # noqa: E402
+
+BACKEND_DIR = Path(__file__).parent.parent
+DATA_DIR = BACKEND_DIR / 'instance' / 'data'
+API_PREFIX = '/api/v1/auth'
+DEFAULT_MIX = 'register=1,login=2,encrypt=2,download=3,authorized_data=3,verify=4'
+PASSWORD = 'bench-password'
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def random_wallet():
+    return '0x' + secrets.token_hex(20)
+
+
+def start_local_server(workdir):
+    """在临时数据库上启动应用，返回 (base_url, server)"""
+    os.environ['DATABASE_URL'] = f'sqlite:///{workdir / "bench.db"}'
+    os.environ.setdefault('KV_BACKEND', 'memory')
+
+    from werkzeug.serving import make_server
+    from app import create_app
+
+    # 关闭逐条请求日志，避免输出影响测量
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    app = create_app()
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, name='bench-server', daemon=True).start()
+    return f'http://127.0.0.1:{server.server_port}', server
+
+
+class Client:
+    """单个压测线程使用的 HTTP 客户端（复用连接）"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url + API_PREFIX
+        self.session = requests.Session()
+
+    def request(self, method, path, token=None, **kwargs):
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        return self.session.request(method, self.base_url + path, headers=headers, timeout=30, **kwargs)
+
+    def register(self, email, wallet):
+        response = self.request('POST', '/register', json={
+            'name': email.split('@')[0], 'email': email, 'password': PASSWORD, 'wallet_address': wallet
+        })
+        return response
+
+    def login(self, email):
+        return self.request('POST', '/login', json={'email': email, 'password': PASSWORD})
+
+
+class Fixture:
+    """压测前准备的数据：数据拥有者、被授权用户、已上传文件和声明"""
+
+    def __init__(self, client, file_size, users=8):
+        self.file_size = file_size
+        self.users = []
+        for _ in range(users):
+            email = f'bench-{secrets.token_hex(6)}@bench.local'
+            wallet = random_wallet()
+            self._check(client.register(email, wallet), 201)
+            token = self._check(client.login(email), 200)['token']
+            self.users.append({'email': email, 'wallet': wallet, 'token': token})
+
+        # 第一个用户是数据拥有者，其余用户获得 identity 数据授权
+        owner = self.users[0]
+        self._check(client.request('PUT', '/user-data/identity', token=owner['token'],
+                                   json={'data_content': json.dumps({'name': 'bench', 'id': '0' * 18})}), 200)
+        for user in self.users[1:]:
+            self._check(client.request('POST', '/authorizations', token=owner['token'], json={
+                'data_type': 'identity', 'authorized_address': user['wallet'], 'duration_minutes': 1440
+            }), 201)
+
+        self.files = []
+        for user in self.users:
+            file_hash = self._check(upload(client, user['token'], file_size), 200)['hash']
+            self.files.append((user['token'], file_hash))
+
+        self.declarations = [
+            self._check(client.request('POST', '/declarations', token=user['token'],
+                                       json={'content': f'bench declaration {secrets.token_hex(8)}'}), 201)
+            ['declaration']['signature']
+            for user in self.users
+        ]
+
+    @staticmethod
+    def _check(response, status):
+        if response.status_code != status:
+            raise RuntimeError(f'准备数据失败: {response.request.method} {response.url} '
+                               f'-> {response.status_code} {response.text[:200]}')
+        return response.json()
+
+
+def upload(client, token, size):
+    content = secrets.token_bytes(size)
+    return client.request('POST', '/api/data/encrypt', token=token,
+                          files={'file': (f'{secrets.token_hex(4)}.bin', io.BytesIO(content))})
+
+
+def build_operations(fixture):
+    """操作名 => (client, rng) -> response"""
+    readers = fixture.users[1:]
+
+    def register(client, rng):
+        return client.register(f'bench-{secrets.token_hex(8)}@bench.local', random_wallet())
+
+    def login(client, rng):
+        return client.login(rng.choice(fixture.users)['email'])
+
+    def encrypt(client, rng):
+        return upload(client, rng.choice(fixture.users)['token'], fixture.file_size)
+
+    def download(client, rng):
+        token, file_hash = rng.choice(fixture.files)
+        return client.request('GET', '/api/data/download', token=token, params={'hash': file_hash})
+
+    def authorized_data(client, rng):
+        return client.request('GET', '/authorized-data/identity', token=rng.choice(readers)['token'])
+
+    def verify(client, rng):
+        return client.request('GET', f'/declarations/{rng.choice(fixture.declarations)}/verify')
+
+    return {
+        'register': register, 'login': login, 'encrypt': encrypt, 'download': download,
+        'authorized_data': authorized_data, 'verify': verify
+    }
+
+
+def parse_mix(mix):
+    weights = {}
+    for item in mix.split(','):
+        name, _, weight = item.partition('=')
+        weights[name.strip()] = float(weight or 1)
+    return weights
+
+
+def run_load(base_url, operations, weights, total, concurrency, seed):
+    names = list(weights)
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    lock = threading.Lock()
+    counter = iter(range(total))
+    counter_lock = threading.Lock()
+    barrier = threading.Barrier(concurrency + 1)
+
+    def worker(index):
+        client = Client(base_url)
+        rng = random.Random(seed + index)
+        local_latencies = defaultdict(list)
+        local_errors = defaultdict(int)
+        barrier.wait()
+        while True:
+            with counter_lock:
+                if next(counter, None) is None:
+                    break
+            name = rng.choices(names, weights=[weights[n] for n in names])[0]
+            started = time.perf_counter()
+            try:
+                response = operations[name](client, rng)
+                ok = response.status_code < 400
+            except requests.RequestException:
+                ok = False
+            elapsed = time.perf_counter() - started
+            if ok:
+                local_latencies[name].append(elapsed)
+            else:
+                local_errors[name] += 1
+        with lock:
+            for name, values in local_latencies.items():
+                latencies[name].extend(values)
+            for name, count in local_errors.items():
+                errors[name] += count
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    results = {}
+    for name in names:
+        values = latencies[name]
+        results[name] = summarize(values, errors[name], elapsed)
+    results['total'] = summarize([v for values in latencies.values() for v in values], sum(errors.values()), elapsed)
+    return results
+
+
+def summarize(values, errors, elapsed):
+    if not values:
+        return {'count': 0, 'errors': errors}
+    return {
+        'count': len(values),
+        'errors': errors,
+        'p50_ms': percentile(values, 50) * 1000,
+        'p95_ms': percentile(values, 95) * 1000,
+        'p99_ms': percentile(values, 99) * 1000,
+        'mean_ms': statistics.mean(values) * 1000,
+        'throughput_rps': len(values) / elapsed
+    }
+
+
+def compare_baseline(results, baseline, threshold):
+    """返回回归项列表；p95 变慢或吞吐下降超过阈值即视为回归"""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous or not current.get('count') or not previous.get('count'):
+            continue
+        if current['p95_ms'] > previous['p95_ms'] * (1 + threshold):
+            regressions.append(f'{name}: p95 {previous["p95_ms"]:.1f}ms -> {current["p95_ms"]:.1f}ms')
+        if current['throughput_rps'] < previous['throughput_rps'] * (1 - threshold):
+            regressions.append(f'{name}: 吞吐 {previous["throughput_rps"]:.1f} -> {current["throughput_rps"]:.1f} req/s')
+        if current['errors'] > previous['errors']:
+            regressions.append(f'{name}: 错误数 {previous["errors"]} -> {current["errors"]}')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--url', help='压测已启动的服务；不指定时在临时数据库上启动应用')
+    parser.add_argument('--requests', type=int, default=2000, help='请求总数（不含预热和准备数据）')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--warmup', type=int, default=100, help='预热请求数（不计入结果）')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='操作权重，如 verify=4,download=3')
+    parser.add_argument('--file-size', type=int, default=4096, help='上传文件大小（字节）')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', help='将结果写入 JSON 文件')
+    parser.add_argument('--baseline', help='基线 JSON 文件')
+    parser.add_argument('--save-baseline', action='store_true', help='将本次结果写入 --baseline')
+    parser.add_argument('--threshold', type=float, default=0.2, help='允许的回归比例')
+    args = parser.parse_args()
+
+    workdir = server = None
+    base_url = args.url
+    existing_files = set()
+    if not base_url:
+        workdir = Path(tempfile.mkdtemp(prefix='did-bench-'))
+        existing_files = set(DATA_DIR.glob('*.enc'))
+        base_url, server = start_local_server(workdir)
+
+    try:
+        weights = parse_mix(args.mix)
+        fixture = Fixture(Client(base_url), args.file_size)
+        operations = build_operations(fixture)
+        unknown = set(weights) - set(operations)
+        if unknown:
+            parser.error(f'未知的操作: {", ".join(sorted(unknown))}')
+
+        if args.warmup:
+            run_load(base_url, operations, weights, args.warmup, args.concurrency, args.seed)
+        results = run_load(base_url, operations, weights, args.requests, args.concurrency, args.seed)
+    finally:
+        if server:
+            server.shutdown()
+        if workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+            # 清理压测上传产生的加密文件
+            for path in set(DATA_DIR.glob('*.enc')) - existing_files:
+                path.unlink()
+
+    report = {
+        'config': {
+            'requests': args.requests, 'concurrency': args.concurrency,
+            'mix': weights, 'file_size': args.file_size
+        },
+        'results': results
+    }
+
+    print(f'{"操作":<18}{"次数":>8}{"错误":>6}{"p50(ms)":>10}{"p95(ms)":>10}{"p99(ms)":>10}{"req/s":>10}')
+    for name, r in results.items():
+        if not r['count']:
+            print(f'{name:<18}{0:>8}{r["errors"]:>6}')
+            continue
+        print(f'{name:<18}{r["count"]:>8}{r["errors"]:>6}{r["p50_ms"]:>10.2f}{r["p95_ms"]:>10.2f}'
+              f'{r["p99_ms"]:>10.2f}{r["throughput_rps"]:>10.1f}')
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+    if args.baseline and args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f'基线已写入 {args.baseline}')
+    elif args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+        regressions = compare_baseline(results, baseline, args.threshold)
+        if regressions:
+            print(f'性能回归（阈值 {args.threshold:.0%}）:')
+            for line in regressions:
+                print(f'  {line}')
+            sys.exit(1)
+        print(f'未发现超过 {args.threshold:.0%} 的回归')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,231 @@
+"""
+同步（gunicorn gthread）与异步（uvicorn ASGI）公开接口并发对比
+
+在同一个临时 SQLite 数据库（或 --db-url 指定的数据库）上分别启动两个服务，
+以不同的并发连接数压测 verify_declaration、health_check、get_authorized_data，
+输出各并发下的吞吐和 p50/p95/p99 延迟。
+
+用法: python scripts/bench_async.py [--connections 16,64,256] [--duration 10] [--sync-threads 8] [--json result.json]
+需要 gunicorn、uvicorn 和 aiosqlite（PostgreSQL 需 asyncpg）。
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import secrets
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+import jwt  # noqa: E402
+
+API_PREFIX = '/api/v1/auth'
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def seed(users):
+    """写入测试数据，返回 (声明签名列表, 被授权用户 token 列表)"""
+    from app import create_app, db
+    from app.models import User, Declaration, DataAuthorization, UserData
+
+    app = create_app()
+    with app.app_context():
+        accounts = [
+            User(name=f'bench{i}', email=f'bench-{secrets.token_hex(6)}@bench.local',
+                 password_hash='x', wallet_address='0x' + secrets.token_hex(20))
+            for i in range(users)
+        ]
+        db.session.add_all(accounts)
+        db.session.flush()
+
+        owner = accounts[0]
+        db.session.add(UserData(user_id=owner.id, data_type='identity', data_content='{"name": "bench"}'))
+        expires_at = datetime.utcnow() + timedelta(days=1)
+        for user in accounts[1:]:
+            db.session.add(DataAuthorization(user_id=owner.id, data_type='identity',
+                                             authorized_address=user.wallet_address, expires_at=expires_at))
+        declarations = [
+            Declaration(user_id=user.id, content=f'bench {i}', signature='0x' + secrets.token_hex(32))
+            for i, user in enumerate(accounts)
+        ]
+        db.session.add_all(declarations)
+        db.session.commit()
+
+        secret = os.getenv('SECRET_KEY', 'your-secret-key')
+        tokens = [
+            jwt.encode({'user_id': user.id, 'exp': datetime.utcnow() + timedelta(days=1)}, secret, algorithm='HS256')
+            for user in accounts[1:]
+        ]
+        signatures = [d.signature for d in declarations]
+        db.engine.dispose()
+    return signatures, tokens
+
+
+def start_server(command, port):
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f'服务未能启动: {" ".join(command)}')
+
+
+async def request(reader, writer, path, headers):
+    lines = [f'GET {path} HTTP/1.1', 'Host: 127.0.0.1'] + [f'{k}: {v}' for k, v in headers.items()]
+    writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode())
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    length, keep_alive = 0, True
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        name = name.strip().lower()
+        if name == 'content-length':
+            length = int(value)
+        elif name == 'connection' and value.strip().lower() == 'close':
+            keep_alive = False
+    await reader.readexactly(length)
+    return status, keep_alive
+
+
+async def run_connections(port, connections, duration, signatures, tokens):
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + duration
+
+    async def connection(index):
+        nonlocal errors
+        rng = random.Random(index)
+        reader = writer = None
+        while time.perf_counter() < deadline:
+            if writer is None:
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            choice = rng.random()
+            if choice < 0.5:
+                path, headers = f'{API_PREFIX}/declarations/{rng.choice(signatures)}/verify', {}
+            elif choice < 0.9:
+                path = f'{API_PREFIX}/authorized-data/identity'
+                headers = {'Authorization': f'Bearer {rng.choice(tokens)}'}
+            else:
+                path, headers = f'{API_PREFIX}/health', {}
+
+            started = time.perf_counter()
+            try:
+                status, keep_alive = await request(reader, writer, path, headers)
+            except (OSError, asyncio.IncompleteReadError, IndexError):
+                errors += 1
+                writer.close()
+                writer = None
+                continue
+            latencies.append(time.perf_counter() - started)
+            if status >= 400:
+                errors += 1
+            if not keep_alive:
+                writer.close()
+                writer = None
+        if writer is not None:
+            writer.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(connection(i) for i in range(connections)))
+    elapsed = time.perf_counter() - started
+    if not latencies:
+        return {'connections': connections, 'requests': 0, 'errors': errors}
+    return {
+        'connections': connections,
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput_rps': len(latencies) / elapsed,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--connections', default='16,64,256', help='并发连接数（逗号分隔）')
+    parser.add_argument('--duration', type=float, default=10, help='每轮压测秒数')
+    parser.add_argument('--sync-workers', type=int, default=1)
+    parser.add_argument('--sync-threads', type=int, default=8)
+    parser.add_argument('--async-workers', type=int, default=1)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--db-url', help='数据库连接串（默认临时 SQLite）')
+    parser.add_argument('--json', help='将结果写入 JSON 文件')
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix='did-bench-async-'))
+    os.environ['DATABASE_URL'] = args.db_url or f'sqlite:///{workdir / "bench.db"}'
+    os.environ.setdefault('KV_BACKEND', 'memory')
+    os.environ['WEB_ACCESS_LOG'] = ''
+
+    signatures, tokens = seed(args.users)
+    sync_port, async_port = free_port(), free_port()
+    servers = {
+        'sync (gunicorn gthread)': (sync_port, [
+            sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--bind', f'127.0.0.1:{sync_port}',
+            '--workers', str(args.sync_workers), '--threads', str(args.sync_threads), 'wsgi:app'
+        ]),
+        'async (uvicorn)': (async_port, [
+            sys.executable, '-m', 'uvicorn', 'asgi:app', '--port', str(async_port),
+            '--workers', str(args.async_workers), '--no-access-log', '--log-level', 'warning'
+        ]),
+    }
+
+    results = {}
+    try:
+        for name, (port, command) in servers.items():
+            process = start_server(command, port)
+            try:
+                results[name] = [
+                    asyncio.run(run_connections(port, int(c), args.duration, signatures, tokens))
+                    for c in args.connections.split(',')
+                ]
+            finally:
+                process.terminate()
+                process.wait(timeout=30)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f'{"服务":<26}{"连接数":>8}{"请求数":>10}{"错误":>6}{"req/s":>10}{"p50(ms)":>10}{"p95(ms)":>10}{"p99(ms)":>10}')
+    for name, rows in results.items():
+        for r in rows:
+            if not r['requests']:
+                print(f'{name:<26}{r["connections"]:>8}{0:>10}{r["errors"]:>6}')
+                continue
+            print(f'{name:<26}{r["connections"]:>8}{r["requests"]:>10}{r["errors"]:>6}{r["throughput_rps"]:>10.1f}'
+                  f'{r["p50_ms"]:>10.2f}{r["p95_ms"]:>10.2f}{r["p99_ms"]:>10.2f}')
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
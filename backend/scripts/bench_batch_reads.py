@@ -0,0 +1,65 @@
+"""
+对比逐个 getAuthorization 调用与 JSON-RPC 批量读取的耗时
+
+需要已部署 DID 合约的节点（ETHEREUM_RPC_URL），在仓库根目录运行：
+    python backend/scripts/bench_batch_reads.py --count 200
+
+脚本会用第一个节点账户注册（如未注册）并创建 count 个授权作为测试数据。
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.contract import ContractManager  # noqa: E402
+
+
+def prepare(manager, count):
+    owner = manager.w3.eth.accounts[0]
+    authorized = manager.w3.eth.accounts[1]
+    if not manager.is_registered(owner):
+        manager.register_user(owner, f'bench-{int(time.time())}@example.com')
+
+    existing = manager.get_user_authorizations(owner)
+    futures = [
+        manager.create_authorization(owner, authorized, 'identity', 3600, wait=False)
+        for _ in range(max(0, count - len(existing)))
+    ]
+    for future in futures:
+        future.result()
+    return owner
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--count', type=int, default=200, help='授权数量')
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    manager = ContractManager()
+    owner = prepare(manager, args.count)
+    auth_ids = manager.get_user_authorizations(owner)[:args.count]
+
+    def loop():
+        return [manager.get_authorization(auth_id) for auth_id in auth_ids]
+
+    def batch():
+        return manager.get_authorizations(auth_ids)
+
+    assert [list(a[1:]) for a in batch()] == [list(a) for a in loop()]
+
+    for name, fn in (('逐个调用', loop), ('批量调用', batch)):
+        timings = []
+        for _ in range(args.rounds):
+            started = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - started)
+        best = min(timings)
+        print(f'{name}: {len(auth_ids)} 个授权, 最佳 {best * 1000:.1f}ms, '
+              f'平均每个 {best / len(auth_ids) * 1e6:.0f}us')
+
+
+if __name__ == '__main__':
+    main()
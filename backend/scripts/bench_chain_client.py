@@ -0,0 +1,110 @@
+"""
+对比链客户端缓存前后的单次调用开销
+
+旧实现每次调用 get_web3()/get_contract() 都会重新读取配置文件和 ABI，
+并创建新的 HTTPProvider；新实现由 ChainClient 在进程内缓存。
+基准只测量客户端构建开销，不需要运行中的节点。
+
+用法: python scripts/bench_chain_client.py [--iterations 2000]
+"""
+import argparse
+import importlib.util
+import json
+import sys
+import time
+from pathlib import Path
+
+from web3 import Web3
+
+BACKEND_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+CONFIG_PATH = BACKEND_DIR / 'config' / 'ganache_accounts.json'
+
+
+def load_contract_module():
+    # app/utils.py 与 app/utils/ 目录同名，无法直接 import app.utils.contract
+    spec = importlib.util.spec_from_file_location(
+        'chain_contract', BACKEND_DIR / 'app' / 'utils' / 'contract.py'
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def legacy_get_web3():
+    with open(CONFIG_PATH) as f:
+        rpc_url = json.load(f)['rpc_url']
+    return Web3(Web3.HTTPProvider(rpc_url))
+
+
+def legacy_get_contract(contract_path):
+    w3 = legacy_get_web3()
+    with open(contract_path) as f:
+        contract_json = json.load(f)
+    return w3.eth.contract(
+        address=contract_json['networks']['5777']['address'],
+        abi=contract_json['abi']
+    )
+
+
+def legacy_register_setup(contract_path):
+    """旧 register 路由：get_contract + get_web3 + 再读一次账户文件"""
+    legacy_get_contract(contract_path)
+    legacy_get_web3()
+    with open(CONFIG_PATH) as f:
+        return json.load(f)['accounts'][0]
+
+
+def bench(fn, iterations):
+    fn()  # 预热
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--iterations', type=int, default=2000)
+    parser.add_argument('--contract-json', default=None,
+                        help='合约 JSON 路径，默认使用 contracts/DID.json，不存在时生成临时文件')
+    args = parser.parse_args()
+
+    contract_path = Path(args.contract_json) if args.contract_json else BACKEND_DIR / 'contracts' / 'DID.json'
+    temp_file = None
+    if not contract_path.exists():
+        # 未部署合约时使用包含完整 ABI 形状的占位文件
+        temp_file = BACKEND_DIR / 'contracts' / '.bench_DID.json'
+        abi = [{
+            'type': 'function', 'name': f'fn{i}', 'stateMutability': 'view',
+            'inputs': [{'name': 'a', 'type': 'address'}],
+            'outputs': [{'name': '', 'type': 'bool'}]
+        } for i in range(20)]
+        temp_file.write_text(json.dumps({
+            'abi': abi,
+            'networks': {'5777': {'address': '0x' + '11' * 20}}
+        }))
+        contract_path = temp_file
+
+    try:
+        module = load_contract_module()
+        client = module.ChainClient(contract_path=contract_path)
+        results = {
+            'get_web3': (bench(legacy_get_web3, args.iterations),
+                         bench(lambda: client.w3, args.iterations)),
+            'get_contract': (bench(lambda: legacy_get_contract(contract_path), args.iterations),
+                             bench(lambda: client.contract, args.iterations)),
+            'register_setup': (bench(lambda: legacy_register_setup(contract_path), args.iterations),
+                               bench(lambda: (client.contract, client.w3, client.accounts[0]), args.iterations)),
+        }
+    finally:
+        if temp_file:
+            temp_file.unlink()
+
+    print(f'{"调用":<16}{"旧实现(us)":>14}{"缓存(us)":>14}{"加速比":>10}')
+    for name, (before, after) in results.items():
+        print(f'{name:<16}{before:>14.1f}{after:>14.1f}{before / after:>9.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""
+压缩文本列基准测试
+
+分别用 Text 和 CompressedText 建表，写入典型数据（JSON 身份资料、声明正文、
+base64 二维码、操作日志），比较：
+- 数据库文件大小（VACUUM 后）
+- 写入耗时
+- 按主键随机读取单行的延迟（p50/p95）和全表扫描耗时
+
+用法: python scripts/bench_compressed_columns.py [--rows 5000] [--reads 2000] [--json result.json]
+"""
+import argparse
+import base64
+import io
+import json
+import os
+import random
+import secrets
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import qrcode  # noqa: E402
+import sqlalchemy as sa  # noqa: E402
+
+from app.types import CompressedText  # noqa: E402
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def identity_document(i):
+    return json.dumps({
+        'name': f'用户{i}',
+        'id_number': secrets.token_hex(9),
+        'addresses': [{'type': kind, 'province': '河南省', 'city': '郑州市', 'street': f'科学大道 {i} 号'}
+                      for kind in ('home', 'work')],
+        'credentials': [{'issuer': '0x' + secrets.token_hex(20), 'type': 'degree', 'issued_at': '2024-06-30',
+                         'status': 'valid'} for _ in range(5)],
+    }, ensure_ascii=False)
+
+
+def qr_data_url():
+    qr = qrcode.QRCode(version=1, box_size=10, border=5)
+    qr.add_data(f'http://localhost:3000/verify?signature=0x{secrets.token_hex(32)}')
+    qr.make(fit=True)
+    buffered = io.BytesIO()
+    qr.make_image(fill_color='black', back_color='white').save(buffered, format='PNG')
+    return 'data:image/png;base64,' + base64.b64encode(buffered.getvalue()).decode()
+
+
+def payloads(rows):
+    qr = qr_data_url()
+    return {
+        'identity_json': [identity_document(i) for i in range(rows)],
+        'declaration': [f'声明 {i}：本人声明以上信息真实有效，如有虚假愿承担相应责任。' * 10 for i in range(rows)],
+        'qr_code': [qr] * rows,
+        'log_short': ['用户登录成功'] * rows,
+        'log_long': [json.dumps({'file': f'report-{i}.pdf', 'size': i * 1024, 'cipher': 'fernet',
+                                 'steps': ['upload', 'encrypt', 'store', 'sign'] * 8}) for i in range(rows)],
+    }
+
+
+def run(column_type, name, values, reads, workdir):
+    path = workdir / f'{name}-{column_type.__name__}.db'
+    engine = sa.create_engine(f'sqlite:///{path}')
+    metadata = sa.MetaData()
+    table = sa.Table('bench', metadata, sa.Column('id', sa.Integer, primary_key=True),
+                     sa.Column('content', column_type()))
+    metadata.create_all(engine)
+
+    start = time.perf_counter()
+    with engine.begin() as connection:
+        connection.execute(table.insert(), [{'id': i + 1, 'content': v} for i, v in enumerate(values)])
+    write_seconds = time.perf_counter() - start
+
+    with engine.connect() as connection:
+        connection.execute(sa.text('VACUUM'))
+
+    latencies = []
+    query = sa.select(table.c.content).where(table.c.id == sa.bindparam('row_id'))
+    with engine.connect() as connection:
+        for _ in range(reads):
+            row_id = random.randint(1, len(values))
+            start = time.perf_counter()
+            connection.execute(query, {'row_id': row_id}).scalar()
+            latencies.append((time.perf_counter() - start) * 1e6)
+
+        start = time.perf_counter()
+        loaded = connection.execute(sa.select(table.c.content).order_by(table.c.id)).scalars().all()
+        scan_seconds = time.perf_counter() - start
+    assert loaded == values
+
+    engine.dispose()
+    return {
+        'db_bytes': os.path.getsize(path),
+        'write_ms': write_seconds * 1000,
+        'read_p50_us': percentile(latencies, 50),
+        'read_p95_us': percentile(latencies, 95),
+        'scan_ms': scan_seconds * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--reads', type=int, default=2000, help='随机单行读取次数')
+    parser.add_argument('--json', help='将结果写入 JSON 文件')
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix='did-bench-') as tmp:
+        workdir = Path(tmp)
+        for name, values in payloads(args.rows).items():
+            row = {'payload': name, 'avg_value_bytes': sum(len(v.encode()) for v in values) // len(values)}
+            for column_type in (sa.Text, CompressedText):
+                row[column_type.__name__] = run(column_type, name, values, args.reads, workdir)
+            results.append(row)
+
+    for row in results:
+        plain, compressed = row['Text'], row['CompressedText']
+        print(f'== {row["payload"]}（平均 {row["avg_value_bytes"]}B/行）')
+        for label, stats in (('Text', plain), ('CompressedText', compressed)):
+            print(f'  {label:<15} 文件 {stats["db_bytes"] / 1024:>9.0f} KiB  写入 {stats["write_ms"]:>7.1f}ms  '
+                  f'单行读 p50 {stats["read_p50_us"]:>6.1f}us p95 {stats["read_p95_us"]:>6.1f}us  '
+                  f'全表 {stats["scan_ms"]:>7.1f}ms')
+        print(f'  文件大小比例 {compressed["db_bytes"] / plain["db_bytes"]:.2f}')
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
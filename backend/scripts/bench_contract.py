@@ -0,0 +1,142 @@
+"""
+合约层基准测试（进程内 eth-tester/py-evm 链，不需要 Ganache）
+
+测量 ContractManager 的注册、授权创建/撤销和只读调用的延迟与吞吐：
+- 延迟：逐个调用并等待回执
+- 吞吐：通过提交队列并发发送，等待全部回执
+
+用法: python scripts/bench_contract.py [--count 100] [--json result.json]
+需要 eth-tester[py-evm]；使用 contracts/DID.json 中的字节码（由 scripts/build_contract.py 生成），
+没有字节码时用 py-solc-x 现场编译，编译前需在 backend 目录执行 npm install。
+"""
+import argparse
+import json
+import os
+import secrets
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+# 进程内链自动出块，回执轮询间隔可以很短
+os.environ.setdefault('TX_POLL_INTERVAL', '0.005')
+
+from utils.chain_backend import TESTER_BACKEND, get_in_process_chain  # noqa: E402
+from utils.contract import ContractManager  # noqa: E402
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def summarize(name, latencies, throughput_ops, throughput_seconds):
+    return {
+        'operation': name,
+        'count': len(latencies),
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'mean_ms': statistics.mean(latencies) * 1000,
+        'throughput_ops': throughput_ops / throughput_seconds if throughput_seconds else None
+    }
+
+
+def timed(fn):
+    started = time.perf_counter()
+    fn()
+    return time.perf_counter() - started
+
+
+def pipelined(submit_all):
+    """并发提交并等待全部完成，返回耗时"""
+    started = time.perf_counter()
+    for future in submit_all():
+        future.result()
+    return time.perf_counter() - started
+
+
+def bench_register(manager, chain, count):
+    wallets = [chain.add_account('0x' + secrets.token_hex(32)) for _ in range(count * 2)]
+    latency_wallets, throughput_wallets = wallets[:count], wallets[count:]
+
+    latencies = [
+        timed(lambda w=wallet: manager.register_user(w, f'{w.lower()}@bench.local'))
+        for wallet in latency_wallets
+    ]
+    elapsed = pipelined(lambda: [
+        manager.register_user(w, f'{w.lower()}@bench.local', wait=False) for w in throughput_wallets
+    ])
+    return summarize('register', latencies, count, elapsed)
+
+
+def bench_authorizations(manager, chain, count):
+    owner, authorized = chain.accounts[0], chain.accounts[1]
+    if not manager.is_registered(owner, fresh=True):
+        manager.register_user(owner, 'owner@bench.local')
+
+    latencies = [
+        timed(lambda: manager.create_authorization(owner, authorized, 'identity', 3600))
+        for _ in range(count)
+    ]
+    elapsed = pipelined(lambda: [
+        manager.create_authorization(owner, authorized, 'profile', 3600, wait=False) for _ in range(count)
+    ])
+    create = summarize('create_authorization', latencies, count, elapsed)
+
+    auth_ids = manager.get_user_authorizations(owner)[-count * 2:]
+    latencies = [timed(lambda a=auth_id: manager.revoke_authorization(owner, a)) for auth_id in auth_ids[:count]]
+    elapsed = pipelined(lambda: [
+        manager.revoke_authorization(owner, auth_id, wait=False) for auth_id in auth_ids[count:]
+    ])
+    revoke = summarize('revoke_authorization', latencies, count, elapsed)
+    return [create, revoke]
+
+
+def bench_views(manager, chain, count):
+    owner, authorized = chain.accounts[0], chain.accounts[1]
+    results = []
+    for name, fn in (
+        ('is_registered', lambda fresh: manager.is_registered(owner, fresh=fresh)),
+        ('check_authorization', lambda fresh: manager.check_authorization(owner, authorized, 'identity', fresh=fresh)),
+        ('get_authorizations', lambda fresh: manager.get_authorizations(range(1, 11))),
+    ):
+        latencies = [timed(lambda: fn(True)) for _ in range(count)]
+        results.append(summarize(f'{name} (node)', latencies, count, sum(latencies)))
+        fn(True)
+        latencies = [timed(lambda: fn(False)) for _ in range(count)]
+        results.append(summarize(f'{name} (cached)', latencies, count, sum(latencies)))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--count', type=int, default=100, help='每项操作的调用次数')
+    parser.add_argument('--json', help='将结果写入 JSON 文件')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    chain = get_in_process_chain()
+    manager = ContractManager(backend=TESTER_BACKEND)
+    print(f'进程内链已就绪（合约 {chain.contract_address}），耗时 {time.perf_counter() - started:.2f}s')
+
+    results = [bench_register(manager, chain, args.count)]
+    results += bench_authorizations(manager, chain, args.count)
+    results += bench_views(manager, chain, args.count)
+    manager.submitter.shutdown()
+
+    print(f'{"操作":<30}{"p50(ms)":>10}{"p95(ms)":>10}{"p99(ms)":>10}{"ops/s":>12}')
+    for r in results:
+        print(f'{r["operation"]:<30}{r["p50_ms"]:>10.2f}{r["p95_ms"]:>10.2f}{r["p99_ms"]:>10.2f}'
+              f'{r["throughput_ops"]:>12.1f}')
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+限流 / challenge 后端基准测试：对比 Redis 与进程内实现
+
+- hit: 滑动窗口计数（分别测单线程延迟和多线程吞吐）
+- challenge: setex + get + delete 一轮
+
+用法: python scripts/bench_rate_limit.py [--backends redis,memory] [--threads 16] [--count 20000] [--json result.json]
+Redis 后端需要可用的 Redis（localhost:6379），连接失败时跳过。
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import redis  # noqa: E402
+
+from app.middleware.backends import create_backend  # noqa: E402
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def bench_latency(name, fn, count):
+    latencies = []
+    for i in range(count):
+        started = time.perf_counter()
+        fn(i)
+        latencies.append(time.perf_counter() - started)
+    return {
+        'operation': name,
+        'p50_us': percentile(latencies, 50) * 1e6,
+        'p99_us': percentile(latencies, 99) * 1e6,
+        'ops': count / sum(latencies)
+    }
+
+
+def bench_throughput(name, fn, count, threads):
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(offset):
+        barrier.wait()
+        for i in range(offset, count, threads):
+            fn(i)
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for w in workers:
+        w.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - started
+    return {'operation': f'{name} x{threads}', 'p50_us': None, 'p99_us': None, 'ops': count / elapsed}
+
+
+def run(backend, count, threads, keys):
+    run_id = uuid.uuid4().hex[:8]
+
+    def hit(i):
+        backend.hit(f'bench:{run_id}:{i % keys}', 1000000, 60)
+
+    def challenge(i):
+        key = f'bench:{run_id}:challenge:{i}'
+        backend.setex(key, 300, 'challenge')
+        backend.get(key)
+        backend.delete(key)
+
+    return [
+        bench_latency('hit', hit, count),
+        bench_throughput('hit', hit, count, threads),
+        bench_latency('challenge', challenge, count // 3),
+        bench_throughput('challenge', challenge, count // 3, threads),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--backends', default='redis,memory')
+    parser.add_argument('--count', type=int, default=20000, help='每项操作的调用次数')
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--keys', type=int, default=1000, help='限流 key 数量（模拟不同路由和客户端）')
+    parser.add_argument('--json', help='将结果写入 JSON 文件')
+    args = parser.parse_args()
+
+    results = {}
+    for name in args.backends.split(','):
+        backend = create_backend(name)
+        try:
+            results[name] = run(backend, args.count, args.threads, args.keys)
+        except redis.ConnectionError as e:
+            print(f'跳过 {name}: {e}')
+
+    print(f'{"后端":<10}{"操作":<18}{"p50(us)":>10}{"p99(us)":>10}{"ops/s":>12}')
+    for name, rows in results.items():
+        for r in rows:
+            p50 = f'{r["p50_us"]:.1f}' if r['p50_us'] is not None else '-'
+            p99 = f'{r["p99_us"]:.1f}' if r['p99_us'] is not None else '-'
+            print(f'{name:<10}{r["operation"]:<18}{p50:>10}{p99:>10}{r["ops"]:>12.0f}')
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+"""
+响应序列化与压缩基准测试
+
+对典型响应（授权列表、文件列表、带 base64 二维码的声明）比较：
+- 序列化：flask.jsonify（标准库 json + 逐字段 isoformat）与 orjson（原生 datetime）
+- 压缩：原始 / gzip / brotli 的响应字节数和每次压缩的 CPU 时间
+
+用法: python scripts/bench_serialization.py [--rows 200] [--repeat 200] [--json result.json]
+"""
+import argparse
+import base64
+import io
+import json
+import secrets
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import flask  # noqa: E402
+import qrcode  # noqa: E402
+
+from app.compression import brotli, compress  # noqa: E402
+from app.serialization import jsonify  # noqa: E402
+
+
+def authorization(i, now):
+    return {
+        'id': i,
+        'user_id': 1,
+        'data_type': ('identity', 'profile', 'credentials')[i % 3],
+        'authorized_address': '0x' + secrets.token_hex(20),
+        'status': 'active',
+        'created_at': now - timedelta(minutes=i),
+        'revoked_at': None,
+        'expires_at': now + timedelta(hours=1)
+    }
+
+
+def data_file(i, now):
+    return {
+        'id': i,
+        'filename': f'document-{i}.pdf',
+        'hash': '0x' + secrets.token_hex(32),
+        'created_at': now - timedelta(minutes=i)
+    }
+
+
+def declaration(now):
+    qr = qrcode.QRCode(version=1, box_size=10, border=5)
+    qr.add_data(f'http://localhost:3000/verify?signature=0x{secrets.token_hex(32)}')
+    qr.make(fit=True)
+    buffered = io.BytesIO()
+    qr.make_image(fill_color='black', back_color='white').save(buffered, format='PNG')
+    return {
+        'id': 1,
+        'user_id': 1,
+        'content': '本人声明以上信息真实有效。' * 20,
+        'signature': '0x' + secrets.token_hex(32),
+        'qr_code_path': 'data:image/png;base64,' + base64.b64encode(buffered.getvalue()).decode(),
+        'created_at': now,
+        'expires_at': None
+    }
+
+
+def with_isoformat(value):
+    """旧方式：to_dict() 中逐个调用 isoformat()"""
+    if isinstance(value, dict):
+        return {k: with_isoformat(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [with_isoformat(v) for v in value]
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def per_call_us(fn, repeat):
+    started = time.process_time()
+    for _ in range(repeat):
+        fn()
+    return (time.process_time() - started) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=200, help='列表响应的行数')
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--json', help='将结果写入 JSON 文件')
+    args = parser.parse_args()
+
+    now = datetime.utcnow()
+    payloads = {
+        'authorizations': {'authorizations': [authorization(i, now) for i in range(args.rows)]},
+        'files': {'files': [data_file(i, now) for i in range(args.rows)]},
+        'declaration': {'message': '创建声明成功', 'declaration': declaration(now)},
+    }
+
+    app = flask.Flask(__name__)
+    results = []
+    with app.app_context():
+        for name, payload in payloads.items():
+            legacy = with_isoformat(payload)
+            body = jsonify(payload).get_data()
+            row = {
+                'payload': name,
+                'flask_jsonify_us': per_call_us(lambda: flask.jsonify(with_isoformat(payload)).get_data(), args.repeat),
+                'orjson_us': per_call_us(lambda: jsonify(payload).get_data(), args.repeat),
+                'raw_bytes': len(body),
+                'flask_bytes': len(flask.jsonify(legacy).get_data()),
+            }
+            for encoding, levels in (('gzip', (1, 6, 9)), ('br', (1, 4, 11) if brotli else ())):
+                for level in levels:
+                    kwargs = {'gzip_level': level} if encoding == 'gzip' else {'brotli_quality': level}
+                    compressed = compress(body, encoding, **kwargs)
+                    row[f'{encoding}{level}_bytes'] = len(compressed)
+                    row[f'{encoding}{level}_us'] = per_call_us(lambda: compress(body, encoding, **kwargs), args.repeat)
+            results.append(row)
+
+    for row in results:
+        print(f'== {row["payload"]}')
+        print(f'  序列化: flask.jsonify {row["flask_jsonify_us"]:.0f}us ({row["flask_bytes"]}B)  '
+              f'orjson {row["orjson_us"]:.0f}us ({row["raw_bytes"]}B)')
+        for key in row:
+            if key.endswith('_bytes') and key not in ('raw_bytes', 'flask_bytes'):
+                label = key[:-len('_bytes')]
+                ratio = row[key] / row['raw_bytes']
+                print(f'  {label:<8}{row[key]:>10}B ({ratio:.1%}){row[label + "_us"]:>10.0f}us')
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
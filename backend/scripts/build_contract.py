@@ -0,0 +1,26 @@
+"""
+编译 contracts/DID.sol，将 ABI 和字节码写入 contracts/DID.json
+
+DID.json 提交到仓库后，进程内链（CHAIN_BACKEND=eth-tester）、deploy.py 和合约测试直接使用其中的字节码，
+不再需要 Node、@openzeppelin/contracts 和 solc。修改 DID.sol 后重新运行并提交 DID.json。
+
+编译本身需要 py-solc-x（首次运行下载 solc 0.8.20）和 @openzeppelin/contracts（backend 目录执行 npm install）。
+
+用法: python scripts/build_contract.py
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.chain_backend import CONTRACT_JSON_PATH, compile_did_contract, write_contract_artifact  # noqa: E402
+
+
+def main():
+    abi, bytecode = compile_did_contract()
+    write_contract_artifact(abi, bytecode)
+    print(f'已写入 {CONTRACT_JSON_PATH}：{len(abi)} 个 ABI 条目，字节码 {len(bytecode) // 2} 字节')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+"""
+内存浸泡测试：反复执行同一组请求，检查每轮结束后的内存是否持续增长
+
+在临时 SQLite 数据库上创建应用（进程内 test client），开启 tracemalloc，
+每轮执行一组混合请求（上传/下载/列表/声明/授权查询等），gc 后记录已追踪内存。
+预热轮之后若内存随轮次线性增长超过 --threshold 字节/轮，判定为疑似泄漏并以非零状态退出，
+同时输出预热后与最后一轮快照之间增长最多的分配位置，以及各端点的峰值分配。
+
+用法: python scripts/soak_memory.py [--cycles 20] [--requests 50] [--warmup 3] [--threshold 20000] [--json result.json]
+"""
+import argparse
+import gc
+import io
+import json
+import os
+import secrets
+import shutil
+import sys
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).parent.parent
+DATA_DIR = BACKEND_DIR / 'instance' / 'data'
+sys.path.insert(0, str(BACKEND_DIR))
+
+API_PREFIX = '/api/v1/auth'
+
+
+def slope(values):
+    """最小二乘斜率（每轮增长字节数）"""
+    n = len(values)
+    if n < 2:
+        return 0.0
+    mean_x, mean_y = (n - 1) / 2, sum(values) / n
+    numerator = sum((x - mean_x) * (y - mean_y) for x, y in enumerate(values))
+    denominator = sum((x - mean_x) ** 2 for x in range(n))
+    return numerator / denominator
+
+
+class Workload:
+    def __init__(self, client, file_size):
+        self.client = client
+        self.file_size = file_size
+        wallet = '0x' + secrets.token_hex(20)
+        self._post('/register', json={'name': 'soak', 'email': 'soak@soak.local',
+                                      'password': 'soak-password', 'wallet_address': wallet})
+        token = self._post('/login', json={'email': 'soak@soak.local', 'password': 'soak-password'}).get_json()['token']
+        self.headers = {'Authorization': f'Bearer {token}'}
+        self._put('/user-data/identity', json={'data_content': json.dumps({'name': 'soak'})})
+        self.file_hash = self.encrypt().get_json()['hash']
+        self.signature = self.declare().get_json()['declaration']['signature']
+
+    def _post(self, path, **kwargs):
+        return self.client.post(API_PREFIX + path, headers=getattr(self, 'headers', None), **kwargs)
+
+    def _put(self, path, **kwargs):
+        return self.client.put(API_PREFIX + path, headers=self.headers, **kwargs)
+
+    def _get(self, path, **kwargs):
+        return self.client.get(API_PREFIX + path, headers=self.headers, **kwargs)
+
+    def encrypt(self):
+        return self._post('/api/data/encrypt', data={
+            'file': (io.BytesIO(secrets.token_bytes(self.file_size)), 'soak.bin')
+        })
+
+    def declare(self):
+        return self._post('/declarations', json={'content': f'soak {secrets.token_hex(8)}'})
+
+    def cycle(self, requests):
+        operations = [
+            lambda: self._get('/api/data/download', query_string={'hash': self.file_hash}),
+            lambda: self._get('/api/data/list'),
+            lambda: self._get('/authorizations'),
+            lambda: self._get('/profile'),
+            lambda: self._get('/user-data/identity'),
+            lambda: self.client.get(f'{API_PREFIX}/declarations/{self.signature}/verify'),
+            lambda: self._get('/health'),
+        ]
+        for i in range(requests):
+            response = operations[i % len(operations)]()
+            response.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--cycles', type=int, default=20)
+    parser.add_argument('--requests', type=int, default=50, help='每轮请求数')
+    parser.add_argument('--warmup', type=int, default=3, help='不参与增长判定的预热轮数')
+    parser.add_argument('--threshold', type=float, default=20000, help='允许的每轮增长（字节）')
+    parser.add_argument('--file-size', type=int, default=64 * 1024)
+    parser.add_argument('--frames', type=int, default=10, help='tracemalloc 记录的栈深度')
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--json', help='将结果写入 JSON 文件')
+    args = parser.parse_args()
+    warmup = max(args.warmup, 1)
+
+    workdir = Path(tempfile.mkdtemp(prefix='did-soak-'))
+    os.environ['DATABASE_URL'] = f'sqlite:///{workdir / "soak.db"}'
+    os.environ.setdefault('KV_BACKEND', 'memory')
+    existing_files = set(DATA_DIR.glob('*.enc'))
+
+    from app import create_app
+    from app.memory import memory_tracker
+
+    try:
+        app = create_app()
+        workload = Workload(app.test_client(), args.file_size)
+        memory_tracker.start(args.frames)
+
+        samples = []
+        for cycle in range(args.cycles):
+            workload.cycle(args.requests)
+            gc.collect()
+            current = tracemalloc.get_traced_memory()[0]
+            samples.append(current)
+            if cycle == warmup - 1:
+                baseline_snapshot = memory_tracker.take_snapshot('warmup')
+                memory_tracker.reset_routes()
+            print(f'第 {cycle + 1:>3} 轮: {current / 1024:>10.1f} KiB')
+
+        final_snapshot = memory_tracker.take_snapshot('final')
+        growth_sites = memory_tracker.diff(baseline_snapshot, final_snapshot, 'lineno', args.top)
+        routes = memory_tracker.route_stats()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+        for path in set(DATA_DIR.glob('*.enc')) - existing_files:
+            path.unlink()
+
+    measured = samples[warmup:]
+    growth_per_cycle = slope(measured)
+    leaking = growth_per_cycle > args.threshold
+
+    print(f'\n预热后每轮增长: {growth_per_cycle / 1024:.1f} KiB（阈值 {args.threshold / 1024:.1f} KiB）')
+    print(f'\n增长最多的分配位置（预热后 -> 最后一轮）:')
+    for site in growth_sites:
+        print(f'  {site["size_diff_bytes"] / 1024:>+10.1f} KiB {site["count_diff"]:>+8}  {site["site"]}')
+    print(f'\n各端点峰值分配:')
+    for route in routes:
+        print(f'  {route["endpoint"]:<32} 峰值 {route["max_peak_bytes"] / 1024:>9.1f} KiB  '
+              f'平均残留 {route["avg_retained_bytes"] / 1024:>+8.1f} KiB')
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({
+                'samples_bytes': samples,
+                'growth_per_cycle_bytes': growth_per_cycle,
+                'leaking': leaking,
+                'growth_sites': growth_sites,
+                'routes': routes
+            }, f, indent=2)
+
+    if leaking:
+        print('\n检测到持续内存增长')
+        sys.exit(1)
+    print('\n未检测到持续内存增长')
+
+
+if __name__ == '__main__':
+    main()
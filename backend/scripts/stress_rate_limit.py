@@ -0,0 +1,85 @@
+"""
+并发验证限流器不会超发
+
+启动多个线程同时请求被 @rate_limit 装饰的路由，检查放行次数恰好等于上限，
+且不同路由各自独立计数。默认需要可用的 Redis（localhost:6379），
+设置 KV_BACKEND=memory 可验证进程内后端。
+
+用法: python scripts/stress_rate_limit.py [--threads 32] [--requests 2000] [--limit 50]
+"""
+import argparse
+import sys
+import threading
+import uuid
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from flask import Flask  # noqa: E402
+
+from app.middleware.rate_limit import rate_limit  # noqa: E402
+
+
+def build_app(limit, period):
+    app = Flask(__name__)
+
+    @app.route('/a')
+    @rate_limit(limit=limit, period=period)
+    def route_a():
+        return 'ok'
+
+    @app.route('/b')
+    @rate_limit(limit=limit, period=period)
+    def route_b():
+        return 'ok'
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=2000, help='每个路由的请求总数')
+    parser.add_argument('--limit', type=int, default=50)
+    parser.add_argument('--period', type=int, default=60)
+    args = parser.parse_args()
+
+    app = build_app(args.limit, args.period)
+    # 每次运行使用新的客户端地址，避免受上次运行的计数影响
+    remote_addr = f'10.{uuid.uuid4().int % 250}.{uuid.uuid4().int % 250}.1'
+    results = Counter()
+    lock = threading.Lock()
+    barrier = threading.Barrier(args.threads)
+
+    def worker(index):
+        client = app.test_client()
+        barrier.wait()
+        local = Counter()
+        for i in range(index, args.requests * 2, args.threads):
+            path = '/a' if i % 2 else '/b'
+            response = client.get(path, environ_base={'REMOTE_ADDR': remote_addr})
+            local[(path, response.status_code)] += 1
+        with lock:
+            results.update(local)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    ok = True
+    for path in ('/a', '/b'):
+        allowed = results[(path, 200)]
+        rejected = results[(path, 429)]
+        print(f'{path}: 放行 {allowed}，拒绝 {rejected}，上限 {args.limit}')
+        ok = ok and allowed == args.limit
+    if not ok:
+        print('失败：放行次数与上限不一致')
+        sys.exit(1)
+    print('通过')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,18 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """临时 SQLite 数据库 + 内存 KV 后端的应用实例"""
+    monkeypatch.setenv('DATABASE_URL', f'sqlite:///{tmp_path / "test.db"}')
+    monkeypatch.setenv('KV_BACKEND', 'memory')
+    monkeypatch.setenv('START_BACKGROUND_WORKERS', 'false')
+    from app import create_app
+    app = create_app()
+    with app.app_context():
+        yield app
@@ -0,0 +1,142 @@
+"""
+声明锚定：提交前持久化待上链批次，中断后重试时采用已上链的根而不是重复提交
+
+运行: python -m pytest tests
+"""
+import secrets
+
+import pytest
+from hexbytes import HexBytes
+
+from app import db
+from app.anchoring import anchor_pending_declarations, get_anchor_proof, verify_merkle_proof
+from app.models import Declaration, DeclarationAnchor
+
+
+class Crash(BaseException):
+    """模拟进程被终止（不会被 except Exception 捕获）"""
+
+
+class FakeChain:
+    """模拟合约：同一个根只能锚定一次（与 DID.sol 的 Root already anchored 一致）"""
+
+    def __init__(self):
+        self.roots = {}
+        self.block_number = 0
+        self.submissions = 0
+        self.fail_after = None  # 上链后抛出的异常
+        self.drop_next = False  # 下一笔交易被丢弃（未上链）
+
+    def submit(self, merkle_root, leaf_count, on_sent=None):
+        self.submissions += 1
+        tx_hash = HexBytes(secrets.token_bytes(32))
+        if on_sent:
+            on_sent(tx_hash)
+        if self.drop_next:
+            self.drop_next = False
+            raise TimeoutError('交易未被打包')
+        if merkle_root in self.roots:
+            return {'status': 0, 'transactionHash': tx_hash, 'blockNumber': self.block_number}
+        self.block_number += 1
+        self.roots[merkle_root] = (tx_hash, self.block_number)
+        if self.fail_after:
+            raise self.fail_after
+        return {'status': 1, 'transactionHash': tx_hash, 'blockNumber': self.block_number}
+
+    def anchored_at(self, merkle_root):
+        return 1700000000 if merkle_root in self.roots else 0
+
+    def find_anchored_event(self, merkle_root):
+        if merkle_root not in self.roots:
+            return None
+        tx_hash, block_number = self.roots[merkle_root]
+        return {'transactionHash': tx_hash, 'blockNumber': block_number}
+
+
+def add_declarations(count):
+    for _ in range(count):
+        db.session.add(Declaration(user_id=1, content='声明', signature='0x' + secrets.token_hex(32)))
+    db.session.commit()
+
+
+def test_anchor_batch(app):
+    chain = FakeChain()
+    add_declarations(5)
+
+    anchor = anchor_pending_declarations(chain, max_batch=4)
+    assert (anchor.status, anchor.leaf_count, anchor.block_number) == ('anchored', 4, 1)
+    assert anchor.tx_hash == chain.roots[anchor.merkle_root][0].hex()
+
+    for declaration in anchor.declarations:
+        proof = get_anchor_proof(declaration)
+        assert proof['status'] == 'anchored'
+        assert proof['proof_matches_root']
+        assert verify_merkle_proof(declaration.signature, proof['proof'], anchor.merkle_root)
+
+    assert anchor_pending_declarations(chain, max_batch=4).leaf_count == 1
+    assert anchor_pending_declarations(chain, max_batch=4) is None
+    assert chain.submissions == 2
+
+
+def test_timeout_adopts_root_already_mined(app):
+    chain = FakeChain()
+    add_declarations(3)
+
+    chain.fail_after = TimeoutError('等待回执超时')
+    anchor = anchor_pending_declarations(chain)
+    assert chain.submissions == 1
+    assert (anchor.status, anchor.block_number) == ('anchored', 1)
+    assert anchor.tx_hash == chain.roots[anchor.merkle_root][0].hex()
+
+
+def test_retry_after_crash_does_not_resubmit(app):
+    chain = FakeChain()
+    add_declarations(3)
+
+    # 交易已广播并上链，进程在拿到回执前退出
+    chain.fail_after = Crash()
+    with pytest.raises(Crash):
+        anchor_pending_declarations(chain)
+    db.session.rollback()
+    chain.fail_after = None
+
+    anchor = DeclarationAnchor.query.one()
+    assert anchor.status == 'pending'
+    assert anchor.tx_hash == chain.roots[anchor.merkle_root][0].hex()
+    declaration = Declaration.query.first()
+    assert get_anchor_proof(declaration) == {'status': 'pending'}
+
+    assert anchor_pending_declarations(chain).id == anchor.id
+    assert chain.submissions == 1
+    assert (anchor.status, anchor.block_number) == ('anchored', 1)
+    assert get_anchor_proof(declaration)['status'] == 'anchored'
+    assert anchor_pending_declarations(chain) is None
+
+
+def test_resubmits_root_that_never_mined(app):
+    chain = FakeChain()
+    add_declarations(2)
+
+    chain.drop_next = True
+    with pytest.raises(RuntimeError):
+        anchor_pending_declarations(chain)
+    db.session.rollback()
+
+    anchor = anchor_pending_declarations(chain)
+    assert chain.submissions == 2
+    assert anchor.status == 'anchored'
+
+
+def test_retry_adopts_root_when_db_write_failed(app):
+    chain = FakeChain()
+    add_declarations(2)
+
+    anchor = anchor_pending_declarations(chain)
+    # 模拟交易上链后写库失败：批次仍停留在 pending
+    anchor.status = 'pending'
+    anchor.block_number = None
+    db.session.commit()
+
+    assert anchor_pending_declarations(chain).id == anchor.id
+    assert chain.submissions == 1
+    assert (anchor.status, anchor.block_number) == ('anchored', 1)
@@ -0,0 +1,39 @@
+"""
+ASGI 公开接口：HEAD 与 GET 的状态码和响应头相同，响应体为空
+
+运行: python -m pytest tests
+"""
+import asyncio
+
+import pytest
+
+pytest.importorskip('aiosqlite')
+
+from app.asgi import PublicAPI  # noqa: E402
+
+
+def request(app, method, path):
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {'type': 'http', 'method': method, 'path': path, 'headers': []}
+    asyncio.run(app(scope, receive, send))
+    start, body = messages
+    return start['status'], dict(start['headers']), body['body']
+
+
+@pytest.mark.parametrize('path', ['/api/v1/auth/health', '/api/v1/auth/missing'])
+def test_head_sends_headers_without_body(tmp_path, path):
+    app = PublicAPI(f'sqlite:///{tmp_path / "test.db"}')
+    status, headers, body = request(app, 'GET', path)
+    assert body and int(headers[b'content-length']) == len(body)
+
+    # 健康检查含时间戳，两次响应的长度可能相差几个字节
+    head_status, head_headers, head_body = request(app, 'HEAD', path)
+    assert (head_status, head_headers.keys(), head_body) == (status, headers.keys(), b'')
+    assert int(head_headers[b'content-length']) > 0
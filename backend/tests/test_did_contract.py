@@ -0,0 +1,117 @@
+"""
+DID 合约：在进程内 eth-tester 链上部署 contracts/DID.json 中的字节码，
+检查注册、授权创建/撤销和声明根锚定
+
+需要 eth-tester[py-evm]；DID.json 中没有字节码且无法现场编译时跳过（生成方法见 scripts/build_contract.py）。
+运行: python -m pytest tests
+"""
+import pytest
+
+pytest.importorskip('eth_tester')
+
+from eth_tester import EthereumTester, PyEVMBackend  # noqa: E402
+from eth_tester.exceptions import TransactionFailed  # noqa: E402
+from web3 import Web3  # noqa: E402
+from web3.exceptions import ContractLogicError  # noqa: E402
+
+from utils.chain_backend import load_contract_artifact  # noqa: E402
+
+ONE_DAY = 24 * 3600
+
+# EthereumTesterProvider 抛出 TransactionFailed，JSON-RPC 节点抛出 ContractLogicError
+REVERTED = (ContractLogicError, TransactionFailed)
+
+
+@pytest.fixture(scope='module')
+def artifact():
+    try:
+        return load_contract_artifact()
+    except Exception as e:
+        pytest.skip(f'DID.json 中没有字节码且无法编译 DID.sol: {e}')
+
+
+@pytest.fixture
+def w3():
+    return Web3(Web3.EthereumTesterProvider(EthereumTester(PyEVMBackend())))
+
+
+@pytest.fixture
+def did(w3, artifact):
+    abi, bytecode = artifact
+    tx_hash = w3.eth.contract(abi=abi, bytecode=bytecode).constructor().transact({'from': w3.eth.accounts[0]})
+    receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
+    assert receipt['status'] == 1
+    return w3.eth.contract(address=receipt['contractAddress'], abi=abi)
+
+
+def transact(w3, function, sender):
+    receipt = w3.eth.wait_for_transaction_receipt(function.transact({'from': sender}))
+    assert receipt['status'] == 1
+    return receipt
+
+
+def test_register(w3, did):
+    alice, bob = w3.eth.accounts[1:3]
+    receipt = transact(w3, did.functions.register('alice@example.com'), alice)
+
+    event = did.events.UserRegistered().process_receipt(receipt)[0]
+    assert event['args']['wallet'] == alice
+    assert event['args']['email'] == 'alice@example.com'
+    assert did.functions.isRegistered(alice).call()
+    assert did.functions.getUserEmail(alice).call() == 'alice@example.com'
+    assert did.functions.getWalletAddress('alice@example.com').call() == alice
+
+    with pytest.raises(REVERTED, match='Email already registered'):
+        did.functions.register('alice@example.com').transact({'from': bob})
+    with pytest.raises(REVERTED, match='Wallet already registered'):
+        did.functions.register('alice2@example.com').transact({'from': alice})
+
+
+def test_create_and_revoke_authorization(w3, did):
+    alice, bob, carol = w3.eth.accounts[1:4]
+    transact(w3, did.functions.register('alice@example.com'), alice)
+
+    with pytest.raises(REVERTED, match='User not registered'):
+        did.functions.createAuthorization(alice, 'identity', ONE_DAY).transact({'from': bob})
+
+    receipt = transact(w3, did.functions.createAuthorization(bob, 'identity', ONE_DAY), alice)
+    event = did.events.AuthorizationCreated().process_receipt(receipt)[0]['args']
+    assert (event['authId'], event['owner'], event['authorized'], event['dataType']) == (1, alice, bob, 'identity')
+
+    assert did.functions.getUserAuthorizations().call({'from': alice}) == [1]
+    owner, authorized, data_type, expires_at, is_active = did.functions.getAuthorization(1).call()
+    assert (owner, authorized, data_type, is_active) == (alice, bob, 'identity', True)
+    assert expires_at > w3.eth.get_block('latest')['timestamp']
+    assert did.functions.checkAuthorization(alice, bob, 'identity').call()
+    assert not did.functions.checkAuthorization(alice, bob, 'education').call()
+    assert not did.functions.checkAuthorization(alice, carol, 'identity').call()
+
+    with pytest.raises(REVERTED, match='Not the authorization owner'):
+        did.functions.revokeAuthorization(1).transact({'from': bob})
+
+    receipt = transact(w3, did.functions.revokeAuthorization(1), alice)
+    assert did.events.AuthorizationRevoked().process_receipt(receipt)[0]['args']['authId'] == 1
+    assert not did.functions.checkAuthorization(alice, bob, 'identity').call()
+    assert not did.functions.getAuthorization(1).call()[4]
+
+    with pytest.raises(REVERTED, match='Authorization already revoked'):
+        did.functions.revokeAuthorization(1).transact({'from': alice})
+
+    # 授权 ID 连续分配
+    receipt = transact(w3, did.functions.createAuthorization(carol, 'identity', ONE_DAY), alice)
+    assert did.events.AuthorizationCreated().process_receipt(receipt)[0]['args']['authId'] == 2
+
+
+def test_anchor_declaration_root(w3, did):
+    owner, alice = w3.eth.accounts[0:2]
+    root = Web3.keccak(text='declarations')
+
+    with pytest.raises(REVERTED):
+        did.functions.anchorDeclarationRoot(root, 3).transact({'from': alice})
+
+    assert did.functions.getRootAnchorTime(root).call() == 0
+    receipt = transact(w3, did.functions.anchorDeclarationRoot(root, 3), owner)
+    assert did.functions.getRootAnchorTime(root).call() == w3.eth.get_block(receipt['blockNumber'])['timestamp']
+
+    with pytest.raises(REVERTED, match='Root already anchored'):
+        did.functions.anchorDeclarationRoot(root, 3).transact({'from': owner})
@@ -0,0 +1,66 @@
+"""
+事件索引器：UserUpdated 更新物化的用户邮箱，链重组时回滚并按剩余事件重放
+
+不连接节点，事件直接写入 ChainEvent，区块哈希由替身链提供。
+运行: python -m pytest tests
+"""
+import json
+from types import SimpleNamespace
+
+from app import db
+from app.indexer import EventIndexer, apply_event, get_user_email
+from app.models import ChainEvent, IndexerCheckpoint
+
+WALLET = '0x' + 'ab' * 20
+
+
+class FakeEth:
+    def __init__(self):
+        self.hashes = {}
+
+    def get_block(self, block_number):
+        return {'hash': bytes.fromhex(self.hashes.get(block_number, '00' * 32))}
+
+
+def block_hash(block_number, fork=0):
+    return f'{fork:02x}{block_number:062x}'
+
+
+def index(eth, block_number, name, email):
+    eth.hashes[block_number] = block_hash(block_number)
+    event = ChainEvent(
+        block_number=block_number,
+        block_hash=eth.hashes[block_number],
+        tx_hash=f'0x{block_number:064x}',
+        log_index=0,
+        event=name,
+        wallet=WALLET,
+        payload=json.dumps({'email': email})
+    )
+    db.session.add(event)
+    apply_event(event)
+    db.session.flush()
+    db.session.merge(IndexerCheckpoint(
+        name='did_contract', block_number=block_number, block_hash=eth.hashes[block_number]
+    ))
+    db.session.commit()
+
+
+def test_user_updated_changes_email_and_rolls_back_on_reorg(app):
+    eth = FakeEth()
+    indexer = EventIndexer(SimpleNamespace(eth=eth), SimpleNamespace(abi=[]))
+
+    index(eth, 1, 'UserRegistered', 'alice@example.com')
+    index(eth, 2, 'UserUpdated', 'alice@new.example.com')
+    index(eth, 3, 'UserUpdated', 'alice@newer.example.com')
+    assert get_user_email(WALLET) == 'alice@newer.example.com'
+
+    # 区块 3 被替换：回滚到区块 2，邮箱恢复为第一次更新后的值
+    eth.hashes[3] = block_hash(3, fork=1)
+    assert indexer._handle_reorg(IndexerCheckpoint.query.get('did_contract')) == 2
+    assert get_user_email(WALLET) == 'alice@new.example.com'
+
+    # 区块 2 也被替换：只剩注册事件
+    eth.hashes[2] = block_hash(2, fork=1)
+    assert indexer._handle_reorg(IndexerCheckpoint.query.get('did_contract')) == 1
+    assert get_user_email(WALLET) == 'alice@example.com'
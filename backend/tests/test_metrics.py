@@ -0,0 +1,66 @@
+"""
+多进程指标：每个 worker 写入自己的快照，/metrics 输出合并后的值，
+worker 退出后计数器保留、仪表丢弃
+
+运行: python -m pytest tests
+"""
+import multiprocessing
+
+from utils.metrics import MetricsRegistry, clear_multiprocess_dir, mark_process_dead
+
+
+def make_registry(directory):
+    registry = MetricsRegistry(str(directory))
+    requests = registry.counter('requests_total', '请求数', ['status'])
+    in_flight = registry.gauge('in_flight', '进行中的请求数')
+    latency = registry.histogram('latency_seconds', '耗时', buckets=(0.1, 1.0))
+    return registry, requests, in_flight, latency
+
+
+def worker(directory, requests_count, started, done):
+    registry, requests, in_flight, latency = make_registry(directory)
+    for _ in range(requests_count):
+        requests.inc(200)
+        latency.observe(0.05)
+    in_flight.inc()
+    registry.write_snapshot()
+    started.set()
+    done.wait(10)
+
+
+def sample(text, line_prefix):
+    for line in text.splitlines():
+        if line.startswith(line_prefix + ' '):
+            return float(line.split()[-1])
+    return None
+
+
+def test_render_merges_workers_and_keeps_counts_after_exit(tmp_path):
+    clear_multiprocess_dir(str(tmp_path))
+    context = multiprocessing.get_context('fork')
+    done = context.Event()
+    processes = []
+    for count in (3, 5):
+        started = context.Event()
+        process = context.Process(target=worker, args=(tmp_path, count, started, done))
+        process.start()
+        assert started.wait(10)
+        processes.append(process)
+
+    registry, requests, _, _ = make_registry(tmp_path)
+    requests.inc(200)
+    text = registry.render()
+    assert sample(text, 'requests_total{status="200"}') == 9
+    assert sample(text, 'in_flight') == 2
+    assert sample(text, 'latency_seconds_bucket{le="0.1"}') == 8
+    assert sample(text, 'latency_seconds_count') == 8
+
+    done.set()
+    for process in processes:
+        process.join(10)
+        mark_process_dead(process.pid, str(tmp_path))
+
+    text = registry.render()
+    assert sample(text, 'requests_total{status="200"}') == 9
+    assert sample(text, 'latency_seconds_count') == 8
+    assert sample(text, 'in_flight') is None
@@ -0,0 +1,115 @@
+"""
+限流器并发：多线程同时请求被 @rate_limit 装饰的路由，放行次数恰好等于上限，
+不同路由各自计数
+
+后端依次为进程内 MemoryBackend、fakeredis（执行同一段 Lua 脚本，需要 fakeredis[lua]）
+和 KV_URL 指向的真实 Redis；缺少依赖或连不上 Redis 时跳过对应用例。
+运行: python -m pytest tests
+"""
+import os
+import threading
+import uuid
+from collections import Counter
+
+import pytest
+from flask import Flask
+
+from app.middleware import backends
+from app.middleware.backends import MemoryBackend, RedisBackend
+from app.middleware.rate_limit import rate_limit
+
+THREADS = 16
+REQUESTS = 400
+LIMIT = 25
+
+
+def fakeredis_backend():
+    fakeredis = pytest.importorskip('fakeredis')
+    pytest.importorskip('lupa')
+    return RedisBackend(fakeredis.FakeRedis())
+
+
+def redis_backend():
+    redis = pytest.importorskip('redis')
+    client = redis.Redis.from_url(os.getenv('KV_URL', 'redis://localhost:6379/0'), socket_connect_timeout=0.5)
+    try:
+        client.ping()
+    except redis.RedisError:
+        pytest.skip('没有可用的 Redis')
+    return RedisBackend(client)
+
+
+@pytest.fixture(params=['memory', 'fakeredis', 'redis'])
+def backend(request, monkeypatch):
+    if request.param == 'memory':
+        kv = MemoryBackend()
+    elif request.param == 'fakeredis':
+        kv = fakeredis_backend()
+    else:
+        kv = redis_backend()
+    monkeypatch.setattr(backends, '_backend', kv)
+    return kv
+
+
+def random_addr():
+    return f'10.{uuid.uuid4().int % 250}.{uuid.uuid4().int % 250}.1'
+
+
+def build_app():
+    app = Flask(__name__)
+
+    @app.route('/a')
+    @rate_limit(limit=LIMIT, period=60)
+    def route_a():
+        return 'ok'
+
+    @app.route('/b')
+    @rate_limit(limit=LIMIT, period=60)
+    def route_b():
+        return 'ok'
+
+    return app
+
+
+def test_concurrent_hits_never_exceed_limit(backend):
+    app = build_app()
+    # 每次运行使用新的客户端地址，真实 Redis 中不受上次运行的计数影响
+    remote_addr = random_addr()
+    results = Counter()
+    lock = threading.Lock()
+    barrier = threading.Barrier(THREADS)
+
+    def worker(index):
+        client = app.test_client()
+        local = Counter()
+        barrier.wait()
+        for i in range(index, REQUESTS, THREADS):
+            path = '/a' if i % 2 else '/b'
+            response = client.get(path, environ_base={'REMOTE_ADDR': remote_addr})
+            local[(path, response.status_code)] += 1
+        with lock:
+            results.update(local)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(30)
+
+    for path in ('/a', '/b'):
+        assert results[(path, 200)] == LIMIT
+        assert results[(path, 429)] == REQUESTS // 2 - LIMIT
+
+
+def test_rejected_response_headers(backend):
+    client = build_app().test_client()
+    environ = {'REMOTE_ADDR': random_addr()}
+    for remaining in range(LIMIT - 1, -1, -1):
+        response = client.get('/a', environ_base=environ)
+        assert response.status_code == 200
+        assert response.headers['RateLimit-Remaining'] == str(remaining)
+
+    response = client.get('/a', environ_base=environ)
+    assert response.status_code == 429
+    assert response.headers['RateLimit-Limit'] == str(LIMIT)
+    assert 1 <= int(response.headers['Retry-After']) <= 60
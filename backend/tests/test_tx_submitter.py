@@ -0,0 +1,76 @@
+"""
+交易提交队列：在进程内 eth-tester 链上并发提交交易，
+检查每笔交易都被打包且 nonce 不重复、不跳号
+
+需要 eth-tester[py-evm]。运行: python -m pytest tests
+"""
+import threading
+
+import pytest
+
+pytest.importorskip('eth_tester')
+
+from eth_tester import EthereumTester, PyEVMBackend  # noqa: E402
+from web3 import Web3  # noqa: E402
+
+from utils.tx_submitter import get_submitter, shutdown_submitters  # noqa: E402
+
+# 最小合约：运行时代码只有 STOP，任何调用都成功
+PING_BYTECODE = '0x600180600b6000396000f300'
+PING_ABI = [{'type': 'function', 'name': 'ping', 'inputs': [], 'outputs': [], 'stateMutability': 'nonpayable'}]
+
+
+@pytest.fixture
+def provider():
+    provider = Web3.EthereumTesterProvider(EthereumTester(PyEVMBackend()))
+    yield provider
+    shutdown_submitters()
+
+
+def deploy_ping(w3):
+    tx_hash = w3.eth.contract(abi=PING_ABI, bytecode=PING_BYTECODE).constructor().transact({'from': w3.eth.accounts[0]})
+    address = w3.eth.wait_for_transaction_receipt(tx_hash)['contractAddress']
+    return address
+
+
+def test_submitter_shared_per_node(provider):
+    # 两个 Web3 实例连接同一节点（如两个 ContractManager），必须拿到同一个提交队列
+    first, second = Web3(provider), Web3(provider)
+    assert get_submitter(first) is get_submitter(second)
+    assert get_submitter(Web3(Web3.EthereumTesterProvider(EthereumTester(PyEVMBackend())))) is not get_submitter(first)
+
+
+def test_concurrent_submissions_get_unique_nonces(provider):
+    # 模拟锚定、对账、路由等多个调用方从同一账户并发发送
+    clients = [Web3(provider) for _ in range(4)]
+    address = deploy_ping(clients[0])
+    sender = clients[0].eth.accounts[1]
+    start_nonce = clients[0].eth.get_transaction_count(sender)
+
+    threads_per_client, per_thread = 2, 10
+    futures = []
+    futures_lock = threading.Lock()
+
+    def send(w3):
+        contract = w3.eth.contract(address=address, abi=PING_ABI)
+        submitter = get_submitter(w3)
+        for _ in range(per_thread):
+            future = submitter.submit(contract.functions.ping(), sender)
+            with futures_lock:
+                futures.append(future)
+
+    threads = [threading.Thread(target=send, args=(w3,)) for w3 in clients for _ in range(threads_per_client)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    total = len(clients) * threads_per_client * per_thread
+    receipts = [future.result(timeout=60) for future in futures]
+    assert len(receipts) == total
+    assert all(receipt['status'] == 1 for receipt in receipts)
+
+    w3 = clients[0]
+    nonces = sorted(w3.eth.get_transaction(receipt['transactionHash'])['nonce'] for receipt in receipts)
+    assert nonces == list(range(start_nonce, start_nonce + total))
+    assert w3.eth.get_transaction_count(sender) == start_nonce + total
@@ -0,0 +1,56 @@
+"""
+/user-data/<data_type>：GET 返回强 ETag，PATCH 的 If-Match 按强比较校验，
+压缩后的表示带 -<编码> 后缀的 ETag 同样可用于 If-Match
+
+运行: python -m pytest tests
+"""
+import os
+
+import jwt
+import pytest
+
+from app import db
+from app.models import User
+
+URL = '/api/v1/auth/user-data/profile'
+MERGE_PATCH = 'application/merge-patch+json'
+
+
+@pytest.fixture
+def client(app):
+    user = User(name='alice', email='alice@example.com', password_hash='x', wallet_address='0x' + 'ab' * 20)
+    db.session.add(user)
+    db.session.commit()
+    token = jwt.encode({'user_id': user.id}, os.getenv('SECRET_KEY', 'your-secret-key'), algorithm='HS256')
+    client = app.test_client()
+    client.environ_base['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+    return client
+
+
+def patch(client, body, etag):
+    return client.patch(URL, json=body, content_type=MERGE_PATCH, headers={'If-Match': etag})
+
+
+def test_if_match_uses_strong_etag(client):
+    assert client.patch(URL, json={'bio': 'x' * 2000}, content_type=MERGE_PATCH).status_code == 201
+
+    response = client.get(URL)
+    etag, weak = response.get_etag()
+    assert etag and not weak
+    assert response.headers['ETag'] == f'"{etag}"'
+    assert client.get(URL, headers={'If-None-Match': f'"{etag}"'}).status_code == 304
+
+    # 弱 ETag 不能用于 If-Match
+    assert patch(client, {'city': 'a'}, f'W/"{etag}"').status_code == 412
+    response = patch(client, {'city': 'a'}, f'"{etag}"')
+    assert response.status_code == 200
+    # 旧版本的 ETag 已失效
+    assert patch(client, {'city': 'b'}, f'"{etag}"').status_code == 412
+
+    # 压缩后的表示使用另一个强 ETag，同样可以用于条件更新和条件 GET
+    response = client.get(URL, headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    gzip_etag, weak = response.get_etag()
+    assert not weak and gzip_etag.endswith('-gzip')
+    assert client.get(URL, headers={'If-None-Match': f'"{gzip_etag}"'}).status_code == 304
+    assert patch(client, {'city': 'c'}, f'"{gzip_etag}"').status_code == 200
@@ -0,0 +1,131 @@
+import json
+import os
+import threading
+from pathlib import Path
+
+from web3 import Web3
+
+BACKEND_DIR = Path(__file__).parent.parent
+CONTRACT_SOURCE_PATH = BACKEND_DIR / 'contracts' / 'DID.sol'
+CONTRACT_JSON_PATH = BACKEND_DIR / 'contracts' / 'DID.json'
+OPENZEPPELIN_PATH = BACKEND_DIR / 'node_modules' / '@openzeppelin' / 'contracts'
+
+# DID.sol 依赖 @openzeppelin/contracts 5.x（package.json），需要 solc >= 0.8.20
+SOLC_VERSION = '0.8.20'
+EVM_VERSION = 'paris'
+
+# 链后端：http 连接外部节点（Ganache 等），eth-tester 在进程内运行 py-evm
+HTTP_BACKEND = 'http'
+TESTER_BACKEND = 'eth-tester'
+
+_tester = None
+_tester_lock = threading.Lock()
+
+
+def get_backend_name():
+    """当前配置的链后端"""
+    return os.getenv('CHAIN_BACKEND', HTTP_BACKEND)
+
+
+def compile_did_contract(solc_version=SOLC_VERSION):
+    """编译 DID 合约，返回 (abi, bytecode)"""
+    from solcx import compile_standard, install_solc
+    if not OPENZEPPELIN_PATH.exists():
+        raise RuntimeError('缺少 @openzeppelin/contracts，请先在 backend 目录执行 npm install')
+    install_solc(solc_version)
+
+    compiled = compile_standard(
+        {
+            'language': 'Solidity',
+            'sources': {
+                'DID.sol': {'content': CONTRACT_SOURCE_PATH.read_text()}
+            },
+            'settings': {
+                'remappings': ['@openzeppelin/=node_modules/@openzeppelin/'],
+                # 不使用 PUSH0 等 shanghai 之后的指令，Ganache 也能部署
+                'evmVersion': EVM_VERSION,
+                'outputSelection': {
+                    '*': {
+                        '*': ['abi', 'evm.bytecode']
+                    }
+                }
+            }
+        },
+        solc_version=solc_version,
+        allow_paths=str(BACKEND_DIR),
+        base_path=str(BACKEND_DIR)
+    )
+    contract = compiled['contracts']['DID.sol']['DID']
+    return contract['abi'], contract['evm']['bytecode']['object']
+
+
+def write_contract_artifact(abi, bytecode, path=CONTRACT_JSON_PATH):
+    """写入 DID.json 的 abi 和 bytecode，保留已有的部署地址（networks）"""
+    artifact = {}
+    if path.exists():
+        with open(path) as f:
+            artifact = json.load(f)
+    artifact.update({'abi': abi, 'bytecode': bytecode, 'compiler': f'solc {SOLC_VERSION} ({EVM_VERSION})'})
+    with open(path, 'w') as f:
+        json.dump(artifact, f, indent=2)
+        f.write('\n')
+
+
+def load_contract_artifact():
+    """读取合约 ABI 和字节码；DID.json 中没有字节码时现场编译"""
+    if CONTRACT_JSON_PATH.exists():
+        with open(CONTRACT_JSON_PATH) as f:
+            artifact = json.load(f)
+        if artifact.get('bytecode'):
+            return artifact['abi'], artifact['bytecode']
+    return compile_did_contract()
+
+
+class InProcessChain:
+    """进程内链：eth-tester + py-evm，启动时自动部署 DID 合约"""
+
+    def __init__(self):
+        try:
+            from eth_tester import EthereumTester, PyEVMBackend
+        except ImportError:
+            raise RuntimeError('CHAIN_BACKEND=eth-tester 需要安装 eth-tester[py-evm]')
+
+        self.tester = EthereumTester(backend=PyEVMBackend())
+        self.w3 = Web3(Web3.EthereumTesterProvider(self.tester))
+        self.accounts = self.w3.eth.accounts
+
+        abi, bytecode = load_contract_artifact()
+        factory = self.w3.eth.contract(abi=abi, bytecode=bytecode)
+        tx_hash = factory.constructor().transact({'from': self.accounts[0]})
+        receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
+        self.contract_address = receipt['contractAddress']
+        self.deploy_block = receipt['blockNumber']
+        self.contract = self.w3.eth.contract(address=self.contract_address, abi=abi)
+
+    def add_account(self, private_key, fund_wei=10 ** 21):
+        """新增一个解锁账户并从部署账户转入测试余额"""
+        address = self.tester.add_account(private_key)
+        address = Web3.to_checksum_address(address)
+        self.w3.eth.send_transaction({'from': self.accounts[0], 'to': address, 'value': fund_wei})
+        return address
+
+
+def get_in_process_chain():
+    """获取进程内唯一的测试链（所有调用方共享同一条链）"""
+    global _tester
+    if _tester is None:
+        with _tester_lock:
+            if _tester is None:
+                _tester = InProcessChain()
+    return _tester
+
+
+def uses_http(w3):
+    """是否通过 HTTP JSON-RPC 连接节点（批量请求只在 HTTP 下可用）"""
+    return isinstance(w3.provider, Web3.HTTPProvider)
+
+
+def node_key(w3):
+    """标识 w3 连接的节点：HTTP 按 endpoint，进程内链按 provider 实例"""
+    endpoint = getattr(w3.provider, 'endpoint_uri', None)
+    return str(endpoint) if endpoint else id(w3.provider)
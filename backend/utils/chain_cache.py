@@ -0,0 +1,131 @@
+import os
+import threading
+from collections import OrderedDict
+
+from .chain_backend import node_key
+
+
+class BlockCache:
+    """
+    合约只读调用的缓存
+    - 以 (函数名, 参数) 为键，条目标记所属区块号
+    - 链上状态只会随新区块变化，出现新区块时整体失效
+    - 容量有限，超出后按 LRU 淘汰
+    """
+
+    def __init__(self, max_size=10000):
+        self.max_size = max_size
+        self.block_number = None  # 当前已知的最新区块，未知时不缓存
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bypasses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get_or_call(self, key, fn, fresh=False):
+        """
+        读取缓存，未命中时调用 fn(block_number) 并写入
+        fn 必须在 block_number 对应的区块上读取（为 None 时区块未知，读取 latest，结果不缓存），
+        否则缓存的值可能来自比键更新的区块
+        :param fresh: 为 True 时跳过缓存（结果仍会写回缓存）
+        """
+        with self._lock:
+            block_number = self.block_number
+            if fresh:
+                self.bypasses += 1
+            else:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] == block_number:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                self.misses += 1
+
+        value = fn(block_number)
+
+        with self._lock:
+            # 调用期间出现新区块时，结果可能属于旧区块，不写入
+            if block_number is not None and block_number == self.block_number:
+                self._entries[key] = (block_number, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return value
+
+    def on_new_block(self, block_number):
+        """新区块到达时清空缓存"""
+        with self._lock:
+            if block_number == self.block_number:
+                return
+            self.block_number = block_number
+            if self._entries:
+                self._entries.clear()
+                self.invalidations += 1
+
+    def stats(self):
+        """缓存指标"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'block_number': self.block_number,
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'bypasses': self.bypasses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations
+            }
+
+
+class NewBlockWatcher(threading.Thread):
+    """轻量新区块监听：轮询 eth_blockNumber，区块号变化时通知缓存"""
+
+    def __init__(self, w3, cache, interval=1.0):
+        super().__init__(name='new-block-watcher', daemon=True)
+        self.w3 = w3
+        self.cache = cache
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                self.cache.on_new_block(self.w3.eth.block_number)
+            except Exception:
+                # 节点不可用时禁用缓存，避免返回过期数据
+                self.cache.on_new_block(None)
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_block_cache(w3):
+    """获取进程内共享的只读调用缓存，每个节点一个缓存和一个新区块轮询线程"""
+    key = node_key(w3)
+    with _caches_lock:
+        entry = _caches.get(key)
+        if entry is None:
+            cache = BlockCache(max_size=int(os.getenv('VIEW_CACHE_SIZE', '10000')))
+            watcher = NewBlockWatcher(w3, cache, interval=float(os.getenv('BLOCK_POLL_INTERVAL', '1')))
+            watcher.start()
+            entry = _caches[key] = (cache, watcher)
+        return entry[0]
+
+
+def stop_block_watchers():
+    """停止所有新区块轮询线程"""
+    with _caches_lock:
+        entries = list(_caches.values())
+        _caches.clear()
+    for _, watcher in entries:
+        watcher.stop()
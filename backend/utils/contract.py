@@ -1,87 +1,261 @@
 from web3 import Web3
+from eth_abi import decode
+from collections import namedtuple
 import json
 import os
+import time
+import requests
 from dotenv import load_dotenv
+from .tx_submitter import get_submitter
+from .chain_cache import get_block_cache
+from .chain_backend import TESTER_BACKEND, get_backend_name, get_in_process_chain, uses_http
+from .metrics import CHAIN_CALL_SECONDS
 
 load_dotenv()
 
+# 合约 getAuthorization 返回的授权结构
+Authorization = namedtuple('Authorization', ['auth_id', 'owner', 'authorized', 'data_type', 'expires_at', 'is_active'])
+
 class ContractManager:
-    def __init__(self):
-        self.w3 = Web3(Web3.HTTPProvider(os.getenv('ETHEREUM_RPC_URL')))
-        
-        # 加载合约 ABI
-        with open('backend/contracts/DID.json', 'r') as f:
-            contract_json = json.load(f)
-            self.contract_abi = contract_json['abi']
+    def __init__(self, backend=None):
+        """
+        :param backend: 链后端，默认读取 CHAIN_BACKEND（http 或 eth-tester）
+        """
+        self.backend = backend or get_backend_name()
+        self.session = requests.Session()
         
-        # 加载合约地址
-        with open('backend/contracts/contract_address.txt', 'r') as f:
-            self.contract_address = f.read().strip()
+        if self.backend == TESTER_BACKEND:
+            # 进程内链，合约在首次使用时自动部署
+            chain = get_in_process_chain()
+            self.rpc_url = None
+            self.w3 = chain.w3
+            self.contract_abi = chain.contract.abi
+            self.contract_address = chain.contract_address
+        else:
+            self.rpc_url = os.getenv('ETHEREUM_RPC_URL')
+            self.w3 = Web3(Web3.HTTPProvider(self.rpc_url, session=self.session))
+            
+            # 加载合约 ABI
+            with open('backend/contracts/DID.json', 'r') as f:
+                contract_json = json.load(f)
+                self.contract_abi = contract_json['abi']
+            
+            # 加载合约地址
+            with open('backend/contracts/contract_address.txt', 'r') as f:
+                self.contract_address = f.read().strip()
         
         # 创建合约实例
         self.contract = self.w3.eth.contract(
             address=self.contract_address,
             abi=self.contract_abi
         )
+        
+        # 交易提交队列：同一节点的所有 ContractManager 共享，nonce 只在一处分配
+        self.submitter = get_submitter(self.w3)
+        
+        # 只读调用缓存：同一节点共享，新区块到达时失效
+        self.view_cache = get_block_cache(self.w3)
+    
+    def _transact(self, contract_function, sender_address, wait=True, callback=None):
+        """提交交易；wait 为 False 时立即返回结果为回执的 Future"""
+        future = self.submitter.submit(contract_function, sender_address, callback=callback)
+        if not wait:
+            return future
+        return future.result()
+    
+    def _call(self, function, contract_call, *args, **kwargs):
+        """执行只读调用并记录耗时"""
+        started = time.monotonic()
+        try:
+            return contract_call(*args, **kwargs)
+        finally:
+            CHAIN_CALL_SECONDS.observe(time.monotonic() - started, function)
+    
+    def _cached_call(self, key, contract_call, fresh):
+        """经缓存的只读调用，在缓存所属的区块上读取，key 的第一项为合约函数名"""
+        if fresh:
+            # 先同步到最新区块，读取结果仍可写回缓存
+            self.view_cache.on_new_block(self.w3.eth.block_number)
+        return self.view_cache.get_or_call(
+            key,
+            lambda block_number: self._call(
+                key[0], contract_call,
+                block_identifier='latest' if block_number is None else block_number
+            ),
+            fresh
+        )
     
-    def register_user(self, wallet_address, email):
+    def register_user(self, wallet_address, email, wait=True, callback=None):
         """注册用户"""
-        tx_hash = self.contract.functions.register(email).transact({
-            'from': wallet_address
-        })
-        return self.w3.eth.wait_for_transaction_receipt(tx_hash)
+        return self._transact(
+            self.contract.functions.register(email),
+            wallet_address, wait, callback
+        )
     
-    def bind_wallet(self, wallet_address, email):
+    def bind_wallet(self, wallet_address, email, wait=True, callback=None):
         """绑定钱包"""
-        tx_hash = self.contract.functions.bindWallet(email).transact({
-            'from': wallet_address
-        })
-        return self.w3.eth.wait_for_transaction_receipt(tx_hash)
+        return self._transact(
+            self.contract.functions.bindWallet(email),
+            wallet_address, wait, callback
+        )
     
-    def create_authorization(self, owner_address, authorized_address, data_type, expires_in):
+    def create_authorization(self, owner_address, authorized_address, data_type, expires_in,
+                             wait=True, callback=None):
         """创建授权"""
-        tx_hash = self.contract.functions.createAuthorization(
-            authorized_address,
-            data_type,
-            expires_in
-        ).transact({
-            'from': owner_address
-        })
-        return self.w3.eth.wait_for_transaction_receipt(tx_hash)
-    
-    def revoke_authorization(self, owner_address, auth_id):
+        return self._transact(
+            self.contract.functions.createAuthorization(
+                authorized_address,
+                data_type,
+                expires_in
+            ),
+            owner_address, wait, callback
+        )
+    
+    def revoke_authorization(self, owner_address, auth_id, wait=True, callback=None):
         """撤销授权"""
-        tx_hash = self.contract.functions.revokeAuthorization(auth_id).transact({
-            'from': owner_address
-        })
-        return self.w3.eth.wait_for_transaction_receipt(tx_hash)
+        return self._transact(
+            self.contract.functions.revokeAuthorization(auth_id),
+            owner_address, wait, callback
+        )
     
-    def check_authorization(self, owner_address, authorized_address, data_type):
+    def check_authorization(self, owner_address, authorized_address, data_type, fresh=False):
         """检查授权"""
-        return self.contract.functions.checkAuthorization(
-            owner_address,
-            authorized_address,
-            data_type
-        ).call()
+        return self._cached_call(
+            ('checkAuthorization', owner_address, authorized_address, data_type),
+            self.contract.functions.checkAuthorization(
+                owner_address,
+                authorized_address,
+                data_type
+            ).call,
+            fresh
+        )
     
     def get_user_authorizations(self, wallet_address):
         """获取用户授权列表"""
-        return self.contract.functions.getUserAuthorizations().call({
-            'from': wallet_address
-        })
+        return self._call(
+            'getUserAuthorizations',
+            self.contract.functions.getUserAuthorizations().call,
+            {'from': wallet_address}
+        )
     
     def get_authorization(self, auth_id):
         """获取授权详情"""
-        return self.contract.functions.getAuthorization(auth_id).call()
+        return self._call('getAuthorization', self.contract.functions.getAuthorization(auth_id).call)
     
-    def is_registered(self, wallet_address):
+    def _batch_call(self, calls, block_identifier='latest'):
+        """
+        在一次 JSON-RPC 批量请求中执行多个 eth_call
+        :param calls: [(合约函数名, 参数列表), ...]
+        :return: 按顺序解码后的返回值列表
+        """
+        if not calls:
+            return []
+        if not uses_http(self.w3):
+            # 进程内链没有 HTTP 往返开销，直接逐个调用
+            return [
+                getattr(self.contract.functions, fn_name)(*args).call(block_identifier=block_identifier)
+                for fn_name, args in calls
+            ]
+        if isinstance(block_identifier, int):
+            block_identifier = hex(block_identifier)
+
+        payloads = []
+        output_types = []
+        for fn_name, args in calls:
+            fn_abi = self.contract.get_function_by_name(fn_name).abi
+            output_types.append([output['type'] for output in fn_abi['outputs']])
+            payloads.append({
+                'jsonrpc': '2.0',
+                'id': len(payloads),
+                'method': 'eth_call',
+                'params': [{
+                    'to': self.contract_address,
+                    'data': self.contract.encodeABI(fn_name=fn_name, args=args)
+                }, block_identifier]
+            })
+
+        response = self._call('batch_call', self.session.post, self.rpc_url, json=payloads, timeout=30)
+        response.raise_for_status()
+
+        results = [None] * len(payloads)
+        for item in response.json():
+            if 'error' in item:
+                raise ValueError(item['error'])
+            index = item['id']
+            results[index] = decode(output_types[index], bytes.fromhex(item['result'][2:]))
+        return results
+    
+    def get_authorizations(self, auth_ids, batch_size=200):
+        """批量获取授权详情，每 batch_size 个授权只发送一次 HTTP 请求"""
+        auth_ids = list(auth_ids)
+        authorizations = []
+        for start in range(0, len(auth_ids), batch_size):
+            chunk = auth_ids[start:start + batch_size]
+            results = self._batch_call([('getAuthorization', [auth_id]) for auth_id in chunk])
+            for auth_id, (owner, authorized, data_type, expires_at, is_active) in zip(chunk, results):
+                authorizations.append(Authorization(
+                    auth_id,
+                    Web3.to_checksum_address(owner),
+                    Web3.to_checksum_address(authorized),
+                    data_type,
+                    expires_at,
+                    is_active
+                ))
+        return authorizations
+    
+    def get_user_authorization_details(self, wallet_address):
+        """获取用户的全部授权详情（1 次列表查询 + 批量详情查询）"""
+        return self.get_authorizations(self.get_user_authorizations(wallet_address))
+    
+    def is_registered(self, wallet_address, fresh=False):
         """检查用户是否已注册"""
-        return self.contract.functions.isRegistered(wallet_address).call()
+        return self._cached_call(
+            ('isRegistered', wallet_address),
+            self.contract.functions.isRegistered(wallet_address).call,
+            fresh
+        )
     
-    def get_user_email(self, wallet_address):
+    def get_user_email(self, wallet_address, fresh=False):
         """获取用户邮箱"""
-        return self.contract.functions.getUserEmail(wallet_address).call()
+        return self._cached_call(
+            ('getUserEmail', wallet_address),
+            self.contract.functions.getUserEmail(wallet_address).call,
+            fresh
+        )
     
-    def get_wallet_address(self, email):
+    def get_wallet_address(self, email, fresh=False):
         """获取钱包地址"""
-        return self.contract.functions.getWalletAddress(email).call() 
\ No newline at end of file
+        return self._cached_call(
+            ('getWalletAddress', email),
+            self.contract.functions.getWalletAddress(email).call,
+            fresh
+        )
+    
+    def get_cache_stats(self):
+        """只读调用缓存指标"""
+        return self.view_cache.stats()
+    
+    def anchor_declaration_root(self, sender_address, merkle_root, leaf_count, wait=True, callback=None):
+        """锚定声明批次的 Merkle 根"""
+        return self._transact(
+            self.contract.functions.anchorDeclarationRoot(
+                bytes.fromhex(merkle_root[2:]),
+                leaf_count
+            ),
+            sender_address, wait, callback
+        )
+    
+    def find_root_anchored_event(self, merkle_root, from_block=0):
+        """查找 Merkle 根的 DeclarationRootAnchored 事件（root 为 indexed 参数，按主题过滤），未找到返回 None"""
+        events = self.contract.events.DeclarationRootAnchored.get_logs(
+            argument_filters={'root': bytes.fromhex(merkle_root[2:])},
+            fromBlock=from_block
+        )
+        return events[0] if events else None
+    
+    def get_root_anchor_time(self, merkle_root):
+        """获取 Merkle 根的锚定时间（未锚定返回 0）"""
+        return self._call(
+            'getRootAnchorTime',
+            self.contract.functions.getRootAnchorTime(bytes.fromhex(merkle_root[2:])).call
+        ) 
\ No newline at end of file
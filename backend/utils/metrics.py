@@ -0,0 +1,351 @@
+import copy
+import fcntl
+import glob
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# 延迟直方图默认分桶（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# 多进程部署（gunicorn 多个 worker）时各进程写入指标快照的共享目录
+# 设置后 /metrics 输出所有 worker 合并后的值；未设置时只输出处理该请求的进程自己的指标
+METRICS_MULTIPROC_DIR = os.getenv('METRICS_MULTIPROC_DIR')
+# worker 写入快照的间隔（秒），合并结果中其他 worker 的值最多滞后这么久
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', '5'))
+# 已退出 worker 的计数器和直方图累加到该文件，避免回收 worker 后计数回落
+ARCHIVE_FILE = 'archive.json'
+
+
+def _format_labels(labelnames, labelvalues, extra=None):
+    pairs = list(zip(labelnames, labelvalues))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """单调递增计数器"""
+    type = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues, amount=1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def samples(self, values=None):
+        if values is None:
+            with self._lock:
+                values = dict(self._values)
+        for labelvalues, value in values.items():
+            yield self.name, _format_labels(self.labelnames, labelvalues), value
+
+
+class Gauge:
+    """可增可减的瞬时值"""
+    type = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues, amount=1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def dec(self, *labelvalues, amount=1):
+        self.inc(*labelvalues, amount=-amount)
+
+    def set(self, value, *labelvalues):
+        with self._lock:
+            self._values[labelvalues] = value
+
+    def samples(self, values=None):
+        if values is None:
+            with self._lock:
+                values = dict(self._values)
+        for labelvalues, value in values.items():
+            yield self.name, _format_labels(self.labelnames, labelvalues), value
+
+
+class Histogram:
+    """累积分桶直方图"""
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}  # labelvalues => [各桶计数, 总和, 次数]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labelvalues):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labelvalues)
+            if state is None:
+                state = self._values[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, *labelvalues):
+        """记录 with 代码块的耗时（秒）"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labelvalues)
+
+    def samples(self, values=None):
+        if values is None:
+            with self._lock:
+                values = copy.deepcopy(self._values)
+        for labelvalues, (counts, total, count) in values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, labelvalues, ('le', _format_value(float(bound))))
+                yield self.name + '_bucket', labels, cumulative
+            labels = _format_labels(self.labelnames, labelvalues)
+            yield self.name + '_sum', labels, total
+            yield self.name + '_count', labels, count
+
+
+def _merge_state(metric_type, a, b):
+    """合并两个进程中同一组标签的值"""
+    if metric_type == 'histogram':
+        return [[x + y for x, y in zip(a[0], b[0])], a[1] + b[1], a[2] + b[2]]
+    return a + b
+
+
+def _read_snapshot(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _merge_snapshot(merged, snapshot, include_gauges=True):
+    """将一个快照 {指标名: {'type', 'values': [[标签值, 值], ...]}} 合并到 merged"""
+    for name, metric in snapshot.items():
+        if metric['type'] == 'gauge' and not include_gauges:
+            continue
+        target = merged.setdefault(name, {'type': metric['type'], 'values': {}})
+        for labelvalues, state in metric['values']:
+            key = tuple(labelvalues)
+            current = target['values'].get(key)
+            target['values'][key] = state if current is None else _merge_state(metric['type'], current, state)
+    return merged
+
+
+def _dump_snapshot(merged):
+    return {name: {'type': metric['type'], 'values': [[list(k), v] for k, v in metric['values'].items()]}
+            for name, metric in merged.items()}
+
+
+def _write_json(path, data):
+    # 先写临时文件再原子替换，读取方不会看到写了一半的文件
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+@contextmanager
+def _directory_lock(directory, mode):
+    # 合并已退出 worker 的快照（独占）与读取全部快照（共享）互斥，避免同一份数据被计两次
+    with open(os.path.join(directory, '.lock'), 'a') as handle:
+        fcntl.flock(handle, mode)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+class MetricsRegistry:
+    """
+    指标注册表，输出 Prometheus 文本格式
+    指定 multiprocess_dir 时，各进程定期把本进程的值写入该目录下的 <pid>.json，
+    输出时合并目录中所有快照：计数器和直方图按标签求和，仪表只合并仍在运行的进程
+    """
+
+    def __init__(self, multiprocess_dir=None):
+        self.multiprocess_dir = multiprocess_dir
+        self._metrics = {}
+        self._lock = threading.Lock()
+        self._flusher_pid = None
+
+    def _register(self, cls, name, *args, **kwargs):
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = cls(name, *args, **kwargs)
+            return self._metrics[name]
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def reset(self):
+        """清空所有指标的值（fork 出的 worker 不继承主进程已记录的值）"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            with metric._lock:
+                metric._values.clear()
+
+    def snapshot(self):
+        """本进程各指标的当前值"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        snapshot = {}
+        for metric in metrics:
+            with metric._lock:
+                values = [[list(k), copy.deepcopy(v)] for k, v in metric._values.items()]
+            snapshot[metric.name] = {'type': metric.type, 'values': values}
+        return snapshot
+
+    def write_snapshot(self):
+        """将本进程的值写入共享目录"""
+        if self.multiprocess_dir:
+            _write_json(os.path.join(self.multiprocess_dir, f'{os.getpid()}.json'), self.snapshot())
+
+    def start_flusher(self, interval=METRICS_FLUSH_INTERVAL):
+        """启动后台线程定期写入快照（每个 worker 进程 fork 后调用一次）"""
+        if not self.multiprocess_dir or self._flusher_pid == os.getpid():
+            return
+        self._flusher_pid = os.getpid()
+
+        def flush():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.write_snapshot()
+                except OSError:
+                    pass
+
+        threading.Thread(target=flush, name='metrics-flusher', daemon=True).start()
+
+    def collect(self):
+        """合并共享目录中所有进程的快照，返回 {指标名: {标签值: 值}}"""
+        self.write_snapshot()
+        merged = {}
+        with _directory_lock(self.multiprocess_dir, fcntl.LOCK_SH):
+            for path in glob.glob(os.path.join(self.multiprocess_dir, '*.json')):
+                _merge_snapshot(merged, _read_snapshot(path))
+        return {name: metric['values'] for name, metric in merged.items()}
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        merged = self.collect() if self.multiprocess_dir else None
+        lines = []
+        for metric in metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            values = None if merged is None else merged.get(metric.name, {})
+            for name, labels, value in metric.samples(values):
+                lines.append(f'{name}{labels} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+def clear_multiprocess_dir(directory=METRICS_MULTIPROC_DIR):
+    """服务启动时清空共享目录中上次运行留下的快照"""
+    if not directory:
+        return
+    os.makedirs(directory, exist_ok=True)
+    for path in glob.glob(os.path.join(directory, '*.json')):
+        os.remove(path)
+
+
+def mark_process_dead(pid, directory=METRICS_MULTIPROC_DIR):
+    """
+    worker 退出后（由 gunicorn 主进程调用）将其计数器和直方图累加到归档文件并删除其快照，
+    仪表（如进行中的请求数）随进程一起丢弃
+    """
+    if not directory:
+        return
+    path = os.path.join(directory, f'{pid}.json')
+    if not os.path.exists(path):
+        return
+    archive_path = os.path.join(directory, ARCHIVE_FILE)
+    with _directory_lock(directory, fcntl.LOCK_EX):
+        merged = _merge_snapshot({}, _read_snapshot(archive_path))
+        _merge_snapshot(merged, _read_snapshot(path), include_gauges=False)
+        _write_json(archive_path, _dump_snapshot(merged))
+        os.remove(path)
+
+
+REGISTRY = MetricsRegistry(METRICS_MULTIPROC_DIR)
+
+# 合约调用指标
+CHAIN_CALL_SECONDS = REGISTRY.histogram(
+    'chain_call_duration_seconds', '合约只读调用耗时', ['function']
+)
+CHAIN_TX_STAGE_SECONDS = REGISTRY.histogram(
+    'chain_tx_stage_duration_seconds',
+    '合约交易各阶段耗时：submit 发送，mined 发送到打包，receipt 获取回执',
+    ['function', 'stage']
+)
+CHAIN_TX_GAS_USED = REGISTRY.histogram(
+    'chain_tx_gas_used', '合约交易实际消耗的 gas', ['function'],
+    buckets=(21000, 50000, 100000, 200000, 300000, 500000, 1000000, 2000000, 5000000)
+)
+CHAIN_TX_TOTAL = REGISTRY.counter(
+    'chain_tx_total', '合约交易结果计数（success、reverted、error）', ['function', 'status']
+)
+CHAIN_TX_RETRIES = REGISTRY.counter(
+    'chain_tx_retries_total', '因 nonce 冲突重新同步后重发的交易次数', ['function']
+)
+
+# HTTP 请求指标
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    'http_request_duration_seconds', '请求处理耗时', ['endpoint', 'method']
+)
+HTTP_REQUESTS_TOTAL = REGISTRY.counter(
+    'http_requests_total', '请求数（按状态码）', ['endpoint', 'method', 'status']
+)
+HTTP_IN_FLIGHT = REGISTRY.gauge(
+    'http_requests_in_flight', '正在处理的请求数', ['endpoint']
+)
+HTTP_DB_SECONDS = REGISTRY.histogram(
+    'http_request_db_seconds', '单个请求内 SQL 执行总耗时', ['endpoint']
+)
+DB_QUERY_SECONDS = REGISTRY.histogram(
+    'db_query_duration_seconds', '单条 SQL 执行耗时',
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+)
+
+# 计算密集操作耗时：password_hash、password_check、encrypt、decrypt、qr_render
+OPERATION_SECONDS = REGISTRY.histogram(
+    'operation_duration_seconds', '密码哈希、加解密、二维码生成等操作耗时', ['operation']
+)
@@ -0,0 +1,262 @@
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+from web3 import Web3
+from web3.exceptions import TransactionNotFound, TimeExhausted
+
+from .chain_backend import node_key
+from .metrics import CHAIN_TX_STAGE_SECONDS, CHAIN_TX_GAS_USED, CHAIN_TX_TOTAL, CHAIN_TX_RETRIES
+
+NONCE_ERROR_MARKERS = ('nonce', 'replacement transaction underpriced')
+
+# 节点已持有完全相同的交易：不是 nonce 冲突，换 nonce 重发会让合约调用执行两次
+ALREADY_KNOWN_MARKERS = ('already known', 'known transaction')
+
+
+def is_nonce_error(error):
+    """节点因 nonce 冲突拒绝交易时返回 True"""
+    message = str(error).lower()
+    return any(marker in message for marker in NONCE_ERROR_MARKERS)
+
+
+def is_already_known(error):
+    """节点交易池中已有同一笔交易时返回 True"""
+    message = str(error).lower()
+    return any(marker in message for marker in ALREADY_KNOWN_MARKERS)
+
+
+class NonceManager:
+    """本地 nonce 分配器：每个发送账户只在首次使用（或出错重置）时查询链上 nonce"""
+
+    def __init__(self, w3):
+        self.w3 = w3
+        self._nonces = {}
+        self._locks = {}
+        self._guard = threading.Lock()
+
+    def lock_for(self, sender):
+        """获取账户级别的锁，保证同一账户的 nonce 按顺序分配和发送"""
+        with self._guard:
+            if sender not in self._locks:
+                self._locks[sender] = threading.Lock()
+            return self._locks[sender]
+
+    def peek(self, sender):
+        """返回下一个可用 nonce（调用方需持有账户锁）"""
+        if sender not in self._nonces:
+            self._nonces[sender] = self.w3.eth.get_transaction_count(sender, 'pending')
+        return self._nonces[sender]
+
+    def advance(self, sender):
+        """交易发送成功后消耗当前 nonce（调用方需持有账户锁）"""
+        self._nonces[sender] += 1
+
+    def reset(self, sender):
+        """丢弃本地 nonce，下次使用时重新从链上同步"""
+        self._nonces.pop(sender, None)
+
+
+class TransactionSubmitter:
+    """
+    异步交易提交队列
+    - 本地分配 nonce，同一账户可同时有多笔交易在途
+    - 后台线程统一轮询回执，通过 Future / 回调返回结果
+    """
+
+    def __init__(self, w3, max_in_flight=64, poll_interval=0.5, receipt_timeout=120, send_retries=2):
+        """
+        :param max_in_flight: 每个发送账户允许的最大在途交易数
+        :param poll_interval: 回执轮询间隔（秒）
+        :param receipt_timeout: 等待回执的超时时间（秒）
+        :param send_retries: nonce 冲突时重新同步并重发的次数
+        """
+        self.w3 = w3
+        self.nonces = NonceManager(w3)
+        self.max_in_flight = max_in_flight
+        self.poll_interval = poll_interval
+        self.receipt_timeout = receipt_timeout
+        self.send_retries = send_retries
+
+        self._pending = {}  # tx_hash => (future, sender, function, submitted_at)
+        self._slots = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._poller = threading.Thread(target=self._poll_receipts, name='tx-receipt-poller', daemon=True)
+        self._poller.start()
+
+    def _slot_for(self, sender):
+        with self._lock:
+            if sender not in self._slots:
+                self._slots[sender] = threading.BoundedSemaphore(self.max_in_flight)
+            return self._slots[sender]
+
+    def submit(self, contract_function, sender, tx_params=None, callback=None):
+        """
+        发送合约交易，不等待回执
+        :param contract_function: 已绑定参数的合约函数，如 contract.functions.register(email)
+        :param sender: 发送账户地址
+        :param tx_params: 额外的交易参数（gas、gasPrice 等）
+        :param callback: 交易完成后的回调，参数为 Future
+        :return: 结果为交易回执的 Future
+        """
+        if self._stopped:
+            raise RuntimeError('交易提交队列已关闭')
+
+        function = getattr(contract_function, 'fn_name', 'unknown')
+        future = Future()
+        if callback:
+            future.add_done_callback(callback)
+
+        # 在途交易达到上限时阻塞，形成背压
+        slot = self._slot_for(sender)
+        slot.acquire()
+
+        params = dict(tx_params or {})
+        params['from'] = sender
+        try:
+            with self.nonces.lock_for(sender):
+                for attempt in range(self.send_retries + 1):
+                    params['nonce'] = self.nonces.peek(sender)
+                    started = time.monotonic()
+                    try:
+                        tx_hash = self._send(contract_function, params)
+                        break
+                    except Exception as e:
+                        # nonce 可能已与链上不一致，下次重新同步
+                        self.nonces.reset(sender)
+                        if attempt == self.send_retries or not is_nonce_error(e):
+                            raise
+                        CHAIN_TX_RETRIES.inc(function)
+                self.nonces.advance(sender)
+        except Exception as e:
+            slot.release()
+            CHAIN_TX_TOTAL.inc(function, 'error')
+            future.set_exception(e)
+            return future
+
+        submitted_at = time.monotonic()
+        CHAIN_TX_STAGE_SECONDS.observe(submitted_at - started, function, 'submit')
+
+        future.tx_hash = tx_hash
+        with self._lock:
+            self._pending[tx_hash] = (future, sender, function, submitted_at)
+        self._wakeup.set()
+        return future
+
+    def _send(self, contract_function, params):
+        """发送交易，返回交易哈希"""
+        tx = contract_function.build_transaction(params)
+        try:
+            return self.w3.eth.send_transaction(tx)
+        except Exception as e:
+            if not is_already_known(e):
+                raise
+            # 同一笔交易已在交易池中（如上次发送超时但节点已接收），按哈希等待它的回执。
+            # 签名是确定性的，重新签名同一交易得到相同的原始数据和哈希；节点不支持签名时放弃，不重发
+            try:
+                signed = self.w3.eth.sign_transaction(tx)
+            except Exception:
+                raise e
+            return Web3.keccak(signed['raw'])
+
+    def _poll_receipts(self):
+        while not self._stopped:
+            with self._lock:
+                pending = list(self._pending.items())
+
+            if not pending:
+                # 没有在途交易时休眠，直到有新交易提交
+                self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+
+            for tx_hash, (future, sender, function, submitted_at) in pending:
+                started = time.monotonic()
+                try:
+                    receipt = self.w3.eth.get_transaction_receipt(tx_hash)
+                except TransactionNotFound:
+                    if time.monotonic() - submitted_at < self.receipt_timeout:
+                        continue
+                    self._finish(tx_hash, sender)
+                    CHAIN_TX_TOTAL.inc(function, 'error')
+                    future.set_exception(TimeExhausted(
+                        f'交易 {tx_hash.hex()} 在 {self.receipt_timeout} 秒内未被打包'
+                    ))
+                    continue
+                except Exception as e:
+                    self._finish(tx_hash, sender)
+                    CHAIN_TX_TOTAL.inc(function, 'error')
+                    future.set_exception(e)
+                    continue
+
+                finished = time.monotonic()
+                CHAIN_TX_STAGE_SECONDS.observe(finished - started, function, 'receipt')
+                CHAIN_TX_STAGE_SECONDS.observe(finished - submitted_at, function, 'mined')
+                CHAIN_TX_GAS_USED.observe(receipt['gasUsed'], function)
+                CHAIN_TX_TOTAL.inc(function, 'success' if receipt['status'] == 1 else 'reverted')
+
+                self._finish(tx_hash, sender)
+                future.set_result(receipt)
+
+            time.sleep(self.poll_interval)
+
+    def _finish(self, tx_hash, sender):
+        with self._lock:
+            self._pending.pop(tx_hash, None)
+        self._slot_for(sender).release()
+
+    @property
+    def stopped(self):
+        return self._stopped
+
+    def in_flight(self):
+        """当前在途交易数"""
+        with self._lock:
+            return len(self._pending)
+
+    def shutdown(self, wait=True):
+        """停止接收新交易；wait 为 True 时等待所有在途交易完成"""
+        if wait:
+            with self._lock:
+                futures = [item[0] for item in self._pending.values()]
+            for future in futures:
+                try:
+                    future.result()
+                except Exception:
+                    pass
+        self._stopped = True
+        self._wakeup.set()
+
+
+_submitters = {}
+_submitters_lock = threading.Lock()
+
+
+def get_submitter(w3):
+    """
+    获取进程内共享的交易提交队列，每个节点一个
+    同一账户的 nonce 只能由一个 NonceManager 分配，各自创建队列会并发分配出重复的 nonce
+    """
+    key = node_key(w3)
+    with _submitters_lock:
+        submitter = _submitters.get(key)
+        if submitter is None or submitter.stopped:
+            submitter = _submitters[key] = TransactionSubmitter(
+                w3,
+                max_in_flight=int(os.getenv('TX_MAX_IN_FLIGHT', '64')),
+                poll_interval=float(os.getenv('TX_POLL_INTERVAL', '0.5')),
+                receipt_timeout=float(os.getenv('TX_RECEIPT_TIMEOUT', '120'))
+            )
+        return submitter
+
+
+def shutdown_submitters(wait=True):
+    """关闭所有共享的提交队列；wait 为 True 时等待在途交易完成"""
+    with _submitters_lock:
+        submitters = list(_submitters.values())
+        _submitters.clear()
+    for submitter in submitters:
+        submitter.shutdown(wait)
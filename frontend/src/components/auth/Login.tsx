@@ -76,10 +76,9 @@ const Login: React.FC = () => {
       // 第二步：使用 MetaMask 签名 challenge
       const signature = await signChallenge(response.data.challenge);
 
-      // 第三步：验证签名
+      // 第三步：验证签名（凭第一步返回的登录会话，不再重复提交密码）
       const verifyResponse = await axios.post('/api/verify-signature', {
-        email: formData.email,
-        password: formData.password,
+        login_session: response.data.login_session,
         challenge: response.data.challenge,
         signature,
         wallet_address: formData.walletAddress